@@ -1,6 +1,7 @@
 import streamlit as st
 import uuid
 from datetime import datetime
+import logging
 import os
 
 # Import custom components
@@ -10,20 +11,54 @@ from components.journal_prompts import render_journal_prompts
 from components.cbt_exercises import render_cbt_exercises
 from components.breathing_exercises import render_breathing_exercises
 from components.psychoeducation import render_psychoeducation
+from components.export_button import render_export_button
 from utils.data_manager import DataManager
 from utils.crisis_detection import CrisisDetector
+from utils.background_scanner import get_background_scanner
+from utils.session_manager import get_session_manager
+from utils.retention import MIN_MOOD_ROLLUP_DAYS, get_retention_compactor
+from utils.recovery import derive_session, new_recovery_token
+from utils.shared_state import session_token, set_session_token, shared_state_enabled, write_session_cookie
+from utils.snapshots import SNAPSHOT_FORMATS
+
+# Background tasks (retention, session reaper, crisis metrics) log under "utils"; show them once per process
+utils_logger = logging.getLogger("utils")
+if not utils_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    utils_logger.addHandler(handler)
+    utils_logger.setLevel(os.getenv("WELLNESS_LOG_LEVEL", "INFO").upper())
 
 # Initialize session state for anonymous user
 if 'user_id' not in st.session_state:
-    st.session_state.user_id = str(uuid.uuid4())
+    if shared_state_enabled():
+        # The session lives in shared storage under the token in its cookie, so any process can serve it
+        st.session_state.user_id, st.session_state.encryption_key = derive_session(session_token())
+    else:
+        st.session_state.user_id = str(uuid.uuid4())
     st.session_state.session_start = datetime.now()
 
-if 'data_manager' not in st.session_state:
-    st.session_state.data_manager = DataManager(st.session_state.user_id)
+if shared_state_enabled():
+    write_session_cookie()
 
 if 'crisis_detector' not in st.session_state:
     st.session_state.crisis_detector = CrisisDetector()
 
+if 'data_manager' not in st.session_state:
+    st.session_state.data_manager = DataManager(
+        st.session_state.user_id,
+        background_scanner=get_background_scanner(st.session_state.crisis_detector)
+    )
+
+# Restores the session if it was hibernated while idle, and enforces its memory cap
+get_session_manager().touch(st.session_state.data_manager)
+
+# Picks up anything another process wrote for this session (shared-state mode only)
+st.session_state.data_manager.sync()
+
+# Retention and compaction run in the background; this only starts the thread once
+get_retention_compactor(st.session_state.data_manager.storage, get_session_manager())
+
 # Set page configuration
 st.set_page_config(
     page_title="Youth Mental Wellness Companion",
@@ -42,6 +77,11 @@ It is not a replacement for professional mental health care. If you're experienc
 please contact emergency services or call 988 (Suicide & Crisis Lifeline).
 """)
 
+# Surface crisis resources for journal/CBT entries flagged in the background
+background_findings = st.session_state.data_manager.background_scanner.pop_findings(st.session_state.user_id)
+if background_findings:
+    st.session_state.crisis_detector.trigger_crisis_intervention(background_findings[0]["assessment"])
+
 # Sidebar navigation
 st.sidebar.title("🛠️ Wellness Tools")
 st.sidebar.markdown("---")
@@ -84,9 +124,26 @@ st.sidebar.markdown("---")
 if st.sidebar.button("🗑️ Delete All My Data"):
     if st.sidebar.button("⚠️ Confirm Delete", type="primary"):
         st.session_state.data_manager.delete_all_data()
+        if shared_state_enabled():
+            token = new_recovery_token()
+            st.session_state.data_manager.attach(token)
+            set_session_token(token)
         st.sidebar.success("All data deleted successfully")
         st.rerun()
 
+with st.sidebar.expander("🔑 Resume a Previous Session"):
+    recovery_input = st.text_input("Recovery token", type="password", key="recovery_token_input")
+    st.caption("Anything from this visit that isn't saved under a token will be replaced.")
+    if st.button("Resume") and recovery_input:
+        try:
+            st.session_state.data_manager.resume(recovery_input)
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            if shared_state_enabled():
+                set_session_token(recovery_input)
+            st.rerun()
+
 # Main content area based on selected page
 if page == "💬 Chat Support":
     render_chat_interface()
@@ -117,24 +174,99 @@ elif page == "⚙️ Privacy Settings":
             st.json(data_summary)
     
     with col2:
-        if st.button("💾 Export My Data"):
-            export_data = st.session_state.data_manager.export_user_data()
+        export_format = st.radio("Export format", ["json", "ndjson"], horizontal=True)
+        compress = st.checkbox("Compress (gzip)")
+        # Records are read from storage only when the export is prepared
+        export_job = st.session_state.data_manager.export_user_data(fmt=export_format, compress=compress)
+        render_export_button("💾 Export My Data", export_job, key="all_data")
+    
+    with st.expander("🔑 Keep My Data for Next Time"):
+        if st.session_state.get("recovery_enabled"):
+            st.success("This session is saved under a recovery token. Enter it under \"Resume a Previous Session\" on your next visit.")
+        else:
+            st.write(
+                "Without a recovery token, what you save is kept only for this session and is "
+                "deleted when the session ends. Create an anonymous recovery token to come back to "
+                "your mood history, journal and CBT records on a later visit. The token is the only "
+                "key to your data: it is shown once and can't be recovered if lost."
+            )
+            if st.button("Create Recovery Token"):
+                token = st.session_state.data_manager.enable_recovery()
+                if shared_state_enabled():
+                    set_session_token(token)
+                st.code(token, language=None)
+                st.warning("Copy this token somewhere safe now. It won't be shown again.")
+    
+    with st.expander("📥 Restore Data From an Export"):
+        uploaded_file = st.file_uploader(
+            "Upload a wellness, journal, CBT or mood export",
+            type=["json", "ndjson", "csv", "gz"]
+        )
+        if uploaded_file is not None and st.button("Restore"):
+            try:
+                with st.spinner("Restoring your data..."):
+                    report = st.session_state.data_manager.import_user_data(uploaded_file, uploaded_file.name)
+            except ValueError as error:
+                st.error(f"That file couldn't be read as an export: {error}")
+            else:
+                st.success(f"Restored {sum(report['imported'].values())} entries.")
+                if any(report["rejected"].values()) or any(report["duplicates"].values()):
+                    st.caption(
+                        f"Skipped {sum(report['rejected'].values())} invalid and "
+                        f"{sum(report['duplicates'].values())} already-saved entries."
+                    )
+    
+    with st.expander("📈 Download an Analytics Snapshot"):
+        st.write(
+            "A typed Parquet or Arrow file of one kind of entry, ready for spreadsheets, pandas "
+            "or other analysis tools. Unlike the export above it can't be restored here."
+        )
+        snapshot_types = {
+            "mood_entries": "Mood entries",
+            "mood_daily": "Daily mood summaries",
+            "journal_entries": "Journal entries",
+            "cbt_records": "CBT thought records"
+        }
+        snapshot_type = st.selectbox("Entries", list(snapshot_types), format_func=snapshot_types.get)
+        snapshot_format = st.radio("Snapshot format", list(SNAPSHOT_FORMATS), horizontal=True)
+        if st.button("Prepare Snapshot"):
+            path = st.session_state.data_manager.write_snapshots(
+                fmt=snapshot_format, record_types=[snapshot_type]
+            )[snapshot_type]
+            with open(path, "rb") as snapshot_file:
+                snapshot = snapshot_file.read()
+            # The file holds decrypted entries, so it isn't left on the server
+            os.remove(path)
             st.download_button(
-                label="Download Data",
-                data=export_data,
-                file_name=f"wellness_data_{datetime.now().strftime('%Y%m%d')}.json",
-                mime="application/json"
+                label="💾 Download Snapshot",
+                data=snapshot,
+                file_name=os.path.basename(path),
+                mime="application/octet-stream"
             )
     
     st.subheader("Privacy Information")
-    st.markdown("""
-    **How we protect your privacy:**
-    - ✅ No personal information collected
-    - ✅ Anonymous session IDs only
-    - ✅ Data encrypted at rest
-    - ✅ No tracking across sessions
-    - ✅ Complete data deletion available
-    - ✅ No data sharing with third parties
+    # Described from the compactor's actual settings, which deployments can change
+    compactor = get_retention_compactor(st.session_state.data_manager.storage, get_session_manager())
+    retention = compactor.retention
+    kept = []
+    if retention.get("chat_history"):
+        kept.append(f"chat messages are deleted after {retention['chat_history']} days")
+    if retention.get("crisis_events"):
+        kept.append(f"crisis alerts after {retention['crisis_events']} days")
+    if retention.get("mood_entries"):
+        kept.append(f"mood entries older than {max(retention['mood_entries'], MIN_MOOD_ROLLUP_DAYS)} days are reduced to daily summaries")
+    if compactor.idle_days:
+        kept.append(f"everything is deleted once nothing new has been saved for {compactor.idle_days} days")
+    kept = "; ".join(kept)
+    kept = kept[:1].upper() + kept[1:] + "." if kept else "Nothing is deleted automatically."
+    st.markdown(f"""
+    **What happens to your data:**
+    - Your entries are encrypted on the server with a key that belongs to your session; only the time of each entry is stored unencrypted, for ordering and clean-up
+    - Without a recovery token, what you save belongs to this session only: it can't be opened again once the session ends, and it is deleted from the server
+    - With a recovery token, your data stays on the server and only that token can unlock it. The token itself is never stored, so a lost token means the data can't be recovered
+    - {kept}
+    - You can delete all of your data at any time
+    - ✅ No personal information collected, and no data sharing with third parties
     
     **Data we collect:**
     - Mood ratings and journal entries (if you choose to save them)
@@ -0,0 +1,249 @@
+"""
+Accuracy and latency benchmark for CrisisDetector
+
+Usage (from the repository root):
+    python -m benchmarks.crisis_benchmark --output results.json
+    python -m benchmarks.crisis_benchmark --baseline benchmarks/crisis_baseline.json
+    python -m benchmarks.crisis_benchmark --corpus private.jsonl --llm live
+
+The default LLM mode is an offline stub that always answers "low", so the
+reported recall is the safety floor provided by the rule-based layers alone.
+Any change that lowers recall against the baseline fails with exit code 1.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.crisis_corpus import RISK_LEVELS, load_corpus
+from utils.crisis_detection import CrisisDetector
+
+LAYERS = ["keyword", "pattern", "llm", "combined"]
+
+# Risk levels that must trigger an intervention (see CrisisDetector)
+INTERVENTION_LEVELS = ["high", "critical"]
+
+
+class StubLLMClient:
+    """Offline stand-in for OpenAIClient with optional simulated latency"""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+
+    def analyze_sentiment_and_risk(self, text):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return {
+            "sentiment_score": 5,
+            "risk_level": "low",
+            "emotional_indicators": [],
+            "intervention_needed": "none",
+            "confidence": 0.0
+        }
+
+
+def percentiles(samples_ms):
+    """Summarize latency samples (milliseconds)"""
+    if not samples_ms:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+
+    ordered = sorted(samples_ms)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "p50": round(pick(0.50), 4),
+        "p90": round(pick(0.90), 4),
+        "p99": round(pick(0.99), 4),
+        "max": round(ordered[-1], 4),
+        "mean": round(sum(ordered) / len(ordered), 4)
+    }
+
+
+def classification_metrics(labels, predictions):
+    """Precision/recall per risk level plus the safety recall used for gating"""
+    per_level = {}
+    for level in RISK_LEVELS:
+        true_positive = sum(1 for label, pred in zip(labels, predictions) if label == level and pred == level)
+        predicted = sum(1 for pred in predictions if pred == level)
+        actual = sum(1 for label in labels if label == level)
+        per_level[level] = {
+            "precision": round(true_positive / predicted, 4) if predicted else None,
+            "recall": round(true_positive / actual, 4) if actual else None,
+            "support": actual
+        }
+
+    # A high-risk message counts as caught if it was flagged at or above its own level
+    at_or_above = {}
+    for level in RISK_LEVELS[1:]:
+        threshold = RISK_LEVELS.index(level)
+        relevant = [pred for label, pred in zip(labels, predictions) if label == level]
+        caught = sum(1 for pred in relevant if RISK_LEVELS.index(pred) >= threshold)
+        at_or_above[level] = round(caught / len(relevant), 4) if relevant else None
+
+    needs_intervention = [pred for label, pred in zip(labels, predictions) if label in INTERVENTION_LEVELS]
+    flagged = sum(1 for pred in needs_intervention if pred in INTERVENTION_LEVELS)
+
+    return {
+        "per_level": per_level,
+        "recall_at_or_above": at_or_above,
+        "safety_recall": round(flagged / len(needs_intervention), 4) if needs_intervention else None,
+        "accuracy": round(sum(1 for label, pred in zip(labels, predictions) if label == pred) / len(labels), 4)
+    }
+
+
+def run_benchmark(detector, corpus, repeat=1):
+    """Time every detection layer and score the combined decision"""
+    timings = {layer: [] for layer in LAYERS}
+    labels = []
+    predictions = []
+    misses = []
+
+    started = time.perf_counter()
+    for pass_index in range(repeat):
+        for sample in corpus:
+            text = sample["text"]
+
+            assessment = detector.analyze_text_for_crisis(text, trace=True)
+            trace = assessment["trace"]
+            for layer in LAYERS[:-1]:
+                timings[layer].append(trace["layer_ms"][layer])
+            timings["combined"].append(trace["total_ms"])
+
+            # Decisions are deterministic, so only the first pass is scored
+            if pass_index:
+                continue
+            labels.append(sample["label"])
+            predictions.append(assessment["final_risk_level"])
+            if _is_safety_miss(sample["label"], assessment["final_risk_level"]):
+                misses.append({"text": text, "label": sample["label"], "predicted": assessment["final_risk_level"]})
+    elapsed = time.perf_counter() - started
+
+    combined_seconds = sum(timings["combined"]) / 1000
+    messages = len(corpus) * repeat
+
+    return {
+        "latency_ms": {layer: percentiles(samples) for layer, samples in timings.items()},
+        "throughput": {
+            "messages": messages,
+            "messages_per_sec": round(messages / combined_seconds, 2) if combined_seconds else None,
+            "wall_seconds": round(elapsed, 4)
+        },
+        "accuracy": classification_metrics(labels, predictions),
+        "safety_misses": misses
+    }
+
+
+def _is_safety_miss(label, predicted):
+    return label in INTERVENTION_LEVELS and RISK_LEVELS.index(predicted) < RISK_LEVELS.index(label)
+
+
+def compare_to_baseline(results, baseline):
+    """Return a list of recall regressions against a baseline results file"""
+    regressions = []
+    current = results["accuracy"]
+    previous = baseline["accuracy"]
+
+    if _lower(current["safety_recall"], previous["safety_recall"]):
+        regressions.append(f"safety_recall {previous['safety_recall']} -> {current['safety_recall']}")
+
+    for level, value in current["recall_at_or_above"].items():
+        if _lower(value, previous["recall_at_or_above"].get(level)):
+            regressions.append(f"recall_at_or_above[{level}] {previous['recall_at_or_above'][level]} -> {value}")
+
+    for level, metrics in current["per_level"].items():
+        baseline_recall = previous["per_level"].get(level, {}).get("recall")
+        if level in INTERVENTION_LEVELS and _lower(metrics["recall"], baseline_recall):
+            regressions.append(f"recall[{level}] {baseline_recall} -> {metrics['recall']}")
+
+    return regressions
+
+
+def latency_deltas(results, baseline):
+    """p50/p99 change per layer relative to the baseline (informational only)"""
+    deltas = {}
+    for layer in LAYERS:
+        current = results["latency_ms"].get(layer)
+        previous = baseline.get("latency_ms", {}).get(layer)
+        if current and previous:
+            deltas[layer] = {
+                "p50": round(current["p50"] - previous["p50"], 4),
+                "p99": round(current["p99"] - previous["p99"], 4)
+            }
+    return deltas
+
+
+def _lower(current, previous):
+    return previous is not None and (current is None or current < previous)
+
+
+def build_detector(llm_mode, llm_latency_ms):
+    """Create a detector wired to the requested LLM layer"""
+    if llm_mode == "live":
+        return CrisisDetector()
+    return CrisisDetector(openai_client=StubLLMClient(llm_latency_ms))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CrisisDetector accuracy and latency")
+    parser.add_argument("--corpus", help="Private labeled corpus (JSONL with 'text' and 'label')")
+    parser.add_argument("--llm", choices=["stub", "live"], default="stub",
+                        help="Use the offline stub or the real OpenAI client for the LLM layer")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Simulated latency for the stub LLM layer")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus for timing")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", help="Compare against a previous results JSON")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    detector = build_detector(args.llm, args.llm_latency_ms)
+    repeat = 1 if args.llm == "live" else max(1, args.repeat)
+
+    results = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "corpus": args.corpus or "synthetic",
+        "corpus_size": len(corpus),
+        "llm_mode": args.llm,
+        **run_benchmark(detector, corpus, repeat)
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        results["regressions"] = compare_to_baseline(results, baseline)
+        results["latency_delta_ms"] = latency_deltas(results, baseline)
+        if results["regressions"]:
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    _print_summary(results)
+    return exit_code
+
+
+def _print_summary(results):
+    print(f"Corpus: {results['corpus']} ({results['corpus_size']} messages), LLM layer: {results['llm_mode']}")
+    for layer, stats in results["latency_ms"].items():
+        print(f"  {layer:<9} p50={stats['p50']:.4f}ms p90={stats['p90']:.4f}ms p99={stats['p99']:.4f}ms")
+    print(f"  throughput: {results['throughput']['messages_per_sec']} messages/sec")
+
+    accuracy = results["accuracy"]
+    for level, metrics in accuracy["per_level"].items():
+        print(f"  {level:<9} precision={metrics['precision']} recall={metrics['recall']} (n={metrics['support']})")
+    print(f"  safety recall (high/critical flagged): {accuracy['safety_recall']}")
+
+    for regression in results.get("regressions", []):
+        print(f"  REGRESSION: {regression}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Labeled corpora for the crisis detection benchmark
+The synthetic corpus is hand-written and contains no real user data. Private
+corpora (e.g. clinician-reviewed transcripts) are loaded from local JSONL files
+and must never be committed to the repository.
+"""
+
+import json
+import os
+
+RISK_LEVELS = ["low", "moderate", "high", "critical"]
+
+# Environment variable pointing at a private labeled corpus (JSONL)
+PRIVATE_CORPUS_ENV = "CRISIS_BENCHMARK_CORPUS"
+
+# Synthetic messages labeled with the risk level a reviewer would assign
+SYNTHETIC_CORPUS = [
+    # Low risk: everyday stress, positive updates, help-seeking
+    {"text": "I had a pretty good day at school today, my friends and I went for pizza.", "label": "low"},
+    {"text": "Can you give me some tips for studying for my math exam?", "label": "low"},
+    {"text": "I'm a little nervous about my presentation tomorrow but I think I'll be fine.", "label": "low"},
+    {"text": "My therapist suggested I try journaling, how do I start?", "label": "low"},
+    {"text": "I went for a run this morning and it really helped clear my head.", "label": "low"},
+    {"text": "Sometimes I get annoyed at my little brother but we get along mostly.", "label": "low"},
+    {"text": "What are some good breathing exercises before bed?", "label": "low"},
+    {"text": "I'm trying to get better at saying no to people.", "label": "low"},
+    {"text": "Last time I talked to my counselor it went really well.", "label": "low"},
+    {"text": "I finished my art project and I'm proud of how it turned out.", "label": "low"},
+    {"text": "I feel okay today, just a bit tired after practice.", "label": "low"},
+    {"text": "How do I make new friends after moving to a new city?", "label": "low"},
+    {"text": "I'm excited about the weekend, we're visiting my grandparents.", "label": "low"},
+    {"text": "Is it normal to feel bored during summer break?", "label": "low"},
+
+    # Moderate risk: persistent distress without danger indicators
+    {"text": "I've been feeling really anxious lately and I'm not sure how to deal with it.", "label": "moderate"},
+    {"text": "I feel so overwhelmed with all my homework and nobody seems to get it.", "label": "moderate"},
+    {"text": "I've been crying a lot and I don't really know why.", "label": "moderate"},
+    {"text": "I feel like no one cares about what I have to say.", "label": "moderate"},
+    {"text": "My parents keep fighting and it makes me scared to be home.", "label": "moderate"},
+    {"text": "I haven't been sleeping well and everything feels too hard.", "label": "moderate"},
+    {"text": "I feel worthless when I compare myself to everyone online.", "label": "moderate"},
+    {"text": "I had a panic attack before my exam and I'm still shaky.", "label": "moderate"},
+    {"text": "Lately I've been drinking too much at parties to deal with stress.", "label": "moderate"},
+    {"text": "I keep skipping meals because I hate my body.", "label": "moderate"},
+    {"text": "I feel numb most days, like I'm just going through the motions.", "label": "moderate"},
+    {"text": "Everything feels pointless and I can't cope with school right now.", "label": "moderate"},
+
+    # High risk: self-harm, severe hopelessness, abuse, psychosis
+    {"text": "I cut myself again last night and I don't know how to stop.", "label": "high"},
+    {"text": "I keep thinking about hurting myself when things get bad.", "label": "high"},
+    {"text": "I'm completely hopeless, I'm a burden to everyone and I can't take it anymore.", "label": "high"},
+    {"text": "Someone hurts me at home and I feel unsafe there.", "label": "high"},
+    {"text": "I've been hearing voices telling me everyone is out to get me.", "label": "high"},
+    {"text": "I've been burning myself with a lighter so I can feel something.", "label": "high"},
+    {"text": "I starve myself for days because I don't deserve food.", "label": "high"},
+    {"text": "I'm at my breaking point, nothing matters and I'm empty inside.", "label": "high"},
+    {"text": "I think they're watching me and following me everywhere I go.", "label": "high"},
+    {"text": "I can't take it anymore, I won't make it through this.", "label": "high"},
+    {"text": "I was assaulted and I feel terrified all the time.", "label": "high"},
+    {"text": "I want to hurt myself so the pain on the inside stops.", "label": "high"},
+
+    # Critical risk: suicidal ideation, plans, means, imminence
+    {"text": "I want to die, there's no reason for me to keep going.", "label": "critical"},
+    {"text": "I'm going to kill myself tonight.", "label": "critical"},
+    {"text": "I have the pills ready and I've decided to end my life.", "label": "critical"},
+    {"text": "Everyone would be better off dead without me, I wish I was dead.", "label": "critical"},
+    {"text": "I've been looking up ways to die and I think I've found one.", "label": "critical"},
+    {"text": "This is my final message, goodbye forever.", "label": "critical"},
+    {"text": "I don't want to live anymore, I'm planning to end it all.", "label": "critical"},
+    {"text": "I have a plan to die this weekend.", "label": "critical"},
+    {"text": "I'm standing on the bridge and I'm going to jump, I want to die.", "label": "critical"},
+    {"text": "Suicide feels like the only way out right now.", "label": "critical"},
+    {"text": "I'm going to do it tonight, nobody can stop me.", "label": "critical"},
+    {"text": "Life is not worth living and I want to take my own life.", "label": "critical"},
+]
+
+
+def load_corpus(path=None):
+    """Load a labeled corpus, falling back to the synthetic one"""
+    path = path or os.getenv(PRIVATE_CORPUS_ENV)
+    if not path:
+        return list(SYNTHETIC_CORPUS)
+
+    corpus = []
+    with open(path, encoding="utf-8") as corpus_file:
+        for line_number, line in enumerate(corpus_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            sample = json.loads(line)
+            if sample.get("label") not in RISK_LEVELS or not sample.get("text"):
+                raise ValueError(f"{path}:{line_number}: expected 'text' and a valid 'label'")
+            corpus.append({"text": sample["text"], "label": sample["label"]})
+
+    return corpus
@@ -0,0 +1,126 @@
+"""
+Encryption-at-rest overhead benchmark for DataManager
+
+Usage (from the repository root):
+    python -m benchmarks.encryption_benchmark --records 10000 --output encryption.json
+
+Compares plaintext JSON against Fernet-encrypted payloads for bulk writes to
+the SQLite backend, cold reads (decrypt everything) and warm reads served
+from the per-session decrypt cache.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from utils.data_manager import DataManager
+from utils.storage import SQLiteBackend
+
+EMOTIONS = ["happy", "sad", "anxious", "angry", "tired", "grateful", "calm", "lonely", "overwhelmed"]
+TRIGGERS = ["School/Work stress", "Family situations", "Sleep issues", "Social media", "Nothing specific"]
+
+
+def synthetic_mood_entries(count, seed=7):
+    """Mood entries shaped like DataManager.save_mood_entry output"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=365)
+    return [
+        {
+            "id": index,
+            "timestamp": (start + timedelta(minutes=52 * index)).isoformat(),
+            "overall_mood": rng.randint(1, 10),
+            "emotions": rng.sample(EMOTIONS, rng.randint(1, 3)),
+            "intensity": rng.randint(1, 10),
+            "triggers": rng.sample(TRIGGERS, rng.randint(0, 2)),
+            "notes": "Quick check-in: " + " ".join(rng.sample(EMOTIONS, 3))
+        }
+        for index in range(count)
+    ]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+
+def run_benchmark(count):
+    records = synthetic_mood_entries(count)
+    results = {"records": count}
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain_backend = SQLiteBackend(os.path.join(directory, "plain.db"))
+        encrypted_backend = SQLiteBackend(os.path.join(directory, "encrypted.db"))
+
+        st.session_state.session_start = datetime.now()
+        manager = DataManager("benchmark-user", storage=encrypted_backend)
+        manager.decrypt_cache.maxsize = count
+
+        # Writes: serialize (+ encrypt) and insert in one transaction
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        _, results["plain_write_ms"] = timed(lambda: plain_backend.append_many(
+            "benchmark-user", "mood_entries",
+            [(record["id"], record["timestamp"], encode(record).encode()) for record in records]
+        ))
+        _, results["encrypted_write_ms"] = timed(lambda: encrypted_backend.append_many(
+            "benchmark-user", "mood_entries",
+            zip((record["id"] for record in records), (record["timestamp"] for record in records),
+                manager.encrypt_records(records))
+        ))
+
+        # Reads: plaintext decode vs decrypt with a cold and a warm cache
+        _, results["plain_read_ms"] = timed(lambda: [
+            json.loads(payload) for _, _, payload in plain_backend.load("benchmark-user", "mood_entries")
+        ])
+        manager.decrypt_cache.clear()
+        cold, results["encrypted_cold_read_ms"] = timed(lambda: manager.load_records("mood_entries"))
+        warm, results["encrypted_warm_read_ms"] = timed(lambda: manager.load_records("mood_entries"))
+        assert len(cold) == len(warm) == count
+
+        results["plain_bytes"] = os.path.getsize(plain_backend.path) + _wal_size(plain_backend.path)
+        results["encrypted_bytes"] = os.path.getsize(encrypted_backend.path) + _wal_size(encrypted_backend.path)
+
+        plain_backend.close()
+        encrypted_backend.close()
+
+    results["write_overhead_ratio"] = round(results["encrypted_write_ms"] / max(results["plain_write_ms"], 0.01), 2)
+    results["cold_read_overhead_ratio"] = round(results["encrypted_cold_read_ms"] / max(results["plain_read_ms"], 0.01), 2)
+    results["per_record_encrypt_us"] = round(results["encrypted_write_ms"] * 1000 / count, 2)
+    results["per_record_decrypt_us"] = round(results["encrypted_cold_read_ms"] * 1000 / count, 2)
+    return results
+
+
+def _wal_size(path):
+    wal_path = path + "-wal"
+    return os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DataManager encryption overhead")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Session state works outside `streamlit run`, but warns on every access
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    results = run_benchmark(args.records)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    for key, value in results.items():
+        print(f"  {key:<26} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Per-record memory benchmark for DataManager entries
+
+Usage (from the repository root):
+    python -m benchmarks.record_memory_benchmark --records 10000 --output records.json
+
+Measures the resident bytes per record for each record type when held as
+JSON-decoded dicts (the previous layout) versus the slotted record classes
+in utils.records, using tracemalloc.
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+
+from benchmarks.encryption_benchmark import EMOTIONS, TRIGGERS, synthetic_mood_entries
+from utils.records import RECORD_CLASSES
+
+ROLES = ["user", "assistant"]
+PERSONAS = ["supportive_friend", "wise_mentor", "calm_guide"]
+RISK_LEVELS = ["none", "low", "moderate"]
+FOCUS_AREAS = ["gratitude", "self_reflection", "goals", "relationships"]
+
+
+def synthetic_records(record_type, count, seed=11):
+    """Dict records shaped like the DataManager.save_* output for a record type"""
+    if record_type == "mood_entries":
+        return synthetic_mood_entries(count, seed)
+
+    rng = random.Random(seed)
+    timestamps = [entry["timestamp"] for entry in synthetic_mood_entries(count, seed)]
+    sentence = lambda: " ".join(rng.sample(EMOTIONS + TRIGGERS, 4))
+    builders = {
+        "chat_history": lambda: {
+            "role": rng.choice(ROLES), "content": sentence(),
+            "persona": rng.choice(PERSONAS), "risk_level": rng.choice(RISK_LEVELS)
+        },
+        "journal_entries": lambda: {
+            "prompt": sentence(), "content": sentence() * 3, "focus_area": rng.choice(FOCUS_AREAS),
+            "mood_before": rng.randint(1, 10), "mood_after": rng.randint(1, 10), "insights": []
+        },
+        "cbt_records": lambda: {
+            "situation": sentence(), "thoughts": sentence(), "emotions": rng.sample(EMOTIONS, 2),
+            "intensity_before": rng.randint(1, 10), "evidence_for": sentence(),
+            "evidence_against": sentence(), "balanced_thought": sentence(),
+            "intensity_after": rng.randint(1, 10), "ai_insights": None
+        },
+        "crisis_events": lambda: {"type": rng.choice(["immediate", "support"]), "session_id": "a1b2c3d4"},
+        "mood_daily": lambda: daily_rollup(rng.randint(1, 6))
+    }
+
+    def daily_rollup(entries):
+        moods = [rng.randint(1, 10) for _ in range(entries)]
+        return {
+            "day": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "count": entries,
+            "mood_sum": sum(moods), "mood_min": min(moods), "mood_max": max(moods),
+            "emotion_counts": {emotion: rng.randint(1, entries) for emotion in rng.sample(EMOTIONS, 3)},
+            "trigger_counts": {trigger: rng.randint(1, entries) for trigger in rng.sample(TRIGGERS, 2)}
+        }
+    return [
+        {"id": index, "timestamp": timestamp, **builders[record_type]()}
+        for index, timestamp in enumerate(timestamps)
+    ]
+
+
+def measure(build):
+    """Bytes still allocated by the object `build` returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run_benchmark(count):
+    results = {"records": count, "types": {}}
+
+    for record_type, record_class in RECORD_CLASSES.items():
+        # Both layouts are decoded from the same JSON text, as on a storage load
+        payload = json.dumps(synthetic_records(record_type, count))
+        values_payload = json.dumps([
+            record_class.from_dict(record).to_values() for record in json.loads(payload)
+        ])
+
+        dict_bytes = measure(lambda: json.loads(payload))
+        slotted_bytes = measure(lambda: [record_class.from_values(values) for values in json.loads(values_payload)])
+
+        results["types"][record_type] = {
+            "dict_bytes_per_record": round(dict_bytes / count, 1),
+            "slotted_bytes_per_record": round(slotted_bytes / count, 1),
+            "reduction_ratio": round(dict_bytes / max(slotted_bytes, 1), 2)
+        }
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-record memory for DataManager entries")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.records)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    print(f"  records: {results['records']}")
+    for record_type, stats in results["types"].items():
+        print(
+            f"  {record_type:<16} dict {stats['dict_bytes_per_record']:>8} B"
+            f"   slotted {stats['slotted_bytes_per_record']:>8} B"
+            f"   x{stats['reduction_ratio']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Session snapshot benchmark: binary snapshots vs the JSON export layout
+
+Usage (from the repository root):
+    python -m benchmarks.session_snapshot_benchmark --records 10000 --output snapshot.json
+
+Builds a session with `--records` records of every type and compares
+utils.session_snapshot against json.dumps(indent=2) of the record dicts
+(the export layout) for size, save time and load time back into records.
+The mood-only row loads just the mood section of the same snapshot.
+
+Targets: an order of magnitude smaller (about 16x at 10k records) and an
+order of magnitude faster for partial loads such as mood-only (25-30x).
+A full load builds the same Python records as the JSON path does, so it
+is bounded by object construction and decompression rather than parsing.
+It runs about 5x faster, and the target for it is 4x.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.record_memory_benchmark import synthetic_records
+from utils import session_snapshot
+from utils.records import RECORD_CLASSES
+
+
+def build_session(count):
+    return {
+        record_type: [record_class.from_dict(record) for record in synthetic_records(record_type, count)]
+        for record_type, record_class in RECORD_CLASSES.items()
+    }
+
+
+def json_dumps(session):
+    return json.dumps(
+        {record_type: [record.to_dict() for record in records] for record_type, records in session.items()},
+        indent=2
+    ).encode()
+
+
+def json_loads(data):
+    return {
+        record_type: [RECORD_CLASSES[record_type].from_dict(record) for record in records]
+        for record_type, records in json.loads(data).items()
+    }
+
+
+def best_of(function, repeats):
+    """Fastest of `repeats` runs in seconds, and the last result"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(count, repeats=3):
+    session = build_session(count)
+
+    json_save, json_data = best_of(lambda: json_dumps(session), repeats)
+    json_load, restored = best_of(lambda: json_loads(json_data), repeats)
+    assert len(restored["mood_entries"]) == count
+
+    snapshot_save, snapshot_data = best_of(lambda: session_snapshot.dumps(session), repeats)
+    snapshot_load, restored = best_of(lambda: session_snapshot.loads(snapshot_data), repeats)
+    mood_load, mood_only = best_of(lambda: session_snapshot.loads(snapshot_data, ["mood_entries"]), repeats)
+    for record_type, records in session.items():
+        assert [record.to_values() for record in restored[record_type]] == [record.to_values() for record in records]
+    assert list(mood_only) == ["mood_entries"]
+
+    return {
+        "records_per_type": count,
+        "json_export": {
+            "bytes": len(json_data),
+            "save_ms": round(json_save * 1000, 2),
+            "load_ms": round(json_load * 1000, 2)
+        },
+        "snapshot": {
+            "bytes": len(snapshot_data),
+            "save_ms": round(snapshot_save * 1000, 2),
+            "load_ms": round(snapshot_load * 1000, 2),
+            "mood_only_load_ms": round(mood_load * 1000, 2)
+        },
+        "size_ratio": round(len(json_data) / len(snapshot_data), 2),
+        "load_speedup": round(json_load / snapshot_load, 2),
+        "mood_only_load_speedup": round(json_load / mood_load, 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark binary session snapshots against the JSON export")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.records, args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    print(f"  records per type: {results['records_per_type']}")
+    for name in ("json_export", "snapshot"):
+        stats = results[name]
+        print(
+            f"  {name:<12} {stats['bytes']:>10} B   save {stats['save_ms']:>8} ms"
+            f"   load {stats['load_ms']:>8} ms"
+        )
+    print(f"  mood-only load {results['snapshot']['mood_only_load_ms']} ms")
+    print(
+        f"  size x{results['size_ratio']}   load x{results['load_speedup']}"
+        f"   mood-only load x{results['mood_only_load_speedup']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
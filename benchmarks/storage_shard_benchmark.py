@@ -0,0 +1,107 @@
+"""
+Sharded storage benchmark: concurrent writers against 1 vs N SQLite files
+
+Usage (from the repository root):
+    python -m benchmarks.storage_shard_benchmark --shards 4 --writers 8 --output shards.json
+
+Each writer thread plays one user saving `--rows` records one commit at a
+time (as a session does with the write-behind queue disabled) and reads
+its history back every ten saves. Throughput is compared between a single
+SQLite file and `--shards` files, and the slowest single write shows how
+long one user can be held up by the others.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from utils.storage import ShardedBackend, SQLiteBackend
+
+
+def run_writers(backend, writers, rows, payload):
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def write(user_id):
+        worst = 0.0
+        for index in range(rows):
+            start = time.perf_counter()
+            backend.append(user_id, "mood_entries", index, f"2024-01-01T00:00:{index:05d}", payload)
+            worst = max(worst, time.perf_counter() - start)
+            if index % 10 == 9:
+                backend.load(user_id, "mood_entries", limit=10)
+        with latencies_lock:
+            latencies.append(worst)
+
+    threads = [threading.Thread(target=write, args=(f"user-{index}",)) for index in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "writes_per_second": round(writers * rows / elapsed, 1),
+        "elapsed_s": round(elapsed, 3),
+        "worst_write_ms": round(max(latencies) * 1000, 2)
+    }
+
+
+def run_benchmark(shards, writers, rows, synchronous="FULL"):
+    directory = tempfile.mkdtemp(prefix="wellness-shards-")
+    payload = os.urandom(300)
+    try:
+        single = SQLiteBackend(os.path.join(directory, "single.db"), synchronous=synchronous)
+        single_stats = run_writers(single, writers, rows, payload)
+        single.close()
+
+        sharded = ShardedBackend.sqlite(os.path.join(directory, "sharded.db"), count=shards, synchronous=synchronous)
+        sharded_stats = run_writers(sharded, writers, rows, payload)
+        assert sum(sharded.count(f"user-{index}", "mood_entries") for index in range(writers)) == writers * rows
+        sharded.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "shards": shards,
+        "writers": writers,
+        "rows_per_writer": rows,
+        "synchronous": synchronous,
+        "single_file": single_stats,
+        "sharded": sharded_stats,
+        "throughput_speedup": round(sharded_stats["writes_per_second"] / single_stats["writes_per_second"], 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent writes to one vs several SQLite shards")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"])
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.shards, args.writers, args.rows, args.synchronous)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    print(f"  writers: {results['writers']}   rows each: {results['rows_per_writer']}   synchronous: {results['synchronous']}")
+    for name in ("single_file", "sharded"):
+        stats = results[name]
+        print(
+            f"  {name:<12} {stats['writes_per_second']:>10} writes/s"
+            f"   worst write {stats['worst_write_ms']:>8} ms"
+        )
+    print(f"  {results['shards']} shards: throughput x{results['throughput_speedup']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
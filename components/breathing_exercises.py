@@ -2,6 +2,7 @@ import streamlit as st
 import time
 from datetime import datetime
 import plotly.graph_objects as go
+from utils.data_manager import VIEW_CACHE_ENTRIES
 
 def render_breathing_exercises():
     """Render breathing exercises and mindfulness activities"""
@@ -131,7 +132,7 @@ def render_guided_breathing():
                 "duration": duration,
                 "cycles_completed": total_cycles
             }
-            st.session_state.breathing_sessions.append(session_data)
+            st.session_state.data_manager.save_breathing_session(session_data)
             
             st.success(f"🎉 Great job! You completed {total_cycles} cycles of {technique}!")
             st.balloons()
@@ -161,7 +162,7 @@ def render_guided_breathing():
             if st.button("💾 Save Session"):
                 session_data["relaxation_after"] = relaxation_level
                 session_data["anxiety_after"] = anxiety_level
-                st.session_state.breathing_sessions[-1] = session_data
+                st.session_state.data_manager.update_breathing_session(session_data)
                 st.success("Session saved!")
             
         except Exception as e:
@@ -482,6 +483,25 @@ def render_quick_calming():
     **Remember:** Panic attacks are temporary and will pass. You are safe.
     """)
 
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, show_spinner=False)
+def build_practice_stats(_data_manager, data_version):
+    """Practice totals, recent sessions and insights, rebuilt only when `data_version` changes"""
+    sessions = _data_manager.breathing_sessions
+    
+    techniques = [s.get("technique", "Unknown") for s in sessions]
+    relaxation_scores = [s.get('relaxation_after') for s in sessions if 'relaxation_after' in s]
+    return {
+        "total_sessions": len(sessions),
+        "total_time": sum(
+            {"1 minute": 1, "2 minutes": 2, "5 minutes": 5, "10 minutes": 10}.get(session.get("duration", "1 minute"), 1)
+            for session in sessions
+        ),
+        "first_timestamp": sessions[0]["timestamp"] if sessions else None,
+        "recent_sessions": sorted(sessions, key=lambda x: x["timestamp"], reverse=True)[:10],
+        "most_common": max(set(techniques), key=techniques.count) if techniques else None,
+        "avg_relaxation": sum(relaxation_scores) / len(relaxation_scores) if relaxation_scores else None
+    }
+
 def render_practice_tracking():
     """Track and display breathing/mindfulness practice history"""
     
@@ -494,12 +514,11 @@ def render_practice_tracking():
     
     st.subheader("📊 Your Practice History")
     
-    # Practice statistics
-    total_sessions = len(st.session_state.breathing_sessions)
-    total_time = sum(
-        {"1 minute": 1, "2 minutes": 2, "5 minutes": 5, "10 minutes": 10}.get(session.get("duration", "1 minute"), 1)
-        for session in st.session_state.breathing_sessions
-    )
+    # Practice statistics, cached until a session is added or updated
+    data_manager = st.session_state.data_manager
+    stats = build_practice_stats(data_manager, data_manager.data_version("breathing_sessions"))
+    total_sessions = stats["total_sessions"]
+    total_time = stats["total_time"]
     
     col1, col2, col3 = st.columns(3)
     
@@ -511,19 +530,13 @@ def render_practice_tracking():
     
     with col3:
         if total_sessions > 0:
-            avg_per_day = total_sessions / max(1, (datetime.now() - datetime.fromisoformat(st.session_state.breathing_sessions[0]["timestamp"])).days or 1)
+            avg_per_day = total_sessions / max(1, (datetime.now() - datetime.fromisoformat(stats["first_timestamp"])).days or 1)
             st.metric("Sessions/Day", f"{avg_per_day:.1f}")
     
     # Recent sessions
     st.markdown("### 📅 Recent Sessions")
     
-    recent_sessions = sorted(
-        st.session_state.breathing_sessions,
-        key=lambda x: x["timestamp"],
-        reverse=True
-    )[:10]
-    
-    for session in recent_sessions:
+    for session in stats["recent_sessions"]:
         timestamp = datetime.fromisoformat(session["timestamp"])
         
         with st.expander(f"{session['technique']} - {timestamp.strftime('%B %d, %Y at %I:%M %p')}"):
@@ -540,13 +553,11 @@ def render_practice_tracking():
                     st.write(f"**Anxiety Level:** {session['anxiety_after']}/10")
     
     # Practice insights
-    if len(st.session_state.breathing_sessions) >= 5:
+    if total_sessions >= 5:
         st.markdown("### 💡 Practice Insights")
         
         # Most used technique
-        techniques = [s.get("technique", "Unknown") for s in st.session_state.breathing_sessions]
-        most_common = max(set(techniques), key=techniques.count)
-        st.write(f"**Favorite technique:** {most_common}")
+        st.write(f"**Favorite technique:** {stats['most_common']}")
         
         # Practice consistency
         if total_sessions >= 7:
@@ -554,9 +565,8 @@ def render_practice_tracking():
             st.success("🌟 Great job building a consistent practice!")
         
         # Effectiveness tracking
-        relaxation_scores = [s.get('relaxation_after') for s in st.session_state.breathing_sessions if 'relaxation_after' in s]
-        if relaxation_scores:
-            avg_relaxation = sum(relaxation_scores) / len(relaxation_scores)
+        avg_relaxation = stats["avg_relaxation"]
+        if avg_relaxation is not None:
             st.write(f"**Average relaxation level:** {avg_relaxation:.1f}/10")
             
             if avg_relaxation >= 7:
@@ -1,11 +1,17 @@
 import streamlit as st
 from datetime import datetime
 from utils.openai_client import OpenAIClient
+from utils.export_service import ExportJob
+from components.export_button import render_export_button
+from utils.data_manager import VIEW_CACHE_ENTRIES
 from data.cbt_prompts import CBT_EXERCISES, COGNITIVE_DISTORTIONS
 
 def render_cbt_exercises():
     """Render CBT exercises and thought record interface"""
     
+    # A resumed session reads only what this page shows
+    st.session_state.data_manager.ensure_loaded("cbt_records")
+    
     st.header("🧠 CBT Exercises")
     st.markdown("Learn and practice Cognitive Behavioral Therapy (CBT) techniques to understand and manage your thoughts and emotions.")
     
@@ -326,6 +332,58 @@ def render_cbt_education():
         if st.button("🫁 Try Breathing Exercises"):
             st.info("Check out our 'Breathing & Mindfulness' section for guided exercises!")
 
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, show_spinner=False)
+def build_cbt_progress(_data_manager, data_version):
+    """CBT progress stats and trend chart, rebuilt only when `data_version` changes"""
+    import plotly.graph_objects as go
+    
+    cbt_records = _data_manager.records["cbt_records"]
+    
+    # Calculate average improvement
+    improvements = []
+    for record in cbt_records:
+        before = record.get("intensity_before", 5)
+        after = record.get("intensity_after", 5)
+        improvements.append(before - after)
+    
+    total_records = len(cbt_records)
+    successful_records = len([i for i in improvements if i > 0])
+    progress = {
+        "total_records": total_records,
+        "avg_improvement": sum(improvements) / len(improvements) if improvements else 0,
+        "success_rate": (successful_records / total_records * 100) if total_records > 0 else 0,
+        "recent_ids": [
+            record["id"] for record in sorted(cbt_records, key=lambda x: x.get("timestamp", ""), reverse=True)[:5]
+        ]
+    }
+    
+    # Progress visualization
+    fig = None
+    if total_records >= 3:
+        dates = [datetime.fromisoformat(r['timestamp']).date() for r in cbt_records]
+        improvements = [r.get('intensity_before', 5) - r.get('intensity_after', 5) for r in cbt_records]
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=dates,
+            y=improvements,
+            mode='lines+markers',
+            name='Emotional Improvement',
+            line=dict(color='green', width=2),
+            marker=dict(size=8)
+        ))
+        
+        fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="No change")
+        
+        fig.update_layout(
+            title="Emotional Improvement Over Time",
+            xaxis_title="Date",
+            yaxis_title="Improvement (points)",
+            height=400
+        )
+    
+    return progress, fig
+
 def render_cbt_progress():
     """Show user's CBT exercise progress and insights"""
     
@@ -335,17 +393,12 @@ def render_cbt_progress():
     
     st.subheader("📊 Your CBT Progress")
     
-    # Progress metrics
-    total_records = len(st.session_state.cbt_records)
-    
-    # Calculate average improvement
-    improvements = []
-    for record in st.session_state.cbt_records:
-        before = record.get("intensity_before", 5)
-        after = record.get("intensity_after", 5)
-        improvements.append(before - after)
-    
-    avg_improvement = sum(improvements) / len(improvements) if improvements else 0
+    # Progress metrics and chart, cached until the records change
+    data_manager = st.session_state.data_manager
+    progress, fig = build_cbt_progress(data_manager, data_manager.data_version("cbt_records"))
+    # Counted in storage: a long history may be trimmed to its newest records in session
+    total_records = data_manager.count_records("cbt_records")
+    avg_improvement = progress["avg_improvement"]
     
     col1, col2, col3 = st.columns(3)
     
@@ -356,18 +409,15 @@ def render_cbt_progress():
         st.metric("Average Improvement", f"{avg_improvement:.1f} points")
     
     with col3:
-        successful_records = len([i for i in improvements if i > 0])
-        success_rate = (successful_records / total_records * 100) if total_records > 0 else 0
-        st.metric("Success Rate", f"{success_rate:.0f}%")
+        st.metric("Success Rate", f"{progress['success_rate']:.0f}%")
+    
+    if progress["total_records"] < total_records:
+        st.caption(f"Improvement and success rate cover your {progress['total_records']} most recent records.")
     
     # Recent records
     st.markdown("### 📋 Recent Thought Records")
     
-    recent_records = sorted(
-        st.session_state.cbt_records,
-        key=lambda x: x.get("timestamp", ""),
-        reverse=True
-    )[:5]
+    recent_records = [data_manager.get_record("cbt_records", record_id) for record_id in progress["recent_ids"]]
     
     for i, record in enumerate(recent_records):
         with st.expander(f"Record {i+1}: {datetime.fromisoformat(record['timestamp']).strftime('%B %d, %Y')}"):
@@ -394,50 +444,26 @@ def render_cbt_progress():
                 insights = record['ai_insights']
                 if insights.get('encouragement'):
                     st.success(insights['encouragement'])
+            
+            # Delete option
+            if st.button("🗑️ Delete Record", key=f"delete_cbt_{record['id']}"):
+                st.session_state.data_manager.delete_record("cbt_records", record['id'])
+                st.rerun()
     
     # Progress visualization
-    if len(st.session_state.cbt_records) >= 3:
+    if fig is not None:
         st.markdown("### 📈 Improvement Trends")
-        
-        import plotly.graph_objects as go
-        
-        dates = [datetime.fromisoformat(r['timestamp']).date() for r in st.session_state.cbt_records]
-        improvements = [r.get('intensity_before', 5) - r.get('intensity_after', 5) for r in st.session_state.cbt_records]
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=dates,
-            y=improvements,
-            mode='lines+markers',
-            name='Emotional Improvement',
-            line=dict(color='green', width=2),
-            marker=dict(size=8)
-        ))
-        
-        fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="No change")
-        
-        fig.update_layout(
-            title="Emotional Improvement Over Time",
-            xaxis_title="Date",
-            yaxis_title="Improvement (points)",
-            height=400
-        )
-        
         st.plotly_chart(fig, use_container_width=True)
     
     # Export option
-    if st.button("📊 Export CBT Records"):
-        import json
-        export_data = {
+    export_job = ExportJob(
+        st.session_state.data_manager,
+        {"records": "cbt_records"},
+        header={
             "export_date": datetime.now().isoformat(),
-            "total_records": len(st.session_state.cbt_records),
-            "average_improvement": avg_improvement,
-            "records": st.session_state.cbt_records
-        }
-        
-        st.download_button(
-            label="Download CBT Data",
-            data=json.dumps(export_data, indent=2),
-            file_name=f"cbt_records_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
-        )
+            "total_records": total_records,
+            "average_improvement": avg_improvement
+        },
+        file_prefix="cbt_records"
+    )
+    render_export_button("📊 Export CBT Records", export_job, key="cbt_records")
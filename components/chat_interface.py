@@ -1,10 +1,194 @@
 import streamlit as st
 from utils.openai_client import OpenAIClient
 from utils.crisis_detection import CrisisDetector
+from utils.response_scanner import StreamingSafetyScanner
+from utils.session_manager import get_session_manager
+
+# Messages sent to the browser at once; older pages are only rendered on request
+CHAT_PAGE_SIZE = 20
+
+def render_chat_message(message):
+    """Render one stored chat message"""
+    if message["role"] == "user":
+        with st.chat_message("user"):
+            st.write(message["content"])
+    else:
+        with st.chat_message("assistant"):
+            st.write(message["content"])
+            render_risk_caption(message.get("risk_level"))
+
+def render_risk_caption(risk_level):
+    """Show the risk level indicator under an assistant message, if there is one"""
+    if risk_level and risk_level != "low":
+        risk_colors = {
+            "moderate": "🟡",
+            "high": "🟠", 
+            "critical": "🔴"
+        }
+        st.caption(f"{risk_colors.get(risk_level, '')} Support level: {risk_level}")
+
+def load_earlier_page():
+    """Reveal the next page of the transcript (button callback)"""
+    messages_shown = len(st.session_state.chat_earlier) + len(st.session_state.chat_history)
+    hidden = messages_shown - st.session_state.chat_visible
+    # Reveal in-session messages first, then fetch older ones from storage
+    if hidden < CHAT_PAGE_SIZE and st.session_state.chat_has_earlier:
+        st.session_state.data_manager.load_earlier_messages(CHAT_PAGE_SIZE)
+    st.session_state.chat_visible += CHAT_PAGE_SIZE
+
+def clear_chat():
+    st.session_state.data_manager.delete_records("chat_history")
+    st.session_state.chat_visible = CHAT_PAGE_SIZE
+
+def send_starter_message(starter_message):
+    st.session_state.data_manager.save_chat_message("user", starter_message)
+
+def render_transcript():
+    """Render the newest CHAT_PAGE_SIZE messages; earlier pages load on request"""
+    messages = [*st.session_state.chat_earlier, *st.session_state.chat_history]
+    visible = st.session_state.setdefault("chat_visible", CHAT_PAGE_SIZE)
+    
+    if len(messages) > visible or st.session_state.chat_has_earlier:
+        st.button("⬆️ Load earlier messages", on_click=load_earlier_page)
+    
+    for message in messages[-visible:]:
+        render_chat_message(message)
+
+def stream_reply(user_input, risk_assessment, crisis_detected):
+    """Stream and save the assistant's reply to the message just sent"""
+    # Generate AI response
+    conversation_history = st.session_state.data_manager.get_conversation_history()
+    
+    try:
+        # Stream the reply through the safety scanner so unsafe output is cut off mid-stream
+        scanner = StreamingSafetyScanner()
+        with st.chat_message("assistant"):
+            st.write_stream(scanner.scan(
+                st.session_state.openai_client.stream_empathetic_response(
+                    user_input, 
+                    st.session_state.current_persona,
+                    conversation_history
+                )
+            ))
+            ai_response = scanner.reply
+            
+            # Add crisis follow-up if needed; it isn't part of the stream, so show it here too
+            if crisis_detected:
+                follow_up = st.session_state.crisis_detector.get_crisis_follow_up_message(
+                    risk_assessment["final_risk_level"]
+                )
+                st.write(follow_up)
+                if ai_response:
+                    ai_response = ai_response + f"\n\n{follow_up}"
+                else:
+                    ai_response = follow_up
+            render_risk_caption(risk_assessment["final_risk_level"])
+        
+        # Save AI response with risk level
+        st.session_state.data_manager.save_chat_message(
+            "assistant", 
+            ai_response, 
+            st.session_state.current_persona,
+            risk_assessment["final_risk_level"]
+        )
+        
+    except Exception as e:
+        error_response = """
+        I'm having trouble connecting right now. Here are some things you can try:
+        
+        🔄 Refresh the page and try again
+        🫁 Try our breathing exercises
+        📝 Write in the journal section
+        🆘 If this is urgent, please call 988 or text HOME to 741741
+        """
+        
+        st.session_state.data_manager.save_chat_message("assistant", error_response)
+        with st.chat_message("assistant"):
+            st.write(error_response)
+
+@st.fragment
+def render_conversation():
+    """Transcript, message form and quick starters
+    
+    Runs as a fragment: sending a message or paging the transcript reruns
+    only this part of the page, and the transcript is drawn after the new
+    message is saved, so no extra rerun is needed to show it.
+    """
+    
+    # Fragment reruns skip app.py, so record the activity here as well
+    get_session_manager().touch(st.session_state.data_manager)
+    st.session_state.data_manager.sync()
+    st.session_state.data_manager.ensure_loaded("chat_history")
+    
+    # Chat history display
+    st.subheader("💭 Conversation")
+    
+    # Create container for chat messages (filled in once any new message is saved)
+    chat_container = st.container()
+    
+    # Chat input (a form, so typing doesn't trigger reruns)
+    st.subheader("✍️ What's on your mind?")
+    
+    with st.form("chat_form", clear_on_submit=True, border=False):
+        # Text input for user message
+        user_input = st.text_area(
+            "Share your thoughts, feelings, or what you're going through...",
+            placeholder="I've been feeling anxious about...",
+            height=100,
+            key="chat_input"
+        )
+        
+        # Send button
+        send_button = st.form_submit_button("💬 Send", type="primary")
+    
+    st.button("🗑️ Clear Chat", on_click=clear_chat)
+    
+    # Process user input
+    reply_request = None
+    if send_button and user_input.strip():
+        # Save user message
+        st.session_state.data_manager.save_chat_message("user", user_input)
+        
+        # Crisis detection
+        risk_assessment = st.session_state.crisis_detector.analyze_text_for_crisis(user_input)
+        
+        # Trigger crisis intervention if needed
+        crisis_detected = st.session_state.crisis_detector.trigger_crisis_intervention(risk_assessment)
+        reply_request = (user_input, risk_assessment, crisis_detected)
+    
+    with chat_container:
+        render_transcript()
+        if reply_request:
+            stream_reply(*reply_request)
+    
+    # Quick response buttons
+    if not st.session_state.chat_history:
+        st.subheader("🚀 Get started with...")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.button("😟 I'm feeling anxious", on_click=send_starter_message, args=(
+                "I've been feeling really anxious lately and I'm not sure how to deal with it.",
+            ))
+            st.button("😢 I'm feeling sad", on_click=send_starter_message, args=(
+                "I've been feeling sad and down recently. I could use some support.",
+            ))
+        
+        with col2:
+            st.button("😤 I'm stressed about school", on_click=send_starter_message, args=(
+                "School has been really stressful and overwhelming lately.",
+            ))
+            st.button("🤷 I'm not sure what I'm feeling", on_click=send_starter_message, args=(
+                "I'm going through something but I'm not sure exactly what I'm feeling or how to describe it.",
+            ))
 
 def render_chat_interface():
     """Render the main chat interface with crisis detection"""
     
+    # A resumed session reads only the recent chat window
+    st.session_state.data_manager.ensure_loaded("chat_history")
+    
     st.header("💬 Chat Support")
     st.markdown("Choose your support style and start a conversation. Remember, this is a safe, anonymous space.")
     
@@ -44,134 +228,8 @@ def render_chat_interface():
     
     st.info(f"Current support style: {persona_emojis[st.session_state.current_persona]} {persona_names[st.session_state.current_persona]}")
     
-    # Chat history display
-    st.subheader("💭 Conversation")
-    
-    # Create container for chat messages
-    chat_container = st.container()
-    
-    with chat_container:
-        # Display chat history
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                with st.chat_message("user"):
-                    st.write(message["content"])
-            else:
-                with st.chat_message("assistant"):
-                    st.write(message["content"])
-                    
-                    # Show risk level indicator if present
-                    if message.get("risk_level") and message["risk_level"] != "low":
-                        risk_colors = {
-                            "moderate": "🟡",
-                            "high": "🟠", 
-                            "critical": "🔴"
-                        }
-                        st.caption(f"{risk_colors.get(message['risk_level'], '')} Support level: {message['risk_level']}")
-    
-    # Chat input
-    st.subheader("✍️ What's on your mind?")
-    
-    # Text input for user message
-    user_input = st.text_area(
-        "Share your thoughts, feelings, or what you're going through...",
-        placeholder="I've been feeling anxious about...",
-        height=100,
-        key="chat_input"
-    )
-    
-    # Send button
-    col1, col2, col3 = st.columns([1, 1, 3])
-    
-    with col1:
-        send_button = st.button("💬 Send", type="primary")
-    
-    with col2:
-        if st.button("🗑️ Clear Chat"):
-            st.session_state.chat_history = []
-            st.rerun()
-    
-    # Process user input
-    if send_button and user_input.strip():
-        # Save user message
-        st.session_state.data_manager.save_chat_message("user", user_input)
-        
-        # Crisis detection
-        risk_assessment = st.session_state.crisis_detector.analyze_text_for_crisis(user_input)
-        
-        # Trigger crisis intervention if needed
-        crisis_detected = st.session_state.crisis_detector.trigger_crisis_intervention(risk_assessment)
-        
-        # Generate AI response
-        conversation_history = st.session_state.data_manager.get_conversation_history()
-        
-        try:
-            ai_response = st.session_state.openai_client.get_empathetic_response(
-                user_input, 
-                st.session_state.current_persona,
-                conversation_history
-            )
-            
-            # Add crisis follow-up if needed
-            if crisis_detected:
-                follow_up = st.session_state.crisis_detector.get_crisis_follow_up_message(
-                    risk_assessment["final_risk_level"]
-                )
-                if ai_response:
-                    ai_response = ai_response + f"\n\n{follow_up}"
-                else:
-                    ai_response = follow_up
-            
-            # Save AI response with risk level
-            st.session_state.data_manager.save_chat_message(
-                "assistant", 
-                ai_response, 
-                st.session_state.current_persona,
-                risk_assessment["final_risk_level"]
-            )
-            
-        except Exception as e:
-            error_response = """
-            I'm having trouble connecting right now. Here are some things you can try:
-            
-            🔄 Refresh the page and try again
-            🫁 Try our breathing exercises
-            📝 Write in the journal section
-            🆘 If this is urgent, please call 988 or text HOME to 741741
-            """
-            
-            st.session_state.data_manager.save_chat_message("assistant", error_response)
-        
-        # Clear input and refresh
-        st.rerun()
-    
-    # Quick response buttons
-    if not st.session_state.chat_history:
-        st.subheader("🚀 Get started with...")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("😟 I'm feeling anxious"):
-                starter_message = "I've been feeling really anxious lately and I'm not sure how to deal with it."
-                st.session_state.data_manager.save_chat_message("user", starter_message)
-                st.rerun()
-            
-            if st.button("😢 I'm feeling sad"):
-                starter_message = "I've been feeling sad and down recently. I could use some support."
-                st.session_state.data_manager.save_chat_message("user", starter_message)
-                st.rerun()
-        
-        with col2:
-            if st.button("😤 I'm stressed about school"):
-                starter_message = "School has been really stressful and overwhelming lately."
-                st.session_state.data_manager.save_chat_message("user", starter_message)
-                st.rerun()
-            
-            if st.button("🤷 I'm not sure what I'm feeling"):
-                starter_message = "I'm going through something but I'm not sure exactly what I'm feeling or how to describe it."
-                st.session_state.data_manager.save_chat_message("user", starter_message)
-                st.rerun()
+    # Transcript and input rerun as a fragment, so sending a message doesn't rerun the whole app
+    render_conversation()
     
     # Chat tips
     with st.expander("💡 Tips for getting the most out of chat support"):
@@ -0,0 +1,35 @@
+import streamlit as st
+
+def render_export_button(label, export_job, key):
+    """Two-step download for an ExportJob: prepare the file, then download it
+
+    Streamlit releases this app supports (from 1.49) only take bytes or text
+    for st.download_button, so the export is built when the prepare button
+    is clicked and kept in session state until the exported records, or the
+    export options, change.
+    """
+    data_manager = st.session_state.data_manager
+    version = (
+        data_manager.data_version(*export_job.sections.values()),
+        export_job.fmt,
+        export_job.compress
+    )
+    state_key = f"export_{key}"
+    prepared = st.session_state.get(state_key)
+
+    if prepared is None or prepared[0] != version:
+        st.button(label, key=f"{state_key}_prepare", on_click=_prepare_export, args=(state_key, version, export_job))
+        return
+
+    st.download_button(
+        label=f"💾 Download {prepared[1]}",
+        data=prepared[2],
+        file_name=prepared[1],
+        mime=export_job.mime,
+        key=f"{state_key}_download",
+        on_click="ignore"
+    )
+
+def _prepare_export(state_key, version, export_job):
+    # Replaces any earlier file, so at most one export per button is held in memory
+    st.session_state[state_key] = (version, export_job.file_name, export_job.to_bytes())
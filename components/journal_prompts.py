@@ -1,11 +1,17 @@
 import streamlit as st
 from datetime import datetime
 from utils.openai_client import OpenAIClient
+from utils.export_service import ExportJob
+from components.export_button import render_export_button
+from utils.data_manager import VIEW_CACHE_ENTRIES
 from data.journal_prompts import JOURNAL_PROMPTS, CBT_PROMPTS
 
 def render_journal_prompts():
     """Render guided journaling interface with CBT-based prompts"""
     
+    # A resumed session reads only what this page shows (journal entries as headers)
+    st.session_state.data_manager.ensure_loaded("journal_entries", "mood_entries")
+    
     st.header("📝 Guided Journaling")
     st.markdown("Explore your thoughts and feelings through guided reflection. Journaling can help you process emotions and gain insights.")
     
@@ -176,6 +182,17 @@ def render_new_journal_entry():
         if st.button("🗑️ Clear"):
             st.rerun()
 
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, show_spinner=False)
+def build_journal_index(_data_manager, data_version):
+    """Entry ids newest first and the focus areas in use, rebuilt only when `data_version` changes"""
+    sorted_entries = sorted(
+        _data_manager.records["journal_entries"],
+        key=lambda x: x["timestamp"],
+        reverse=True
+    )
+    focus_areas = list(set(entry.get("focus_area", "general") for entry in sorted_entries))
+    return [entry["id"] for entry in sorted_entries], focus_areas
+
 def render_journal_history():
     """Display previous journal entries"""
     
@@ -185,12 +202,10 @@ def render_journal_history():
     
     st.subheader("📚 Your Journal History")
     
-    # Sort entries by date (newest first)
-    sorted_entries = sorted(
-        st.session_state.journal_entries, 
-        key=lambda x: x["timestamp"], 
-        reverse=True
-    )
+    # Sort entries by date (newest first), cached until the entries change
+    data_manager = st.session_state.data_manager
+    sorted_ids, focus_areas = build_journal_index(data_manager, data_manager.data_version("journal_entries"))
+    sorted_entries = [data_manager.get_record("journal_entries", entry_id) for entry_id in sorted_ids]
     
     # Filter options
     col1, col2 = st.columns(2)
@@ -198,7 +213,7 @@ def render_journal_history():
     with col1:
         focus_filter = st.selectbox(
             "Filter by focus area:",
-            ["All"] + list(set(entry.get("focus_area", "general") for entry in sorted_entries))
+            ["All"] + focus_areas
         )
     
     with col2:
@@ -224,9 +239,7 @@ def render_journal_history():
     
     # Display entries
     for entry in filtered_entries:
-        with st.expander(
-            f"📝 {datetime.fromisoformat(entry['timestamp']).strftime('%B %d, %Y at %I:%M %p')} - {entry.get('focus_area', 'general').replace('_', ' ').title()}"
-        ):
+        with st.expander(f"📝 {datetime.fromisoformat(entry['timestamp']).strftime('%B %d, %Y at %I:%M %p')} - {entry.get('focus_area', 'general').replace('_', ' ').title()}"):
             # Prompt
             st.markdown(f"**Prompt:** {entry.get('prompt', 'Free writing')}")
             
@@ -244,38 +257,35 @@ def render_journal_history():
                 emotional_state = entry.get('emotional_state', 'Not recorded')
                 st.write(f"**Emotional State:** {emotional_state}")
             
-            # Content
-            st.markdown("**Your Writing:**")
-            st.write(entry.get('content', ''))
-            
-            # Insights
-            if entry.get('insights'):
-                st.markdown("**Your Insights:**")
-                st.write(entry.get('insights'))
+            # The full text is only fetched (and decrypted) once asked for
+            if st.toggle("Show full entry", key=f"journal_full_{entry['id']}"):
+                entry = st.session_state.data_manager.get_full_record("journal_entries", entry['id']) or entry
+                
+                # Content
+                st.markdown("**Your Writing:**")
+                st.write(entry.get('content', ''))
+                
+                # Insights
+                if entry.get('insights'):
+                    st.markdown("**Your Insights:**")
+                    st.write(entry.get('insights'))
             
             # Delete option
-            if st.button(f"🗑️ Delete Entry", key=f"delete_{entry.get('id', 0)}"):
-                st.session_state.journal_entries = [
-                    e for e in st.session_state.journal_entries 
-                    if e.get('id') != entry.get('id')
-                ]
+            if st.button(f"🗑️ Delete Entry", key=f"delete_journal_{entry['id']}"):
+                st.session_state.data_manager.delete_record("journal_entries", entry['id'])
                 st.rerun()
     
     # Export option
-    if st.button("📊 Export Journal Entries"):
-        import json
-        export_data = {
+    export_job = ExportJob(
+        st.session_state.data_manager,
+        {"entries": "journal_entries"},
+        header={
             "export_date": datetime.now().isoformat(),
-            "total_entries": len(st.session_state.journal_entries),
-            "entries": st.session_state.journal_entries
-        }
-        
-        st.download_button(
-            label="Download Journal Data",
-            data=json.dumps(export_data, indent=2),
-            file_name=f"journal_entries_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
-        )
+            "total_entries": len(st.session_state.journal_entries)
+        },
+        file_prefix="journal_entries"
+    )
+    render_export_button("📊 Export Journal Entries", export_job, key="journal_entries")
 
 def render_ai_personalized_prompts():
     """Generate AI-personalized journal prompts based on user data"""
@@ -3,10 +3,16 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import pandas as pd
+from utils.export_service import ExportJob
+from components.export_button import render_export_button
+from utils.data_manager import VIEW_CACHE_ENTRIES
 
 def render_mood_tracker():
     """Render comprehensive mood tracking interface"""
     
+    # A resumed session reads only what this page shows
+    st.session_state.data_manager.ensure_loaded("mood_entries", "mood_daily")
+    
     st.header("📊 Mood Tracker")
     st.markdown("Track your emotions and identify patterns to better understand your mental wellness journey.")
     
@@ -158,21 +164,17 @@ def render_mood_entry():
             st.session_state.data_manager.save_mood_entry(quick_mood)
             st.success("Quick mood logged!")
 
-def render_mood_trends():
-    """Render mood trends and visualizations"""
-    
-    if not st.session_state.mood_entries:
-        st.info("📈 Start logging your moods to see trends and patterns here!")
-        return
-    
-    st.subheader("📈 Your Mood Trends")
-    
-    # Get mood trends data
-    trends = st.session_state.data_manager.get_mood_trends()
-    
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, show_spinner=False)
+def build_mood_charts(_data_manager, data_version):
+    """Mood trends, stats and charts, rebuilt only when `data_version` changes
+    
+    `data_version` (DataManager.data_version) is the whole cache key; the
+    leading underscore keeps Streamlit from hashing the data manager.
+    """
+    trends = _data_manager.get_mood_trends()
+    mood_stats = _data_manager.get_mood_stats()
     if not trends["dates"]:
-        st.info("No mood data available yet. Start tracking to see your trends!")
-        return
+        return trends, mood_stats, None, None
     
     # Create mood line chart
     fig = go.Figure()
@@ -202,6 +204,44 @@ def render_mood_trends():
         height=400
     )
     
+    # Emotion frequency chart
+    emotion_fig = None
+    emotion_counts = mood_stats["emotion_counts"]
+    if emotion_counts:
+        emotions_df = pd.DataFrame(list(emotion_counts.items()), columns=["Emotion", "Count"]).sort_values("Count", ascending=True)
+        
+        emotion_fig = px.bar(
+            emotions_df,
+            x="Count",
+            y="Emotion",
+            orientation='h',
+            title="Emotion Frequency"
+        )
+        
+        emotion_fig.update_layout(height=400)
+    
+    return trends, mood_stats, fig, emotion_fig
+
+def render_mood_trends():
+    """Render mood trends and visualizations"""
+    
+    # Older history may only survive as daily rollups
+    if not st.session_state.mood_entries and not st.session_state.mood_daily:
+        st.info("📈 Start logging your moods to see trends and patterns here!")
+        return
+    
+    st.subheader("📈 Your Mood Trends")
+    
+    # Trends, precomputed stats and charts, cached until the mood data changes
+    data_manager = st.session_state.data_manager
+    trends, mood_stats, fig, emotion_fig = build_mood_charts(
+        data_manager, data_manager.data_version("mood_entries", "mood_daily")
+    )
+    
+    if fig is None:
+        st.info("No mood data available yet. Start tracking to see your trends!")
+        return
+    
     st.plotly_chart(fig, use_container_width=True)
     
     # Recent mood summary
@@ -216,49 +256,29 @@ def render_mood_trends():
         else:
             st.metric("7-Day Average", "No data")
     
+    # Over the same entries and rolled-up days as the chart
     with col2:
-        if trends["moods"]:
-            st.metric("Highest Mood", max(trends["moods"]))
+        if trends["highest"] is not None:
+            st.metric("Highest Mood", trends["highest"])
         else:
             st.metric("Highest Mood", "No data")
     
     with col3:
-        if trends["moods"]:
-            st.metric("Lowest Mood", min(trends["moods"]))
+        if trends["lowest"] is not None:
+            st.metric("Lowest Mood", trends["lowest"])
         else:
             st.metric("Lowest Mood", "No data")
     
     # Emotion frequency chart
     st.subheader("🎭 Most Common Emotions")
     
-    emotion_counts = {}
-    for entry in st.session_state.mood_entries:
-        for emotion in entry.get("emotions", []):
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-    
-    if emotion_counts:
-        emotions_data = list(emotion_counts.items())
-        if emotions_data:
-            emotions_df = pd.DataFrame(emotions_data, columns=["Emotion", "Count"]).sort_values("Count", ascending=True)
-            
-            fig = px.bar(
-                emotions_df,
-                x="Count",
-                y="Emotion",
-                orientation='h',
-                title="Emotion Frequency"
-            )
-            
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+    if emotion_fig is not None:
+        st.plotly_chart(emotion_fig, use_container_width=True)
     
     # Trigger analysis
     st.subheader("🔍 Common Triggers")
     
-    trigger_counts = {}
-    for entry in st.session_state.mood_entries:
-        for trigger in entry.get("triggers", []):
-            trigger_counts[trigger] = trigger_counts.get(trigger, 0) + 1
+    trigger_counts = mood_stats["trigger_counts"]
     
     if trigger_counts:
         # Show top 5 triggers
@@ -276,12 +296,11 @@ def render_mood_insights():
     
     st.subheader("🧠 Your Mood Insights")
     
-    # Calculate some basic insights
-    recent_entries = st.session_state.mood_entries[-10:]  # Last 10 entries
+    # Calculate some basic insights from the precomputed last-10 window
+    recent_stats = st.session_state.data_manager.get_mood_stats()["windows"][10]
     
     # Mood stability
-    mood_values = [entry["overall_mood"] for entry in recent_entries]
-    mood_range = max(mood_values) - min(mood_values)
+    mood_range = recent_stats["max"] - recent_stats["min"]
     
     if mood_range <= 2:
         stability = "Very stable"
@@ -296,36 +315,23 @@ def render_mood_insights():
     st.write(f"**Mood Stability:** {stability_color} {stability}")
     
     # Most common emotions
-    all_emotions = []
-    for entry in recent_entries:
-        all_emotions.extend(entry.get("emotions", []))
-    
-    if all_emotions:
-        emotion_counts = {}
-        for emotion in all_emotions:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
+    emotion_counts = recent_stats["emotion_counts"]
+    
+    if emotion_counts:
         top_emotion = max(emotion_counts.items(), key=lambda x: x[1])
         st.write(f"**Most frequent emotion:** {top_emotion[0].title()} ({top_emotion[1]} times)")
     
     # Trigger patterns
-    all_triggers = []
-    for entry in recent_entries:
-        all_triggers.extend(entry.get("triggers", []))
-    
-    if all_triggers:
-        trigger_counts = {}
-        for trigger in all_triggers:
-            trigger_counts[trigger] = trigger_counts.get(trigger, 0) + 1
-        
-        if trigger_counts:
-            top_trigger = max(trigger_counts.items(), key=lambda x: x[1])
-            st.write(f"**Most common trigger:** {top_trigger[0]} ({top_trigger[1]} times)")
+    trigger_counts = recent_stats["trigger_counts"]
+    
+    if trigger_counts:
+        top_trigger = max(trigger_counts.items(), key=lambda x: x[1])
+        st.write(f"**Most common trigger:** {top_trigger[0]} ({top_trigger[1]} times)")
     
     # Personalized recommendations
     st.subheader("💡 Personalized Recommendations")
     
-    avg_mood = sum(mood_values) / len(mood_values)
+    avg_mood = recent_stats["average"]
     
     if avg_mood < 4:
         st.warning("""
@@ -355,13 +361,10 @@ def render_mood_insights():
     
     # Data export option
     st.markdown("---")
-    if st.button("📊 Export Mood Data"):
-        mood_df = pd.DataFrame(st.session_state.mood_entries)
-        csv = mood_df.to_csv(index=False)
-        
-        st.download_button(
-            label="Download Mood Data CSV",
-            data=csv,
-            file_name=f"mood_data_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+    export_job = ExportJob(
+        st.session_state.data_manager,
+        {"mood_entries": "mood_entries"},
+        fmt="csv",
+        file_prefix="mood_data"
+    )
+    render_export_button("📊 Export Mood Data", export_job, key="mood_entries")
@@ -1,8 +1,15 @@
 """
 Crisis detection keywords and patterns based on evidence-based research
 Reference: Mental health chatbot crisis detection implementation best practices 2025
+
+English keywords live in this module. Other locales are stored as JSON files in
+data/lexicons/<locale>.json using the same categories and severity weights, and
+are only read from disk the first time a message in that locale is seen.
 """
 
+import json
+import os
+
 # Crisis keywords organized by severity and category
 CRISIS_KEYWORDS = {
     "suicidal_ideation": [
@@ -80,6 +87,40 @@ HIGH_RISK_PATTERNS = [
     r"\b(can't take|won't make it|end of the line)\b.*\b(anymore|through this)\b"
 ]
 
+# Content the assistant must never produce (checked while replies stream)
+UNSAFE_RESPONSE_KEYWORDS = {
+    "method_details": [
+        "lethal dose", "fatal dose", "how many pills", "painless way", "quickest way to die",
+        "easiest way to die", "tie a noose", "where to cut", "how deep to cut", "how to overdose"
+    ],
+    
+    "harm_encouragement": [
+        "you should kill yourself", "you should hurt yourself", "go ahead and kill yourself",
+        "go ahead and hurt yourself", "go ahead and end your life", "go ahead and end it all",
+        "nobody would miss you", "you're better off dead", "you are better off dead",
+        "they'd be better off without you", "you deserve to suffer"
+    ],
+    
+    "harmful_dieting": [
+        "stop eating entirely", "skip meals to lose", "how to purge", "hide your eating",
+        "eat under 500 calories"
+    ]
+}
+
+# Instructions only: a step followed directly by the harmful action. Mentions
+# ("call poison control about an overdose", "take 2 tablets with food") pass.
+# Every pattern has a bounded length (see UNSAFE_RESPONSE_PATTERN_SPAN).
+UNSAFE_RESPONSE_PATTERNS = [
+    r"\b(take|swallow)\b.{0,20}\b(all|\d{2,3})\b.{0,20}\b(pills|tablets)\b",
+    r"\b(take|swallow) enough\b.{0,20}\b(overdose|to die|not wake up)\b",
+    r"\b(step \d|first|then|next)[,:]? (tie|make)\b.{0,40}\bnoose\b",
+    r"\b(step \d|first|then|next)[,:]? cut (deeper|lengthwise)\b"
+]
+
+# Longest text any of the patterns above can match; the streaming scanner
+# holds back at least this much so an unsafe match is never partly shown
+UNSAFE_RESPONSE_PATTERN_SPAN = 64
+
 # Phrases that indicate immediate intervention needed
 IMMEDIATE_CRISIS_PHRASES = [
     "I'm going to kill myself",
@@ -159,3 +200,47 @@ SAFETY_PLANNING_ELEMENTS = {
     "environment_safety": "Making your environment safer by removing or restricting access to lethal means",
     "reasons_for_living": "Things that are important to you and worth living for"
 }
+
+# Per-locale lexicons
+DEFAULT_LOCALE = "en"
+
+LEXICON_DIR = os.path.join(os.path.dirname(__file__), "lexicons")
+
+# Common function words used to tell Latin-script locales apart
+LOCALE_MARKERS = {
+    "en": {"i", "the", "and", "to", "my", "is", "it", "me", "you", "feel", "don't", "can't", "am", "of"},
+    "es": {"el", "la", "que", "y", "de", "no", "me", "estoy", "mi", "es", "quiero", "siento", "por", "con", "muy"},
+    "fr": {"je", "le", "la", "et", "de", "ne", "pas", "suis", "mon", "ma", "est", "me", "veux", "j'ai", "plus"},
+    "pt": {"eu", "o", "a", "que", "e", "de", "não", "nao", "estou", "meu", "minha", "quero", "é", "muito", "com"}
+}
+
+# Scripts that map directly to a locale without word-level sniffing
+SCRIPT_LOCALES = {
+    "cyrillic": "ru",
+    "arabic": "ar",
+    "devanagari": "hi",
+    "cjk": "zh"
+}
+
+def available_locales():
+    """Locales with a lexicon (English plus every JSON file in LEXICON_DIR)"""
+    locales = {DEFAULT_LOCALE}
+    if os.path.isdir(LEXICON_DIR):
+        locales.update(
+            os.path.splitext(name)[0] for name in os.listdir(LEXICON_DIR) if name.endswith(".json")
+        )
+    return sorted(locales)
+
+def load_locale_keywords(locale):
+    """Load the crisis keyword lexicon for a locale (categories -> phrases)"""
+    if locale == DEFAULT_LOCALE:
+        return CRISIS_KEYWORDS
+    
+    path = os.path.join(LEXICON_DIR, f"{locale}.json")
+    with open(path, encoding="utf-8") as lexicon_file:
+        lexicon = json.load(lexicon_file)
+    
+    unknown = set(lexicon["keywords"]) - set(SEVERITY_WEIGHTS)
+    if unknown:
+        raise ValueError(f"{path}: unknown categories {sorted(unknown)}")
+    return lexicon["keywords"]
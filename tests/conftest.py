@@ -0,0 +1,20 @@
+import logging
+from datetime import datetime
+
+import pytest
+import streamlit as st
+
+from utils.data_manager import DataManager
+
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+@pytest.fixture
+def new_session():
+    """Start a fresh browser session (empty st.session_state) and return a DataManager factory"""
+    def start(storage, user_id):
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        st.session_state.session_start = datetime.now()
+        return DataManager(user_id, storage=storage)
+    return start
@@ -0,0 +1,20 @@
+import json
+import logging
+
+from utils.crisis_metrics import CrisisMetrics
+
+
+def test_log_summary_reports_the_snapshot(caplog):
+    metrics = CrisisMetrics()
+    with caplog.at_level(logging.INFO, logger="utils.crisis_metrics"):
+        metrics.log_summary()
+        assert not caplog.records
+
+        trace = {"layer_ms": {"keyword": 0.2, "pattern": 0.3, "llm": 9.0, "combine": 0.5}, "total_ms": 10.0,
+                 "first_rule": {"rule": "keyword:suicidal"}}
+        metrics.record(trace, "high")
+        summary = metrics.log_summary()
+
+    assert summary["llm_dominated"] == 1
+    logged = json.loads(caplog.records[-1].getMessage().split(": ", 1)[1])
+    assert logged == json.loads(json.dumps(summary))
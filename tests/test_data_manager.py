@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from utils.storage import EVENT_LOG, InMemoryBackend
+
+
+def save_cbt_records(data_manager, count):
+    for record in range(count):
+        data_manager.save_cbt_record({
+            "situation": f"Situation {record}", "emotions": ["anxious"], "intensity_before": 8, "intensity_after": 5
+        })
+
+
+def test_trimmed_cbt_records_reload_as_a_window(new_session):
+    storage = InMemoryBackend()
+    data_manager = new_session(storage, "anon-a")
+    save_cbt_records(data_manager, 40)
+
+    usage = data_manager.memory_usage()
+    data_manager.trim_to(sum(usage.values()) - usage["decrypt_cache"] - usage["cbt_records"] // 2)
+    window = len(data_manager.records["cbt_records"])
+    assert 0 < window < 40
+    assert "cbt_records" not in data_manager.unloaded
+    assert data_manager.count_records("cbt_records") == 40
+
+    # A reload (after another process writes, say) keeps to the newest records
+    newest = [record.id for record in data_manager.records["cbt_records"]]
+    data_manager.unloaded.add("cbt_records")
+    data_manager.ensure_loaded("cbt_records")
+    assert [record.id for record in data_manager.records["cbt_records"]] == newest
+
+
+def save_journal_entries(data_manager, count, focus_area="gratitude"):
+    for entry in range(count):
+        data_manager.save_journal_entry({"prompt": "Prompt", "content": f"Entry {entry}", "focus_area": focus_area})
+
+
+def test_history_before_the_event_log_is_checkpointed_on_first_save(new_session):
+    storage = InMemoryBackend()
+    data_manager = new_session(storage, "anon-a")
+    save_journal_entries(data_manager, 3)
+    save_cbt_records(data_manager, 2)
+    # History written before the event log existed
+    storage.delete("anon-a", EVENT_LOG, [row[0] for row in storage.load("anon-a", EVENT_LOG)])
+
+    # The next visit (same key) saves before anything builds the views
+    data_manager.views = None
+    data_manager.log_started = False
+    save_journal_entries(data_manager, 1, "stress")
+
+    views = data_manager.replay_views()
+    assert views.counts["journal_entries"] == 4
+    assert views.counts["cbt_records"] == 2
+    assert dict(views.themes) == {"gratitude": 3, "stress": 1}
+
+
+def test_purged_journal_entries_leave_the_themes(new_session):
+    storage = InMemoryBackend()
+    data_manager = new_session(storage, "anon-a")
+    save_journal_entries(data_manager, 2, "stress")
+    save_journal_entries(data_manager, 1, "gratitude")
+    assert dict(data_manager.get_journal_themes()) == {"stress": 2, "gratitude": 1}
+
+    purged = storage.purge_before("journal_entries", (datetime.now() + timedelta(days=1)).isoformat())
+    data_manager.forget_purged("journal_entries", purged["anon-a"])
+
+    assert data_manager.get_journal_themes() == []
+    assert data_manager.replay_views().journal_themes() == []
+
+
+def test_mood_trend_extremes_include_rolled_up_days(new_session):
+    data_manager = new_session(InMemoryBackend(), "anon-a")
+    for mood in (2, 9):
+        data_manager.save_mood_entry({"overall_mood": mood, "emotions": ["calm"], "triggers": []})
+    data_manager.roll_up_moods((datetime.now() + timedelta(minutes=1)).timestamp())
+    data_manager.save_mood_entry({"overall_mood": 5, "emotions": ["calm"], "triggers": []})
+
+    trends = data_manager.get_mood_trends()
+    assert trends["moods"] == [5.5, 5]
+    assert (trends["lowest"], trends["highest"]) == (2, 9)
@@ -0,0 +1,47 @@
+from utils.storage import InMemoryBackend
+
+
+def save_moods(data_manager, count):
+    for mood in range(count):
+        data_manager.save_mood_entry({"overall_mood": mood % 10 + 1, "emotions": ["calm"], "triggers": []})
+
+
+def test_resume_keeps_data_of_recovery_token_sessions(new_session):
+    storage = InMemoryBackend()
+
+    data_manager = new_session(storage, "anon-a")
+    save_moods(data_manager, 6)
+    token_a = data_manager.enable_recovery()
+    user_a = data_manager.user_id
+
+    data_manager = new_session(storage, "anon-b")
+    save_moods(data_manager, 2)
+    token_b = data_manager.enable_recovery()
+    user_b = data_manager.user_id
+
+    # A session on token B resumes A, then B, then A again: nothing is lost
+    data_manager.resume(token_a)
+    assert storage.count(user_b, "mood_entries") == 2
+    data_manager.resume(token_b)
+    assert storage.count(user_a, "mood_entries") == 6
+    data_manager.resume(token_a)
+
+    data_manager.ensure_loaded("mood_entries")
+    assert len(data_manager.records["mood_entries"]) == 6
+    assert storage.count(user_b, "mood_entries") == 2
+
+
+def test_resume_discards_anonymous_session(new_session):
+    storage = InMemoryBackend()
+
+    data_manager = new_session(storage, "anon-a")
+    save_moods(data_manager, 3)
+    token = data_manager.enable_recovery()
+
+    data_manager = new_session(storage, "anon-b")
+    save_moods(data_manager, 4)
+    data_manager.resume(token)
+
+    assert storage.count("anon-b", "mood_entries") == 0
+    data_manager.ensure_loaded("mood_entries")
+    assert len(data_manager.records["mood_entries"]) == 3
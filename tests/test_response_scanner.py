@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from data.crisis_keywords import UNSAFE_RESPONSE_PATTERN_SPAN, UNSAFE_RESPONSE_PATTERNS
+from utils.response_scanner import SAFE_REPLACEMENT_MESSAGE, StreamingSafetyScanner
+
+
+def stream(text, chunk_size=3):
+    scanner = StreamingSafetyScanner()
+    shown = "".join(scanner.scan(text[start:start + chunk_size] for start in range(0, len(text), chunk_size)))
+    return scanner, shown
+
+
+@pytest.mark.parametrize("reply", [
+    "Journaling sounds like a great idea - go ahead and do it tonight!",
+    "If you think someone took too much, first call poison control about a possible overdose.",
+    "Take 2 tablets with water, as your doctor prescribed.",
+    "Next, make a list of three things that went well today."
+])
+def test_safe_replies_pass(reply):
+    scanner, shown = stream(reply)
+    assert not scanner.cut_off
+    # Crisis topics (an overdose) only get resources appended
+    assert shown == scanner.reply
+    assert scanner.reply.startswith(reply)
+
+
+@pytest.mark.parametrize("reply", [
+    "Okay. First, tie the rope into a noose and then",
+    "You could swallow all of the pills at once",
+    "Then cut deeper so that",
+    "Honestly, go ahead and end your life."
+])
+def test_unsafe_replies_are_cut_off(reply):
+    scanner, shown = stream(reply)
+    assert scanner.cut_off
+    assert scanner.reply == SAFE_REPLACEMENT_MESSAGE
+
+
+def test_unsafe_match_is_never_partly_shown():
+    preamble = "I hear how much pain you're in, and I want to help you through this. " * 3
+    scanner, shown = stream(preamble + "Step 1: make sure the rope is strong enough for a noose.", chunk_size=1)
+    assert scanner.cut_off
+    assert shown.endswith(SAFE_REPLACEMENT_MESSAGE)
+    assert "step" not in shown.lower()
+
+
+def test_pattern_span_covers_every_pattern():
+    for pattern in UNSAFE_RESPONSE_PATTERNS:
+        assert re._parser.parse(pattern).getwidth()[1] <= UNSAFE_RESPONSE_PATTERN_SPAN
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.retention import RetentionCompactor
+from utils.storage import EVENT_LOG, STORAGE_TABLES, InMemoryBackend, SQLiteBackend
+
+
+def store(storage, user_id, days_ago, record_types=STORAGE_TABLES):
+    timestamp = (datetime.now() - timedelta(days=days_ago)).isoformat()
+    for record_type in record_types:
+        storage.append(user_id, record_type, storage.reserve_ids(user_id, record_type), timestamp, b"payload")
+
+
+@pytest.mark.parametrize("make_storage", [InMemoryBackend, lambda: SQLiteBackend(":memory:")])
+def test_idle_users_are_deleted_with_every_record_type(make_storage):
+    storage = make_storage()
+    store(storage, "idle", 400)
+    store(storage, "active", 400)
+    # A recent event (a delete, say) keeps a user whose records are all old
+    store(storage, "active", 1, [EVENT_LOG])
+
+    report = RetentionCompactor(storage, retention={}, idle_days=365, pause=0).run_once()
+
+    assert report["expired_users"] == 1
+    assert not any(storage.count("idle", record_type) for record_type in STORAGE_TABLES)
+    assert all(storage.count("active", record_type) for record_type in STORAGE_TABLES)
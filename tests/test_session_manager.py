@@ -0,0 +1,44 @@
+import gc
+
+import streamlit as st
+
+from utils.session_manager import SessionManager
+from utils.storage import InMemoryBackend
+
+
+def end_session():
+    # Streamlit dropping the session drops its state, and with it the DataManager
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    gc.collect()
+
+
+def test_ended_anonymous_session_is_deleted(new_session, tmp_path):
+    storage = InMemoryBackend()
+    manager = SessionManager(directory=str(tmp_path), reap_interval=3600)
+
+    data_manager = new_session(storage, "anon-a")
+    data_manager.save_mood_entry({"overall_mood": 6, "emotions": ["calm"], "triggers": []})
+    manager.touch(data_manager)
+    del data_manager
+    end_session()
+
+    assert manager.delete_ended_sessions() == 1
+    assert storage.count("anon-a", "mood_entries") == 0
+
+
+def test_ended_recovery_session_is_kept(new_session, tmp_path):
+    storage = InMemoryBackend()
+    manager = SessionManager(directory=str(tmp_path), reap_interval=3600)
+
+    data_manager = new_session(storage, "anon-a")
+    data_manager.save_mood_entry({"overall_mood": 6, "emotions": ["calm"], "triggers": []})
+    manager.touch(data_manager)
+    data_manager.enable_recovery()
+    manager.touch(data_manager)
+    user_id = data_manager.user_id
+    del data_manager
+    end_session()
+
+    assert manager.delete_ended_sessions() == 0
+    assert storage.count(user_id, "mood_entries") == 1
@@ -0,0 +1,33 @@
+from utils import session_snapshot
+from utils.records import CBTRecord, ChatMessage, MoodDailyRollup
+
+
+def test_cbt_emotions_round_trip_as_lists():
+    records = [
+        CBTRecord(id=0, situation="Exam", emotions=["anxious", "sad"], intensity_before=8, intensity_after=4, ts=1),
+        CBTRecord(id=1, situation="Call", emotions=[], ts=2),
+        # Records written before emotions became a multiselect hold a plain string
+        CBTRecord(id=2, situation="Work", emotions="stressed", ts=3)
+    ]
+    restored = session_snapshot.loads(session_snapshot.dumps({"cbt_records": records}))["cbt_records"]
+    assert [record.to_values() for record in restored] == [record.to_values() for record in records]
+
+
+def test_mood_rollup_counts_round_trip():
+    rollups = [MoodDailyRollup(id=0, day="2024-01-01", count=2, mood_sum=9, mood_min=4, mood_max=5,
+                               emotion_counts={"calm": 2}, trigger_counts={}, ts=1704067200)]
+    restored = session_snapshot.loads(session_snapshot.dumps({"mood_daily": rollups}))["mood_daily"]
+    assert restored[0].emotion_counts == {"calm": 2}
+    assert restored[0].average == 4.5
+
+
+def test_text_columns_keep_none_empty_and_nul_values():
+    messages = [
+        ChatMessage(id=0, role="user", content="Hello", ts=1),
+        ChatMessage(id=1, role="assistant", content="", persona=None, ts=2),
+        ChatMessage(id=2, role="assistant", content=None, ts=3)
+    ]
+    for content in ("Plain text", "Text with a \0 inside"):
+        messages[0] = ChatMessage(id=0, role="user", content=content, ts=1)
+        restored = session_snapshot.loads(session_snapshot.dumps({"chat_history": messages}))["chat_history"]
+        assert [message.to_values() for message in restored] == [message.to_values() for message in messages]
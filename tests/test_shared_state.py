@@ -0,0 +1,65 @@
+import json
+import logging
+import re
+from http.cookies import SimpleCookie
+
+import pytest
+import streamlit as st
+
+from utils import shared_state
+from utils.recovery import derive_session, new_recovery_token
+
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+@pytest.fixture
+def browser(monkeypatch):
+    """A browser session: cookies it sends, and cookies the app's component sets"""
+    class Browser:
+        def __init__(self):
+            self.cookies = {}
+
+        def visit(self):
+            # A new script run in a new Streamlit session, sending the browser's cookies
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            return shared_state.session_token()
+
+        def run_script(self, html, height=None):
+            # What the component's iframe does with parent.document.cookie
+            assignment = re.search(r"parent\.document\.cookie = (\".*?\")", html).group(1)
+            for name, morsel in SimpleCookie(json.loads(assignment)).items():
+                assert morsel["path"] == "/"
+                assert morsel["samesite"] == "Strict"
+                self.cookies[name] = morsel.value
+
+    client = Browser()
+    monkeypatch.setattr(type(st.context), "cookies", property(lambda self: dict(client.cookies)))
+    monkeypatch.setattr(shared_state.components, "html", client.run_script)
+    return client
+
+
+def test_session_cookie_round_trip(browser):
+    token = browser.visit()
+    shared_state.write_session_cookie()
+
+    # Another process behind the load balancer gets the same token, so the same storage id and key
+    assert browser.visit() == token
+    assert derive_session(browser.visit()) == derive_session(token)
+
+
+def test_set_session_token_replaces_cookie(browser):
+    browser.visit()
+    recovery_token = new_recovery_token()
+    shared_state.set_session_token(recovery_token.lower().replace("-", " "))
+
+    assert derive_session(browser.visit()) == derive_session(recovery_token)
+
+
+def test_invalid_cookie_mints_new_token(browser):
+    browser.cookies[shared_state.SESSION_COOKIE] = "not a token!"
+    token = browser.visit()
+
+    assert token != "not a token!"
+    shared_state.write_session_cookie()
+    assert browser.visit() == token
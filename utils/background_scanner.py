@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from collections import defaultdict
+
+RISK_LEVELS = ["low", "moderate", "high", "critical"]
+
+class BackgroundCrisisScanner:
+    """Checks saved journal and CBT text for crisis signals off the script thread"""
+
+    def __init__(self, crisis_detector, batch_size=16, batch_window=0.5):
+        self.crisis_detector = crisis_detector
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+        self._queue = queue.Queue()
+        self._findings = defaultdict(list)
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, session_id, record_type, record_id, text):
+        """Queue text for scanning; returns immediately"""
+        if not text or not text.strip():
+            return
+
+        self._ensure_worker()
+        self._queue.put({
+            "session_id": session_id,
+            "record_type": record_type,
+            "record_id": record_id,
+            "text": text
+        })
+
+    def pop_findings(self, session_id):
+        """Return and clear findings for a session, most severe first"""
+        with self._lock:
+            findings = self._findings.pop(session_id, [])
+        return sorted(
+            findings,
+            key=lambda finding: RISK_LEVELS.index(finding["assessment"]["final_risk_level"]),
+            reverse=True
+        )
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="crisis-scanner", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+
+            # Collect a batch so flagged items share a single LLM call
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._scan_batch(batch)
+            except Exception:
+                # A failed batch must never take the worker down
+                pass
+
+    def _scan_batch(self, batch):
+        detector = self.crisis_detector
+        flagged = []
+
+        # Rule-based layers are cheap enough to run on every item
+        for item in batch:
+            keyword_risk = detector._keyword_based_detection(item["text"])
+            pattern_risk = detector._pattern_based_detection(item["text"])
+            if keyword_risk["risk_level"] != "low" or pattern_risk["risk_level"] != "low":
+                flagged.append((item, keyword_risk, pattern_risk))
+
+        if not flagged:
+            return
+
+        # One LLM call confirms every flagged item in the batch
+        ai_results = detector.openai_client.analyze_risk_batch([item["text"] for item, _, _ in flagged])
+
+        for (item, keyword_risk, pattern_risk), ai_analysis in zip(flagged, ai_results):
+            assessment = detector._combine_risk_assessments(keyword_risk, ai_analysis, pattern_risk)
+            if not assessment["requires_intervention"]:
+                continue
+
+            with self._lock:
+                self._findings[item["session_id"]].append({
+                    "record_type": item["record_type"],
+                    "record_id": item["record_id"],
+                    "assessment": assessment
+                })
+
+_scanner = None
+_scanner_lock = threading.Lock()
+
+def get_background_scanner(crisis_detector):
+    """Process-wide scanner shared by all sessions"""
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            _scanner = BackgroundCrisisScanner(crisis_detector)
+        return _scanner
@@ -1,37 +1,129 @@
+import os
 import re
+import time
 import streamlit as st
 from utils.openai_client import OpenAIClient
-from data.crisis_keywords import CRISIS_KEYWORDS, SEVERITY_WEIGHTS
+from utils.crisis_metrics import crisis_metrics
+from utils.crisis_matcher import detect_locale, get_crisis_automaton
+from data.crisis_keywords import (
+    CRISIS_KEYWORDS, SEVERITY_WEIGHTS, HIGH_RISK_PATTERNS, IMMEDIATE_CRISIS_PHRASES, DEFAULT_LOCALE
+)
 
 class CrisisDetector:
-    def __init__(self):
-        self.openai_client = OpenAIClient()
+    def __init__(self, openai_client=None):
+        self.openai_client = openai_client or OpenAIClient()
         self.crisis_keywords = CRISIS_KEYWORDS
         self.severity_weights = SEVERITY_WEIGHTS
+        self.high_risk_patterns = [re.compile(pattern) for pattern in HIGH_RISK_PATTERNS]
+        self.immediate_crisis_phrases = [phrase.lower() for phrase in IMMEDIATE_CRISIS_PHRASES]
+        
+        # Decision tracing is opt-in; when off the only cost is this flag check
+        self.trace_enabled = os.getenv("CRISIS_TRACE", "").lower() in ("1", "true", "yes")
+        self.metrics = crisis_metrics
     
-    def analyze_text_for_crisis(self, text):
+    def analyze_text_for_crisis(self, text, trace=None):
         """Multi-layered crisis detection system"""
         
+        if trace is None:
+            trace = self.trace_enabled
+        if trace:
+            return self._traced_analysis(text)
+        
         # Layer 1: Keyword-based detection
         keyword_risk = self._keyword_based_detection(text)
         
-        # Layer 2: AI-powered sentiment and risk analysis
+        # Layer 2: Contextual pattern detection
+        pattern_risk = self._pattern_based_detection(text)
+        
+        # Layer 3: AI-powered sentiment and risk analysis
+        ai_analysis = self.openai_client.analyze_sentiment_and_risk(text)
+        
+        # Layer 4: Combined risk assessment
+        combined_risk = self._combine_risk_assessments(keyword_risk, ai_analysis, pattern_risk)
+        
+        return combined_risk
+    
+    def _traced_analysis(self, text):
+        """Run the detection layers while recording timings and the decision path"""
+        layer_ms = {}
+        
+        started = time.perf_counter()
+        keyword_risk = self._keyword_based_detection(text)
+        layer_ms["keyword"] = (time.perf_counter() - started) * 1000
+        
+        layer_started = time.perf_counter()
+        pattern_risk = self._pattern_based_detection(text)
+        layer_ms["pattern"] = (time.perf_counter() - layer_started) * 1000
+        
+        layer_started = time.perf_counter()
         ai_analysis = self.openai_client.analyze_sentiment_and_risk(text)
+        layer_ms["llm"] = (time.perf_counter() - layer_started) * 1000
         
-        # Layer 3: Combined risk assessment
-        combined_risk = self._combine_risk_assessments(keyword_risk, ai_analysis)
+        layer_started = time.perf_counter()
+        combined_risk = self._combine_risk_assessments(keyword_risk, ai_analysis, pattern_risk)
+        layer_ms["combine"] = (time.perf_counter() - layer_started) * 1000
+        
+        trace = {
+            "layer_ms": {layer: round(elapsed, 4) for layer, elapsed in layer_ms.items()},
+            "total_ms": round((time.perf_counter() - started) * 1000, 4),
+            "matched_rules": self._matched_rules(keyword_risk, pattern_risk),
+            "decision_path": self._decision_path(keyword_risk, pattern_risk, ai_analysis, combined_risk)
+        }
+        trace["first_rule"] = trace["matched_rules"][0] if trace["matched_rules"] else None
+        
+        combined_risk["trace"] = trace
+        self.metrics.record(trace, combined_risk["final_risk_level"])
         
         return combined_risk
     
-    def _keyword_based_detection(self, text):
+    def _matched_rules(self, keyword_risk, pattern_risk):
+        """List every rule that fired, in evaluation order"""
+        rules = [
+            {"layer": "keyword", "rule": keyword, "category": category}
+            for keyword, category in keyword_risk["detected_keywords"]
+        ]
+        rules.extend(
+            {"layer": "pattern", "rule": phrase, "category": "immediate_crisis_phrase"}
+            for phrase in pattern_risk["matched_phrases"]
+        )
+        rules.extend(
+            {"layer": "pattern", "rule": pattern, "category": "high_risk_pattern"}
+            for pattern in pattern_risk["matched_patterns"]
+        )
+        return rules
+    
+    def _decision_path(self, keyword_risk, pattern_risk, ai_analysis, combined_risk):
+        """Describe how the final risk level was reached"""
+        path = [
+            f"keyword:{keyword_risk['risk_level']} (score {keyword_risk['score']})",
+            f"pattern:{pattern_risk['risk_level']}",
+            f"llm:{ai_analysis.get('risk_level', 'unknown')}"
+        ]
+        
+        final_level = combined_risk["final_risk_level"]
+        deciding_layers = [
+            layer for layer, level in (
+                ("keyword", keyword_risk["risk_level"]),
+                ("pattern", pattern_risk["risk_level"]),
+                ("llm", ai_analysis.get("risk_level"))
+            ) if level == final_level
+        ]
+        path.append(f"final:{final_level} via {', '.join(deciding_layers) or 'default'}")
+        return path
+    
+    def _keyword_based_detection(self, text, locale=None):
         """Detect crisis keywords and calculate risk score"""
-        text_lower = text.lower()
         detected_keywords = []
         total_score = 0
         
-        for category, keywords in self.crisis_keywords.items():
-            for keyword in keywords:
-                if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower):
+        # English is always checked since code-switching into English is common
+        locale = locale or detect_locale(text)
+        locales = [locale] if locale == DEFAULT_LOCALE else [locale, DEFAULT_LOCALE]
+        
+        # Single pass per locale; each keyword counts once however often it appears
+        for current_locale in locales:
+            for _, _, keyword, category in get_crisis_automaton(current_locale).find_all(text):
+                if (keyword, category) not in detected_keywords:
                     detected_keywords.append((keyword, category))
                     total_score += self.severity_weights.get(category, 1)
         
@@ -49,28 +141,59 @@ class CrisisDetector:
             "risk_level": risk_level,
             "score": total_score,
             "detected_keywords": detected_keywords,
+            "locale": locale,
             "method": "keyword_analysis"
         }
     
-    def _combine_risk_assessments(self, keyword_risk, ai_analysis):
+    def _pattern_based_detection(self, text):
+        """Detect high-risk context patterns and immediate crisis phrases"""
+        text_lower = text.lower()
+        
+        matched_phrases = [
+            phrase for phrase in self.immediate_crisis_phrases if phrase in text_lower
+        ]
+        matched_patterns = [
+            pattern.pattern for pattern in self.high_risk_patterns if pattern.search(text_lower)
+        ]
+        
+        # Immediate crisis phrases always escalate; context patterns indicate high risk
+        if matched_phrases:
+            risk_level = "critical"
+        elif matched_patterns:
+            risk_level = "high"
+        else:
+            risk_level = "low"
+        
+        return {
+            "risk_level": risk_level,
+            "matched_phrases": matched_phrases,
+            "matched_patterns": matched_patterns,
+            "method": "pattern_analysis"
+        }
+    
+    def _combine_risk_assessments(self, keyword_risk, ai_analysis, pattern_risk=None):
         """Combine multiple risk assessment methods"""
         
         # Risk level hierarchy: critical > high > moderate > low
         risk_levels = ["low", "moderate", "high", "critical"]
         
-        keyword_level_idx = risk_levels.index(keyword_risk["risk_level"])
-        ai_level_idx = risk_levels.index(ai_analysis["risk_level"])
+        layer_levels = [keyword_risk["risk_level"], ai_analysis.get("risk_level", "moderate")]
+        if pattern_risk:
+            layer_levels.append(pattern_risk["risk_level"])
         
-        # Take the higher risk level
-        combined_level = risk_levels[max(keyword_level_idx, ai_level_idx)]
+        # Take the higher risk level (unknown AI levels count as moderate)
+        combined_level = risk_levels[max(
+            risk_levels.index(level) if level in risk_levels else 1 for level in layer_levels
+        )]
         
-        # If either method detects critical risk, escalate immediately
-        if keyword_risk["risk_level"] == "critical" or ai_analysis["risk_level"] == "critical":
+        # If any method detects critical risk, escalate immediately
+        if "critical" in layer_levels:
             combined_level = "critical"
         
         return {
             "final_risk_level": combined_level,
             "keyword_analysis": keyword_risk,
+            "pattern_analysis": pattern_risk,
             "ai_analysis": ai_analysis,
             "requires_intervention": combined_level in ["high", "critical"],
             "immediate_crisis": combined_level == "critical"
@@ -0,0 +1,195 @@
+from collections import deque
+from functools import lru_cache
+
+from data.crisis_keywords import (
+    DEFAULT_LOCALE, LOCALE_MARKERS, SCRIPT_LOCALES, UNSAFE_RESPONSE_KEYWORDS,
+    available_locales, load_locale_keywords
+)
+
+def _is_word_char(char):
+    return char is not None and (char.isalnum() or char == "_")
+
+def _is_boundary(left, right):
+    """Equivalent of the regex \\b assertion between two characters (None = text edge)"""
+    return _is_word_char(left) != _is_word_char(right)
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds whole-word lexicon phrases in one pass"""
+
+    def __init__(self, lexicon):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self.max_phrase_length = 0
+
+        for category, phrases in lexicon.items():
+            for phrase in phrases:
+                self._add_phrase(phrase.lower(), category)
+        self._build_failure_links()
+
+    def _add_phrase(self, phrase, category):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append((phrase, category))
+        self.max_phrase_length = max(self.max_phrase_length, len(phrase))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+
+                # Inherit shorter phrases ending at the same position
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def step(self, state, char):
+        """Advance the automaton by one (lowercased) character"""
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+
+    def outputs(self, state):
+        return self._output[state]
+
+    def find_all(self, text):
+        """Return (start, end, phrase, category) for every whole-word match"""
+        stream = self.stream()
+        matches = stream.feed(text)
+        matches.extend(stream.finish())
+        return matches
+
+    def stream(self):
+        """Create an incremental matcher that keeps state between chunks"""
+        return KeywordStream(self)
+
+class KeywordStream:
+    """Incremental matcher over text that arrives in chunks"""
+
+    def __init__(self, automaton):
+        self.automaton = automaton
+        self.state = 0
+        self.position = 0
+        # Enough history to check the word boundary before the longest phrase
+        self._history = deque(maxlen=automaton.max_phrase_length + 1)
+        # Matches ending on the last character seen, waiting for the next one
+        self._pending = []
+
+    def feed(self, chunk):
+        """Consume a chunk and return the matches that are now confirmed"""
+        confirmed = []
+        automaton = self.automaton
+
+        for char in chunk.lower():
+            if self._pending:
+                confirmed.extend(self._resolve_pending(char))
+
+            self._history.append(char)
+            self.state = automaton.step(self.state, char)
+
+            for phrase, category in automaton.outputs(self.state):
+                start = self.position - len(phrase) + 1
+                before = self._history[-len(phrase) - 1] if start > 0 else None
+                if _is_boundary(before, phrase[0]):
+                    self._pending.append((start, self.position + 1, phrase, category))
+
+            self.position += 1
+
+        return confirmed
+
+    def finish(self):
+        """Flush matches that end at the end of the text"""
+        return self._resolve_pending(None)
+
+    def _resolve_pending(self, next_char):
+        resolved = [match for match in self._pending if _is_boundary(match[2][-1], next_char)]
+        self._pending = []
+        return resolved
+
+class RollingPatternWindow:
+    """Evaluates regex patterns over streamed text using a bounded look-back window"""
+
+    def __init__(self, patterns, window_size=200):
+        self.patterns = patterns
+        self.window_size = window_size
+        self._window = ""
+
+    def feed(self, chunk):
+        """Return patterns that match text ending inside the new chunk"""
+        text = self._window + chunk.lower()
+        new_text_start = len(self._window)
+
+        matched = []
+        for pattern in self.patterns:
+            for match in pattern.finditer(text):
+                if match.end() > new_text_start:
+                    matched.append(pattern.pattern)
+                    break
+
+        self._window = text[-self.window_size:]
+        return matched
+
+@lru_cache(maxsize=None)
+def get_crisis_automaton(locale=DEFAULT_LOCALE):
+    """Compiled automaton for a locale's crisis lexicon, built on first use"""
+    return KeywordAutomaton(load_locale_keywords(locale))
+
+@lru_cache(maxsize=1)
+def _known_locales():
+    return frozenset(available_locales())
+
+def _script_of(char):
+    code = ord(char)
+    if 0x0400 <= code <= 0x04FF:
+        return "cyrillic"
+    if 0x0600 <= code <= 0x06FF:
+        return "arabic"
+    if 0x0900 <= code <= 0x097F:
+        return "devanagari"
+    if 0x4E00 <= code <= 0x9FFF or 0x3040 <= code <= 0x30FF or 0xAC00 <= code <= 0xD7AF:
+        return "cjk"
+    return None
+
+def detect_locale(text, sample_size=300):
+    """Cheaply guess the locale of a message from its script and function words"""
+    sample = text[:sample_size]
+    
+    # Non-Latin scripts decide the locale on their own
+    script_counts = {}
+    for char in sample:
+        if char.isalpha() and ord(char) > 0x024F:
+            script = _script_of(char)
+            if script:
+                script_counts[script] = script_counts.get(script, 0) + 1
+    if script_counts:
+        locale = SCRIPT_LOCALES[max(script_counts, key=script_counts.get)]
+        return locale if locale in _known_locales() else DEFAULT_LOCALE
+    
+    # Latin script: score function-word hits per locale; a non-default locale
+    # needs at least two hits so short English messages never load other lexicons
+    words = [word.strip(".,!?¡¿;:\"()") for word in sample.lower().split()]
+    best_locale, best_hits = DEFAULT_LOCALE, 1
+    for locale, markers in LOCALE_MARKERS.items():
+        hits = sum(1 for word in words if word in markers)
+        if hits > best_hits and locale in _known_locales():
+            best_locale, best_hits = locale, hits
+    return best_locale
+
+@lru_cache(maxsize=None)
+def get_unsafe_response_automaton():
+    """Compiled automaton for content the assistant must never send"""
+    return KeywordAutomaton(UNSAFE_RESPONSE_KEYWORDS)
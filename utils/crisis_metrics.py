@@ -0,0 +1,91 @@
+import json
+import logging
+import threading
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+LAYERS = ["keyword", "pattern", "llm", "combine"]
+
+class CrisisMetrics:
+    """Process-wide aggregation of crisis detection traces"""
+
+    def __init__(self, max_samples=1000, llm_dominance_ratio=0.5):
+        self.max_samples = max_samples
+        self.llm_dominance_ratio = llm_dominance_ratio
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all aggregated metrics"""
+        with self._lock:
+            self.assessments = 0
+            self.llm_dominated = 0
+            self.layer_totals_ms = {layer: 0.0 for layer in LAYERS}
+            self.layer_samples_ms = {layer: deque(maxlen=self.max_samples) for layer in LAYERS}
+            self.total_samples_ms = deque(maxlen=self.max_samples)
+            self.final_levels = Counter()
+            self.first_rules = Counter()
+
+    def record(self, trace, final_risk_level):
+        """Fold a single assessment trace into the process metrics"""
+        layer_ms = trace["layer_ms"]
+        total_ms = trace["total_ms"]
+
+        with self._lock:
+            self.assessments += 1
+            for layer, elapsed in layer_ms.items():
+                self.layer_totals_ms[layer] += elapsed
+                self.layer_samples_ms[layer].append(elapsed)
+            self.total_samples_ms.append(total_ms)
+
+            # Flag assessments where waiting on the LLM was most of the latency
+            if total_ms and layer_ms.get("llm", 0.0) / total_ms >= self.llm_dominance_ratio:
+                self.llm_dominated += 1
+
+            self.final_levels[final_risk_level] += 1
+            if trace["first_rule"]:
+                self.first_rules[trace["first_rule"]["rule"]] += 1
+
+    def snapshot(self):
+        """Return a JSON-serializable summary of the aggregated metrics"""
+        with self._lock:
+            total_ms = sum(self.layer_totals_ms.values())
+            return {
+                "assessments": self.assessments,
+                "llm_dominated": self.llm_dominated,
+                "llm_dominated_ratio": round(self.llm_dominated / self.assessments, 4) if self.assessments else 0.0,
+                "layer_share": {
+                    layer: round(elapsed / total_ms, 4) if total_ms else 0.0
+                    for layer, elapsed in self.layer_totals_ms.items()
+                },
+                "layer_latency_ms": {
+                    layer: _percentiles(samples) for layer, samples in self.layer_samples_ms.items()
+                },
+                "total_latency_ms": _percentiles(self.total_samples_ms),
+                "final_levels": dict(self.final_levels),
+                "top_first_rules": self.first_rules.most_common(10)
+            }
+
+    def log_summary(self):
+        """Log the snapshot at INFO if anything was assessed; the retention compactor calls this after each pass"""
+        summary = self.snapshot()
+        if summary["assessments"]:
+            logger.info("Crisis detection metrics: %s", json.dumps(summary))
+        return summary
+
+def _percentiles(samples):
+    """p50/p90/p99 over the retained samples"""
+    if not samples:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0}
+
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": round(ordered[int(last * 0.50)], 4),
+        "p90": round(ordered[int(last * 0.90)], 4),
+        "p99": round(ordered[int(last * 0.99)], 4)
+    }
+
+# Shared by every CrisisDetector in this process
+crisis_metrics = CrisisMetrics()
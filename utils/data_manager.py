@@ -1,27 +1,111 @@
 import json
 import streamlit as st
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from cryptography.fernet import Fernet
 import base64
+import itertools
 import os
+import shutil
+import threading
+import time
+import uuid
+from utils.storage import EVENT_LOG, RECORD_TABLES, get_default_backend
+from utils.lru import LRUCache
+from utils.mood_store import MoodColumns
+from utils.mood_aggregates import MoodAggregates
+from utils.event_log import COUNTED_TYPES, MaterializedViews
+from utils.export_service import ExportJob
+from utils.import_service import iter_import_batches
+from utils.snapshots import DEFAULT_COMPRESSION, SNAPSHOT_DIR, SNAPSHOT_FORMATS, write_snapshot
+from utils.session_manager import estimate_bytes
+from utils import session_snapshot
+from utils.recovery import derive_session, new_recovery_token
+from utils.shared_state import shared_state_enabled
+from utils.records import (
+    RECORD_CLASSES, Record, RecordCollection, ChatMessage, MoodEntry, JournalEntry, CBTRecord, CrisisEvent,
+    MoodDailyRollup, Event
+)
+
+# Record class for everything DataManager stores, including its event log
+STORED_CLASSES = {**RECORD_CLASSES, EVENT_LOG: Event}
+
+# Record ids are reserved from storage in blocks, so most saves need no extra round trip
+ID_BLOCK_SIZE = 64
+
+# Chat messages kept in session for rendering and AI context; older ones stay in storage
+CHAT_WINDOW = int(os.getenv("WELLNESS_CHAT_WINDOW", "50"))
+
+# Results kept by each st.cache_data function keyed on DataManager.data_version()
+VIEW_CACHE_ENTRIES = int(os.getenv("WELLNESS_VIEW_CACHE_ENTRIES", "256"))
+
+# Data versions are drawn from one process-wide counter, so a version is never
+# reused, not even by another session of the same user: st.cache_data is shared
+# by every session in the process
+_data_versions = itertools.count(1)
 
 class DataManager:
-    def __init__(self, user_id):
+    def __init__(self, user_id, background_scanner=None, storage=None):
         self.user_id = user_id
+        self.background_scanner = background_scanner
+        self.storage = storage or get_default_backend()
         self.encryption_key = self._get_or_create_encryption_key()
         self.fernet = Fernet(self.encryption_key)
         
-        # Initialize session state data structures
-        if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = []
-        if 'mood_entries' not in st.session_state:
-            st.session_state.mood_entries = []
-        if 'journal_entries' not in st.session_state:
-            st.session_state.journal_entries = []
-        if 'cbt_records' not in st.session_state:
-            st.session_state.cbt_records = []
-        if 'crisis_events' not in st.session_state:
-            st.session_state.crisis_events = []
+        # Decrypted records, so repeated reads don't decrypt the same rows again
+        self.decrypt_cache = LRUCache(maxsize=int(os.getenv("WELLNESS_DECRYPT_CACHE_SIZE", "2048")))
+        
+        # Unused ids reserved from storage: record type -> [next id, end of block]
+        self._id_blocks = {}
+        
+        # Storage version of each record type as of the session's copy (see sync()),
+        # read before loading so a concurrent write can only cause an extra reload
+        self.shared_state = shared_state_enabled()
+        self.versions = self.storage.versions(self.user_id) if self.shared_state else {}
+        
+        # Initialize session state data structures from the storage backend
+        for record_type in RECORD_TABLES:
+            if record_type not in st.session_state:
+                if record_type == "chat_history":
+                    self._load_chat_window()
+                else:
+                    st.session_state[record_type] = RecordCollection(self.load_records(record_type))
+        if "breathing_sessions" not in st.session_state:
+            st.session_state.breathing_sessions = []
+        
+        # Version of the session's data per record type (and breathing sessions),
+        # bumped on every change; see data_version()
+        self.data_versions = {}
+        self._changed(*RECORD_TABLES, "breathing_sessions")
+        
+        # Direct references to the session's collections. They are only ever
+        # changed in place, so the session manager can hibernate and restore
+        # them from outside the session's script thread.
+        self.records = {record_type: st.session_state[record_type] for record_type in RECORD_TABLES}
+        self.chat_earlier = st.session_state.chat_earlier
+        self.breathing_sessions = st.session_state.breathing_sessions
+        
+        # Record types not read from storage yet (after resume()), ids of
+        # records held as headers only until their full payload is needed, and
+        # how many of the newest records of a type to keep in session once
+        # trim_to() has cut it down (older ones stay in storage)
+        self.unloaded = set()
+        self.header_only = {}
+        self.windows = {}
+        
+        # Derived mood views, rebuilt lazily whenever they fall out of step
+        self.mood_columns = None
+        self.mood_aggregates = None
+        
+        # Summary counts and journal themes, updated from each logged event (see _views()),
+        # and whether the user's event log is known to have any events yet
+        self.views = None
+        self.log_started = False
+        
+        # Idle tracking and hibernation state, managed by utils.session_manager
+        self.last_active = time.monotonic()
+        self.hibernated = False
+        self.hibernate_path = None
+        self.hibernate_lock = threading.Lock()
     
     def _get_or_create_encryption_key(self):
         """Generate or retrieve encryption key for this session"""
@@ -29,6 +113,17 @@ class DataManager:
             st.session_state.encryption_key = Fernet.generate_key()
         return st.session_state.encryption_key
     
+    def session_scoped(self):
+        """True while this session's stored data can't outlive the session
+        
+        An anonymous session's key exists only in st.session_state, so once
+        Streamlit drops the session (or the process restarts) its rows can
+        never be decrypted again; the session manager deletes them when the
+        session ends. A recovery token, or the cookie in shared-state mode,
+        derives the key again on a later visit.
+        """
+        return not self.shared_state and not st.session_state.get("recovery_enabled")
+    
     def encrypt_data(self, data):
         """Encrypt sensitive data"""
         json_data = json.dumps(data).encode()
@@ -44,153 +139,1010 @@ class DataManager:
         except:
             return None
     
+    def encrypt_records(self, records):
+        """Encrypt a batch of records into raw Fernet tokens for storage"""
+        encrypt = self.fernet.encrypt
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        # Tokens are stored un-base64'd, saving a quarter of the payload size
+        to_raw = base64.urlsafe_b64decode
+        return [
+            to_raw(encrypt(encode(record.to_values() if isinstance(record, Record) else record).encode()))
+            for record in records
+        ]
+    
+    def encrypt_headers(self, records):
+        """Encrypt the header payload of each record (None for types without headers)"""
+        encrypt = self.fernet.encrypt
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        to_raw = base64.urlsafe_b64decode
+        headers = []
+        for record in records:
+            header = record.to_header()
+            headers.append(None if header is None else to_raw(encrypt(encode(header).encode())))
+        return headers
+    
+    def _storage_rows(self, records):
+        """(id, timestamp, payload, header) rows ready for the storage backend"""
+        return list(zip(
+            (record.id for record in records),
+            (record.timestamp for record in records),
+            self.encrypt_records(records),
+            self.encrypt_headers(records)
+        ))
+    
+    def decrypt_records(self, record_type, rows, cache_results=True):
+        """Decrypt stored (id, timestamp, payload) rows, reusing cached records"""
+        cache = self.decrypt_cache
+        decrypt = self.fernet.decrypt
+        to_token = base64.urlsafe_b64encode
+        from_payload = STORED_CLASSES[record_type].from_payload
+        records = []
+        
+        for record_id, _, payload in rows:
+            key = (record_type, record_id)
+            record = cache.get(key)
+            if record is None:
+                try:
+                    record = from_payload(json.loads(decrypt(to_token(payload))))
+                except Exception:
+                    # Rows written under a previous session key can't be read back
+                    continue
+                if cache_results:
+                    cache.put(key, record)
+            records.append(record)
+        
+        return records
+    
+    def load_records(self, record_type, since=None, limit=None):
+        """Read records from the storage backend, decrypting lazily"""
+        rows = self.storage.load(self.user_id, record_type, since=since, limit=limit)
+        return self.decrypt_records(record_type, rows)
+    
+    def iter_records(self, record_type, batch_size=500):
+        """Yield every stored record of a type, one storage page at a time
+        
+        Bulk reads don't populate the decrypt cache, so an export doesn't
+        evict the records the session is actively using.
+        """
+        for rows in self.storage.iter_load(self.user_id, record_type, batch_size=batch_size):
+            yield from self.decrypt_records(record_type, rows, cache_results=False)
+    
+    def _persist(self, record_type, record):
+        """Encrypt a record and write it to the storage backend"""
+        self.storage.append_many(self.user_id, record_type, self._storage_rows([record]))
+        self._count_writes(record_type)
+        self._log_event("save", record_type, [record], [record.id])
+        self._changed(record_type)
+        self.decrypt_cache.put((record_type, record["id"]), record)
+    
+    def _changed(self, *record_types):
+        """Give record types a new data version after the session's copy of them changed"""
+        for record_type in record_types:
+            self.data_versions[record_type] = next(_data_versions)
+    
+    def data_version(self, *record_types):
+        """Cache key for anything derived from these record types (e.g. with st.cache_data)
+        
+        Holds the user id and a version per type that changes whenever the
+        session's records of that type do: saves, deletes, imports, reloads,
+        rollups and memory trims. Versions are never reused, so a key always
+        stands for one state of the data. "breathing_sessions" is accepted too.
+        """
+        return (self.user_id, *(self.data_versions[record_type] for record_type in record_types))
+    
+    def _log_event(self, op, record_type, records=(), record_ids=(), details=None):
+        """Append an event to the user's log and apply it to the views
+        
+        `records` are the affected records where the session has them; the
+        views' per-record details (journal focus areas) are taken from them.
+        """
+        if details is None and record_type == "journal_entries" and records:
+            details = [record.get("focus_area", "general") for record in records]
+        # The first event for a user whose history predates the log needs a checkpoint after it
+        checkpoint = (
+            self.views is None and op != "checkpoint" and not self.log_started
+            and not self.storage.count(self.user_id, EVENT_LOG)
+        )
+        event = Event(
+            id=self._allocate_id(EVENT_LOG),
+            op=op,
+            record_type=record_type,
+            record_ids=list(record_ids),
+            details=details,
+            ts=int(datetime.now().timestamp())
+        )
+        self.storage.append_many(self.user_id, EVENT_LOG, self._storage_rows([event]))
+        self.log_started = True
+        if self.views is not None:
+            self.views.apply(event)
+        if checkpoint:
+            self._checkpoint()
+        return event
+    
+    def _views(self):
+        """Summary views, built on first use from what is stored
+        
+        Later saves and deletes update them event by event. History that
+        predates the event log gets a checkpoint event, logged here or after
+        the first event _log_event() writes, whichever comes first, so
+        replay_views() can rebuild the views from the log alone.
+        """
+        if self.views is None:
+            if not self.log_started and not self.storage.count(self.user_id, EVENT_LOG):
+                self._checkpoint()
+            else:
+                self.log_started = True
+                self.views = self._stored_views()
+        return self.views
+    
+    def _stored_views(self):
+        return MaterializedViews(
+            counts={record_type: self.storage.count(self.user_id, record_type) for record_type in COUNTED_TYPES},
+            themes=self._stored_focus_areas()
+        )
+    
+    def _checkpoint(self):
+        """Rebuild the views from what is stored and log them as a checkpoint"""
+        self.views = self._stored_views()
+        if any(self.views.counts.values()):
+            self._log_event("checkpoint", None, details=self.views.checkpoint_details())
+    
+    def _stored_focus_areas(self):
+        """Journal entries per focus area, read from the small stored headers"""
+        decrypt = self.fernet.decrypt
+        to_token = base64.urlsafe_b64encode
+        focus_areas = {}
+        for _, _, header, payload in self.storage.load_headers(self.user_id, "journal_entries"):
+            try:
+                if header is None:
+                    entry = JournalEntry.from_payload(json.loads(decrypt(to_token(payload))))
+                else:
+                    entry = JournalEntry.from_header(json.loads(decrypt(to_token(header))))
+            except Exception:
+                continue
+            focus_area = entry.get("focus_area", "general")
+            focus_areas[focus_area] = focus_areas.get(focus_area, 0) + 1
+        return focus_areas
+    
+    def replay_views(self):
+        """Rebuild the summary views from nothing but the event log, and use them
+        
+        For offline checks, or after the view logic changes; request paths
+        never need it.
+        """
+        self.views = MaterializedViews.replay(self.iter_records(EVENT_LOG))
+        return self.views
+    
+    def _count_writes(self, *record_types):
+        """Follow the storage version bump made by one of this session's own writes"""
+        for record_type in record_types:
+            self.versions[record_type] = self.versions.get(record_type, 0) + 1
+    
+    def sync(self, record_types=None):
+        """Drop record types another process has written since this session read them
+        
+        Only in shared-state mode, where several Streamlit processes serve the
+        same session: each script run calls this first, and compares one small
+        row of version counters per user with the versions this session last
+        saw. Stale types (and their decrypt cache entries) are dropped and
+        reloaded by ensure_loaded() when a page next needs them. Returns the
+        record types dropped.
+        """
+        if not self.shared_state:
+            return []
+        stored = self.storage.versions(self.user_id)
+        stale = []
+        for record_type in record_types or RECORD_TABLES:
+            version = stored.get(record_type, 0)
+            if self.versions.get(record_type, 0) == version:
+                continue
+            shown = list(self.records[record_type])
+            if record_type == "chat_history":
+                shown += self.chat_earlier
+            for record in shown:
+                self.decrypt_cache.discard((record_type, record.id))
+            self.header_only.pop(record_type, None)
+            self.unloaded.add(record_type)
+            self.views = None
+            self._changed(record_type)
+            self.versions[record_type] = version
+            stale.append(record_type)
+        return stale
+    
+    def forget_purged(self, record_type, record_ids):
+        """Follow the retention compactor's purge of this user's expired records
+        
+        Called off the script thread. The purge is logged so the views (and
+        replay_views()) stay in step, and the type is reloaded from storage
+        on next use, without the purged records. Journal focus areas come
+        from the session's copy; if some purged entries aren't in it, the
+        views are checkpointed again from storage.
+        """
+        with self.hibernate_lock:
+            records = [record for record in map(self.records[record_type].get, record_ids) if record is not None]
+            self._log_event("delete", record_type, records, record_ids)
+            if record_type == "journal_entries" and len(records) < len(record_ids):
+                self._checkpoint()
+            self._count_writes(record_type)
+            for record_id in record_ids:
+                self.decrypt_cache.discard((record_type, record_id))
+            self.header_only.pop(record_type, None)
+            self.unloaded.add(record_type)
+            self._changed(record_type)
+    
+    def ensure_loaded(self, *record_types):
+        """Read record types into the session on first use (see resume())
+        
+        Pages call this for the types they show, so a resumed session only
+        pays for what is viewed. Journal entries load as headers; their full
+        text is fetched per entry with get_full_record(). A type trimmed to a
+        window (see trim_to()) loads only its newest records.
+        """
+        for record_type in record_types:
+            if record_type not in self.unloaded:
+                continue
+            if record_type == "chat_history":
+                messages = self.load_records("chat_history", limit=CHAT_WINDOW + 1)
+                self.records["chat_history"].reset(messages)
+                self.chat_earlier.clear()
+                st.session_state.chat_has_earlier = len(messages) > CHAT_WINDOW
+            elif RECORD_CLASSES[record_type].HEADER_FIELDS:
+                self.records[record_type].reset(self._load_headers(record_type))
+            else:
+                self.records[record_type].reset(self.load_records(record_type, limit=self.windows.get(record_type)))
+                if record_type in ("mood_entries", "mood_daily"):
+                    self.mood_columns = None
+                    self.mood_aggregates = None
+            self.unloaded.discard(record_type)
+            self._changed(record_type)
+    
+    def _load_headers(self, record_type):
+        """Partial records decrypted from their small header payloads"""
+        record_class = RECORD_CLASSES[record_type]
+        decrypt = self.fernet.decrypt
+        to_token = base64.urlsafe_b64encode
+        partial = self.header_only.setdefault(record_type, set())
+        records = []
+        for record_id, _, header, payload in self.storage.load_headers(self.user_id, record_type):
+            try:
+                if header is None:
+                    # Stored before headers existed: fall back to the full payload
+                    records.append(record_class.from_payload(json.loads(decrypt(to_token(payload)))))
+                    continue
+                records.append(record_class.from_header(json.loads(decrypt(to_token(header)))))
+            except Exception:
+                continue
+            partial.add(record_id)
+        return records
+    
+    def get_full_record(self, record_type, record_id):
+        """A record with every field, fetching its full payload if only the header is loaded"""
+        partial = self.header_only.get(record_type, ())
+        if record_id not in partial:
+            return self.get_record(record_type, record_id)
+        
+        rows = self.storage.load_ids(self.user_id, record_type, [record_id])
+        records = self.decrypt_records(record_type, rows)
+        if not records:
+            return self.get_record(record_type, record_id)
+        partial.discard(record_id)
+        self.records[record_type].replace(records[0])
+        return records[0]
+    
+    def count_records(self, record_type):
+        """Number of records of a type, without loading them if they aren't (all) in session"""
+        if record_type in self.unloaded or record_type in self.windows:
+            return self.storage.count(self.user_id, record_type)
+        return len(self.records[record_type])
+    
+    def _allocate_id(self, record_type):
+        """Next record id for a type; ids only ever increase, even across deletes"""
+        block = self._id_blocks.get(record_type)
+        if block is None or block[0] >= block[1]:
+            start = self.storage.reserve_ids(self.user_id, record_type, ID_BLOCK_SIZE)
+            block = self._id_blocks[record_type] = [start, start + ID_BLOCK_SIZE]
+        block[0] += 1
+        return block[0] - 1
+    
+    def get_record(self, record_type, record_id):
+        """Look up a record by id (O(1)); None if it doesn't exist"""
+        return self.records[record_type].get(record_id)
+    
+    def delete_record(self, record_type, record_id):
+        """Delete one record by id; returns False if it wasn't found"""
+        return self.delete_records(record_type, [record_id]) > 0
+    
+    def delete_records(self, record_type, record_ids=None):
+        """Delete records by id (all records of the type when ids are omitted)
+        
+        Removal from the session is O(1) per record; storage keeps tombstones
+        until its next compaction. Returns the number of records deleted.
+        """
+        records = self.records[record_type]
+        if record_ids is None:
+            # Everything stored, including records outside the session (older chat messages)
+            deleted = [row[0] for rows in self.storage.iter_load(self.user_id, record_type) for row in rows]
+            for record_id in deleted:
+                records.pop(record_id)
+            removed_records = []
+        else:
+            removed_records = [record for record in map(records.pop, record_ids) if record is not None]
+            deleted = [record.id for record in removed_records]
+        
+        if record_type == "chat_history":
+            earlier = self.chat_earlier
+            if record_ids is not None:
+                wanted = set(record_ids)
+                deleted += [message.id for message in earlier if message.id in wanted]
+            removed = set(deleted)
+            earlier[:] = [message for message in earlier if message.id not in removed]
+            if record_ids is None:
+                st.session_state.chat_has_earlier = False
+        
+        if not deleted:
+            return 0
+        
+        self.storage.delete(self.user_id, record_type, deleted)
+        self._count_writes(record_type)
+        if record_ids is None:
+            self._log_event("clear", record_type)
+        else:
+            self._log_event("delete", record_type, removed_records, deleted)
+        self._changed(record_type)
+        for record_id in deleted:
+            self.decrypt_cache.discard((record_type, record_id))
+        
+        if record_type == "mood_entries":
+            # Columnar store and rolling windows are append-only; rebuild on next use
+            self.mood_columns = None
+            self.mood_aggregates = None
+        return len(deleted)
+    
+    def _load_chat_window(self):
+        """Load the newest CHAT_WINDOW messages; anything older is loaded on demand"""
+        # One extra row tells us whether there is anything older to offer
+        messages = self.load_records("chat_history", limit=CHAT_WINDOW + 1)
+        st.session_state.chat_history = RecordCollection(messages, maxlen=CHAT_WINDOW)
+        st.session_state.chat_earlier = []
+        st.session_state.chat_has_earlier = len(messages) > CHAT_WINDOW
+    
+    def load_earlier_messages(self, count=CHAT_WINDOW):
+        """Load the `count` messages before the oldest one shown from storage"""
+        shown = self.chat_earlier or self.records["chat_history"]
+        if not shown:
+            return []
+        
+        oldest = shown[0]
+        rows = self.storage.load_before(
+            self.user_id, "chat_history", (oldest.timestamp, oldest.id), count + 1
+        )
+        st.session_state.chat_has_earlier = len(rows) > count
+        messages = self.decrypt_records("chat_history", rows[-count:], cache_results=False)
+        self.chat_earlier[:0] = messages
+        self._changed("chat_history")
+        return messages
+    
     def save_chat_message(self, role, content, persona=None, risk_level=None):
         """Save chat message with optional metadata"""
-        message = {
-            "id": len(st.session_state.chat_history),
-            "timestamp": datetime.now().isoformat(),
-            "role": role,
-            "content": content,
-            "persona": persona,
-            "risk_level": risk_level
-        }
-        st.session_state.chat_history.append(message)
+        message = ChatMessage(
+            id=self._allocate_id("chat_history"),
+            role=role,
+            content=content,
+            persona=persona,
+            risk_level=risk_level,
+            ts=int(datetime.now().timestamp())
+        )
+        evicted = self.records["chat_history"].append(message)
+        self._persist("chat_history", message)
+        
+        if evicted is not None:
+            # The oldest message spills out of the window (it is already in storage)
+            st.session_state.chat_has_earlier = True
+            if self.chat_earlier:
+                # Earlier pages are on screen, so keep the transcript contiguous
+                self.chat_earlier.append(evicted)
     
     def save_mood_entry(self, mood_data):
         """Save mood tracking data"""
-        entry = {
-            "id": len(st.session_state.mood_entries),
-            "timestamp": datetime.now().isoformat(),
-            "overall_mood": mood_data.get("overall_mood"),
-            "emotions": mood_data.get("emotions", []),
-            "intensity": mood_data.get("intensity"),
-            "triggers": mood_data.get("triggers", []),
-            "notes": mood_data.get("notes", "")
-        }
-        st.session_state.mood_entries.append(entry)
+        entry = MoodEntry(
+            id=self._allocate_id("mood_entries"),
+            overall_mood=mood_data.get("overall_mood"),
+            emotions=mood_data.get("emotions", []),
+            intensity=mood_data.get("intensity"),
+            triggers=mood_data.get("triggers", []),
+            notes=mood_data.get("notes", ""),
+            ts=int(datetime.now().timestamp())
+        )
+        self._mood_columns().append(entry)
+        self._mood_aggregates().add(entry)
+        self.records["mood_entries"].append(entry)
+        self._persist("mood_entries", entry)
+    
+    def _mood_columns(self):
+        """Columnar mood store kept in step with the session's mood entries"""
+        columns = self.mood_columns
+        entries = self.records["mood_entries"]
+        if columns is None or len(columns) != len(entries):
+            columns = self.mood_columns = MoodColumns.from_entries(entries)
+        return columns
+    
+    def _mood_aggregates(self):
+        """Running mood statistics kept in step with the session's mood entries"""
+        aggregates = self.mood_aggregates
+        entries = self.records["mood_entries"]
+        if aggregates is None or len(aggregates) != len(entries):
+            aggregates = self.mood_aggregates = MoodAggregates.from_entries(
+                entries, rollups=self.records["mood_daily"]
+            )
+        return aggregates
+    
+    def roll_up_moods(self, before, batch_size=500):
+        """Fold stored mood entries older than `before` (epoch) into daily rollups
+        
+        Called by the retention compactor off the script thread, a batch at a
+        time; the entries are deleted once their day's rollup is written.
+        Stats and charts read rollups alongside the remaining entries. Returns
+        the number of entries rolled up.
+        """
+        cutoff = (datetime.fromtimestamp(before).isoformat(), -1)
+        rolled_up = 0
+        with self.hibernate_lock:
+            if self.hibernated:
+                return 0
+            # Another process serving this session may have rolled up days already
+            self.sync(("mood_entries", "mood_daily"))
+            self.ensure_loaded("mood_daily")
+            rollups = self.records["mood_daily"]
+            by_day = {rollup.day: rollup for rollup in rollups}
+            
+            while True:
+                rows = self.storage.load_before(self.user_id, "mood_entries", cutoff, batch_size)
+                entries = self.decrypt_records("mood_entries", rows, cache_results=False)
+                if not entries:
+                    break
+                
+                changed = {}
+                for entry in entries:
+                    day = date.fromtimestamp(entry.ts).isoformat()
+                    rollup = changed.get(day) or by_day.get(day)
+                    if rollup is None:
+                        rollup = MoodDailyRollup(
+                            id=self._allocate_id("mood_daily"),
+                            day=day,
+                            emotion_counts={},
+                            trigger_counts={},
+                            ts=int(datetime.fromisoformat(day).timestamp())
+                        )
+                    changed[day] = by_day[day] = self._add_to_rollup(rollup, entry)
+                
+                # Rollups first: an interruption can double count a day, but never lose one
+                self.storage.write_batch({(self.user_id, "mood_daily"): self._storage_rows(list(changed.values()))})
+                self.storage.delete(self.user_id, "mood_entries", [entry.id for entry in entries])
+                self._count_writes("mood_daily", "mood_entries")
+                self._log_event("roll_up", "mood_entries", entries, [entry.id for entry in entries])
+                self._changed("mood_entries", "mood_daily")
+                for entry in entries:
+                    self.records["mood_entries"].pop(entry.id)
+                    self.decrypt_cache.discard(("mood_entries", entry.id))
+                rolled_up += len(entries)
+            
+            if rolled_up:
+                rollups.reset(sorted(by_day.values(), key=lambda rollup: rollup.day))
+                self.mood_columns = None
+                self.mood_aggregates = None
+        return rolled_up
+    
+    @staticmethod
+    def _add_to_rollup(rollup, entry):
+        mood = entry.overall_mood or 0
+        emotion_counts = dict(rollup.emotion_counts or {})
+        trigger_counts = dict(rollup.trigger_counts or {})
+        for emotion in entry.emotions:
+            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+        for trigger in entry.triggers:
+            trigger_counts[trigger] = trigger_counts.get(trigger, 0) + 1
+        return MoodDailyRollup(
+            id=rollup.id,
+            day=rollup.day,
+            count=rollup.count + 1,
+            mood_sum=rollup.mood_sum + mood,
+            mood_min=mood if rollup.mood_min is None else min(rollup.mood_min, mood),
+            mood_max=mood if rollup.mood_max is None else max(rollup.mood_max, mood),
+            emotion_counts=emotion_counts,
+            trigger_counts=trigger_counts,
+            ts=rollup.ts
+        )
+    
+    def get_mood_stats(self):
+        """Precomputed mood statistics (overall plus last-10 and last-30 windows)"""
+        return self._mood_aggregates().stats()
     
     def save_journal_entry(self, entry_data):
         """Save journal entry"""
-        entry = {
-            "id": len(st.session_state.journal_entries),
-            "timestamp": datetime.now().isoformat(),
-            "prompt": entry_data.get("prompt"),
-            "content": entry_data.get("content"),
-            "focus_area": entry_data.get("focus_area"),
-            "mood_before": entry_data.get("mood_before"),
-            "mood_after": entry_data.get("mood_after"),
-            "insights": entry_data.get("insights", [])
-        }
-        st.session_state.journal_entries.append(entry)
+        entry = JournalEntry(
+            id=self._allocate_id("journal_entries"),
+            prompt=entry_data.get("prompt"),
+            content=entry_data.get("content"),
+            focus_area=entry_data.get("focus_area"),
+            mood_before=entry_data.get("mood_before"),
+            mood_after=entry_data.get("mood_after"),
+            insights=entry_data.get("insights", []),
+            ts=int(datetime.now().timestamp())
+        )
+        self.records["journal_entries"].append(entry)
+        self._persist("journal_entries", entry)
+        
+        self._queue_crisis_scan("journal", entry["id"], [entry["content"], entry["insights"]])
     
     def save_cbt_record(self, cbt_data):
         """Save CBT thought record"""
-        record = {
-            "id": len(st.session_state.cbt_records),
-            "timestamp": datetime.now().isoformat(),
-            "situation": cbt_data.get("situation"),
-            "thoughts": cbt_data.get("thoughts"),
-            "emotions": cbt_data.get("emotions"),
-            "intensity_before": cbt_data.get("intensity_before"),
-            "evidence_for": cbt_data.get("evidence_for"),
-            "evidence_against": cbt_data.get("evidence_against"),
-            "balanced_thought": cbt_data.get("balanced_thought"),
-            "intensity_after": cbt_data.get("intensity_after"),
-            "ai_insights": cbt_data.get("ai_insights")
-        }
-        st.session_state.cbt_records.append(record)
+        record = CBTRecord(
+            id=self._allocate_id("cbt_records"),
+            situation=cbt_data.get("situation"),
+            thoughts=cbt_data.get("thoughts"),
+            emotions=cbt_data.get("emotions"),
+            intensity_before=cbt_data.get("intensity_before"),
+            evidence_for=cbt_data.get("evidence_for"),
+            evidence_against=cbt_data.get("evidence_against"),
+            balanced_thought=cbt_data.get("balanced_thought"),
+            intensity_after=cbt_data.get("intensity_after"),
+            ai_insights=cbt_data.get("ai_insights"),
+            ts=int(datetime.now().timestamp())
+        )
+        self.records["cbt_records"].append(record)
+        self._persist("cbt_records", record)
+        
+        self._queue_crisis_scan("cbt", record["id"], [
+            record["situation"], record["thoughts"], record["emotions"], record["balanced_thought"]
+        ])
+    
+    def _queue_crisis_scan(self, record_type, record_id, fields):
+        """Hand free text to the background crisis scanner without blocking the save"""
+        if self.background_scanner is None:
+            return
+        
+        text = "\n".join(
+            " ".join(field) if isinstance(field, (list, tuple)) else str(field)
+            for field in fields if field
+        )
+        self.background_scanner.submit(self.user_id, record_type, record_id, text)
     
     def log_crisis_event(self, crisis_type):
         """Log crisis intervention event (anonymized)"""
-        event = {
-            "id": len(st.session_state.crisis_events),
-            "timestamp": datetime.now().isoformat(),
-            "type": crisis_type,  # "immediate", "support", "resolved"
-            "session_id": self.user_id[:8]  # Truncated for privacy
-        }
-        st.session_state.crisis_events.append(event)
+        event = CrisisEvent(
+            id=self._allocate_id("crisis_events"),
+            type=crisis_type,  # "immediate", "support", "resolved"
+            session_id=self.user_id[:8],  # Truncated for privacy
+            ts=int(datetime.now().timestamp())
+        )
+        self.records["crisis_events"].append(event)
+        self._persist("crisis_events", event)
+    
+    def save_breathing_session(self, session_data):
+        """Record a finished breathing exercise (kept for this session only)"""
+        self.breathing_sessions.append(session_data)
+        self._changed("breathing_sessions")
+    
+    def update_breathing_session(self, session_data):
+        """Replace the latest breathing session, e.g. with its post-exercise check-in"""
+        if self.breathing_sessions:
+            self.breathing_sessions[-1] = session_data
+            self._changed("breathing_sessions")
     
     def get_recent_mood_data(self, days=7):
         """Get mood data from recent days"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_entries = []
-        
-        for entry in st.session_state.mood_entries:
-            entry_date = datetime.fromisoformat(entry["timestamp"])
-            if entry_date >= cutoff_date:
-                recent_entries.append(entry)
-        
-        return recent_entries
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        start = self._mood_columns().index_since(cutoff)
+        return st.session_state.mood_entries[start:]
     
     def get_mood_trends(self):
         """Analyze mood trends for visualization"""
-        if not st.session_state.mood_entries:
-            return {"dates": [], "moods": [], "average": 5}
+        rollups = self.records["mood_daily"]
+        if not st.session_state.mood_entries and not rollups:
+            return {"dates": [], "moods": [], "average": 5, "highest": None, "lowest": None}
         
-        dates = []
-        moods = []
+        # Last 30 entries, read straight from the columnar store
+        columns = self._mood_columns()
+        dates = columns.dates(-30)
+        moods = columns.moods[-30:].tolist()
+        highs = list(moods)
+        lows = list(moods)
         
-        for entry in st.session_state.mood_entries[-30:]:  # Last 30 entries
-            dates.append(datetime.fromisoformat(entry["timestamp"]).date())
-            moods.append(entry["overall_mood"])
+        # Fewer entries than that: older days continue from their rollups, one point per day
+        missing = 30 - len(moods)
+        if missing > 0 and rollups:
+            days = rollups[-missing:]
+            dates = [date.fromisoformat(rollup.day) for rollup in days] + dates
+            moods = [round(rollup.average, 1) for rollup in days] + moods
+            # A rolled-up day is plotted as its average but keeps its real extremes
+            highs += [rollup.mood_max for rollup in days if rollup.mood_max is not None]
+            lows += [rollup.mood_min for rollup in days if rollup.mood_min is not None]
         
         average_mood = sum(moods) / len(moods) if moods else 5
         
         return {
             "dates": dates,
             "moods": moods,
-            "average": round(average_mood, 1)
+            "average": round(average_mood, 1),
+            "highest": max(highs, default=None),
+            "lowest": min(lows, default=None)
         }
     
     def get_journal_themes(self):
         """Extract common themes from journal entries"""
-        if not st.session_state.journal_entries:
-            return []
-        
-        themes = {}
-        for entry in st.session_state.journal_entries:
-            focus_area = entry.get("focus_area", "general")
-            themes[focus_area] = themes.get(focus_area, 0) + 1
-        
-        return sorted(themes.items(), key=lambda x: x[1], reverse=True)
+        return self._views().journal_themes()
     
     def get_data_summary(self):
         """Get summary of all user data for privacy dashboard"""
+        counts = self._views().counts
+        # Entries folded into daily rollups still count as logged
+        self.ensure_loaded("mood_daily")
+        rolled_up = sum(rollup.count or 0 for rollup in self.records["mood_daily"])
         return {
             "session_id": self.user_id[:8] + "...",
             "session_duration": str(datetime.now() - st.session_state.session_start),
-            "total_chat_messages": len(st.session_state.chat_history),
-            "mood_entries": len(st.session_state.mood_entries),
-            "journal_entries": len(st.session_state.journal_entries),
-            "cbt_records": len(st.session_state.cbt_records),
-            "crisis_events": len(st.session_state.crisis_events),
+            "total_chat_messages": counts["chat_history"],
+            "mood_entries": counts["mood_entries"] + rolled_up,
+            "journal_entries": counts["journal_entries"],
+            "cbt_records": counts["cbt_records"],
+            "crisis_events": counts["crisis_events"],
             "last_activity": datetime.now().isoformat()
         }
     
-    def export_user_data(self):
-        """Export all user data in JSON format"""
-        export_data = {
-            "export_timestamp": datetime.now().isoformat(),
-            "session_summary": self.get_data_summary(),
-            "mood_entries": st.session_state.mood_entries,
-            "journal_entries": st.session_state.journal_entries,
-            "cbt_records": st.session_state.cbt_records,
-            "data_notice": "This export contains your wellness data from this anonymous session. No personal identifiers are included."
-        }
+    def export_user_data(self, fmt="json", compress=False):
+        """Export all user data as a streaming JSON or NDJSON export job"""
+        return ExportJob(
+            self,
+            {
+                record_type: record_type
+                for record_type in ("mood_entries", "mood_daily", "journal_entries", "cbt_records")
+            },
+            header={
+                "export_timestamp": datetime.now().isoformat(),
+                "session_summary": self.get_data_summary()
+            },
+            footer={
+                "data_notice": "This export contains your wellness data from this anonymous session. No personal identifiers are included."
+            },
+            fmt=fmt,
+            compress=compress,
+            file_prefix="wellness_data"
+        )
+    
+    def import_user_data(self, file, file_name=None, record_type=None):
+        """Restore records from a JSON, NDJSON or CSV export (optionally gzipped)
         
-        return json.dumps(export_data, indent=2)
+        The upload is parsed and validated in batches, written to storage in
+        one transaction, and the session lists and mood aggregates are rebuilt
+        once at the end. Records already stored for the user are skipped; rows
+        within the upload are never compared with each other, so distinct
+        records that happen to look alike are all kept.
+        Returns imported, rejected and duplicate counts per record type.
+        """
+        report = {"imported": {}, "rejected": {}, "duplicates": {}}
+        imported = {}
+        seen = {}
+        
+        for batch_type, rows, rejected in iter_import_batches(file, file_name, record_type):
+            if batch_type not in imported:
+                imported[batch_type] = []
+                # Compared against storage, which also holds records not loaded into the session
+                seen[batch_type] = {record.content_key() for record in self.iter_records(batch_type)}
+                for counts in report.values():
+                    counts[batch_type] = 0
+            
+            report["rejected"][batch_type] += rejected
+            record_class = RECORD_CLASSES[batch_type]
+            for row in rows:
+                record = record_class.from_dict(row)
+                key = record.content_key()
+                if key in seen[batch_type]:
+                    report["duplicates"][batch_type] += 1
+                    continue
+                record.id = self._allocate_id(batch_type)
+                imported[batch_type].append(record)
+        
+        # One transaction for everything, then one rebuild per record type
+        self.storage.write_batch({
+            (self.user_id, batch_type): self._storage_rows(records)
+            for batch_type, records in imported.items() if records
+        })
+        self._count_writes(*(batch_type for batch_type, records in imported.items() if records))
+        for batch_type, records in imported.items():
+            if records:
+                self._log_event("save", batch_type, records, [record.id for record in records])
+                self._changed(batch_type)
+        
+        for batch_type, records in imported.items():
+            report["imported"][batch_type] = len(records)
+            # Types not loaded yet will pick the new records up from storage
+            if records and batch_type not in self.unloaded:
+                merged = list(self.records[batch_type]) + records
+                merged.sort(key=lambda record: (record.ts, record.id))
+                self.records[batch_type].reset(merged)
+        
+        if imported.get("mood_entries"):
+            self.mood_columns = MoodColumns.from_entries(self.records["mood_entries"])
+            self.mood_aggregates = MoodAggregates.from_entries(
+                self.records["mood_entries"], rollups=self.records["mood_daily"]
+            )
+        
+        return report
+    
+    def write_snapshots(self, fmt=None, compression=None, directory=None, record_types=None):
+        """Write typed Parquet/Arrow snapshots of stored records for analytics
+        
+        Snapshots hold decrypted data, so they go under the (git-ignored)
+        data directory unless another location is given. Returns the path
+        written for each record type.
+        """
+        fmt = fmt or os.getenv("WELLNESS_SNAPSHOT_FORMAT", "parquet")
+        if fmt not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unsupported snapshot format: {fmt}")
+        if compression is None:
+            compression = os.getenv("WELLNESS_SNAPSHOT_COMPRESSION", DEFAULT_COMPRESSION[fmt])
+        compression = None if compression in ("", "none") else compression
+        
+        directory = self._snapshot_dir(directory)
+        os.makedirs(directory, exist_ok=True)
+        
+        paths = {}
+        for record_type in record_types or RECORD_TABLES:
+            path = os.path.join(directory, f"{record_type}.{SNAPSHOT_FORMATS[fmt]}")
+            paths[record_type] = write_snapshot(
+                self.iter_records(record_type), record_type, path, fmt=fmt, compression=compression
+            )
+        return paths
+    
+    def _snapshot_dir(self, directory=None):
+        return os.path.join(directory or os.getenv("WELLNESS_SNAPSHOT_DIR", SNAPSHOT_DIR), self.user_id)
+    
+    def _switch_user(self, user_id, key):
+        self.user_id = user_id
+        st.session_state.user_id = user_id
+        st.session_state.encryption_key = key
+        self.encryption_key = key
+        self.fernet = Fernet(key)
+        self.decrypt_cache.clear()
+        self._id_blocks = {}
+    
+    def enable_recovery(self):
+        """Move this session's stored data under a new recovery token and return it
+        
+        Records are re-encrypted with the token's key under the token's storage
+        id, and the anonymous session's rows are removed. The token is not
+        kept anywhere, so it is the only way back to the data.
+        """
+        token = new_recovery_token()
+        user_id, key = derive_session(token)
+        old_user_id = self.user_id
+        stored = {record_type: list(self.iter_records(record_type)) for record_type in (*RECORD_TABLES, EVENT_LOG)}
+        
+        self._switch_user(user_id, key)
+        self.storage.write_batch({
+            (user_id, record_type): self._storage_rows(records)
+            for record_type, records in stored.items() if records
+        })
+        self.storage.delete_user(old_user_id)
+        self.versions = self.storage.versions(user_id) if self.shared_state else {}
+        shutil.rmtree(os.path.join(os.path.dirname(self._snapshot_dir()), old_user_id), ignore_errors=True)
+        st.session_state.recovery_enabled = True
+        return token
+    
+    def resume(self, token):
+        """Switch this session to the data saved under a recovery token
+        
+        Nothing is read up front: each record type is loaded when a page
+        first needs it (ensure_loaded), so resuming costs the same however
+        long the history is. Data from the current visit is discarded only
+        if it is anonymous: a session already on a recovery token keeps it
+        stored, to be resumed again later. Raises ValueError for an unknown
+        token.
+        """
+        user_id, _ = derive_session(token)
+        if not any(self.storage.count(user_id, record_type) for record_type in RECORD_TABLES):
+            raise ValueError("No saved data was found for that recovery token")
+        
+        if user_id != self.user_id and not st.session_state.get("recovery_enabled"):
+            self.storage.delete_user(self.user_id)
+            shutil.rmtree(self._snapshot_dir(), ignore_errors=True)
+        self.attach(token)
+        st.session_state.recovery_enabled = True
+    
+    def attach(self, token):
+        """Switch this session to whatever is stored under a session or recovery token
+        
+        Loads lazily like resume(), but neither checks that data exists nor
+        removes the current session's rows. Shared-state mode uses it to give
+        a session a fresh token in its cookie.
+        """
+        user_id, key = derive_session(token)
+        if user_id != self.user_id:
+            self._switch_user(user_id, key)
+        
+        for records in self.records.values():
+            records.clear()
+        self.chat_earlier.clear()
+        st.session_state.chat_has_earlier = False
+        self.header_only.clear()
+        self.windows.clear()
+        self.unloaded = set(RECORD_TABLES)
+        self.mood_columns = None
+        self.mood_aggregates = None
+        self.views = None
+        self.log_started = False
+        self.versions = self.storage.versions(user_id) if self.shared_state else {}
+        self._changed(*RECORD_TABLES)
     
     def delete_all_data(self):
         """Securely delete all user data"""
-        st.session_state.chat_history = []
-        st.session_state.mood_entries = []
-        st.session_state.journal_entries = []
-        st.session_state.cbt_records = []
-        st.session_state.crisis_events = []
+        self.storage.delete_user(self.user_id)
+        shutil.rmtree(self._snapshot_dir(), ignore_errors=True)
+        
+        for records in self.records.values():
+            records.clear()
+        self.chat_earlier.clear()
+        st.session_state.chat_has_earlier = False
+        self.mood_columns = MoodColumns()
+        self.mood_aggregates = MoodAggregates()
+        self._id_blocks = {}
+        self.unloaded.clear()
+        self.header_only.clear()
+        self.windows.clear()
+        self.versions = {}
+        self.views = None
+        self.log_started = False
+        self._changed(*RECORD_TABLES)
+        
+        if self.hibernate_path:
+            try:
+                os.remove(self.hibernate_path)
+            except FileNotFoundError:
+                pass
+        
+        if st.session_state.get("recovery_enabled"):
+            # The recovery token's id and key must not be reused for new data
+            self._switch_user(str(uuid.uuid4()), Fernet.generate_key())
+            st.session_state.recovery_enabled = False
+            return
         
         # Generate new encryption key
         st.session_state.encryption_key = Fernet.generate_key()
         self.fernet = Fernet(st.session_state.encryption_key)
+        self.decrypt_cache.clear()
+    
+    def memory_usage(self):
+        """Approximate bytes held in session, per list"""
+        usage = {record_type: estimate_bytes(records) for record_type, records in self.records.items()}
+        usage["chat_earlier"] = estimate_bytes(self.chat_earlier)
+        usage["breathing_sessions"] = estimate_bytes(self.breathing_sessions)
+        usage["decrypt_cache"] = estimate_bytes(self.decrypt_cache.values())
+        return usage
+    
+    def trim_to(self, cap):
+        """Shrink the session below `cap` bytes without losing stored data
+        
+        Drops what can be reloaded, cheapest first: the decrypt cache, earlier
+        chat pages, then the oldest journal and CBT records. Journal entries
+        shrink to their headers, so the history still lists them and opening
+        one fetches its text again. CBT records are cut to a window of the
+        newest ones, which ensure_loaded() keeps to when it reloads them; the
+        rest stay in storage for export and count_records().
+        
+        Mood entries are kept whole for the charts. They are bounded anyway:
+        the retention compactor folds entries older than its mood window
+        into daily rollups.
+        """
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        if total <= cap:
+            return total
+        
+        total -= usage.pop("decrypt_cache")
+        self.decrypt_cache.clear()
+        if total > cap and self.chat_earlier:
+            total -= usage.pop("chat_earlier")
+            self.chat_earlier.clear()
+            st.session_state.chat_has_earlier = True
+            self._changed("chat_history")
+        
+        for record_type in ("journal_entries", "cbt_records"):
+            records = self.records[record_type]
+            if total <= cap or not records:
+                continue
+            per_record = usage[record_type] / len(records)
+            keep = max(0, len(records) - int((total - cap) / per_record) - 1)
+            dropped = len(records) - keep
+            record_class = RECORD_CLASSES[record_type]
+            if record_class.HEADER_FIELDS:
+                headers = [record_class.from_header(record.to_header()) for record in records[:dropped]]
+                self.header_only.setdefault(record_type, set()).update(record.id for record in headers)
+                records.reset(headers + list(records[dropped:]))
+                total += estimate_bytes(records) - usage[record_type]
+            else:
+                # Keep at least the newest record, so the page still has something to show
+                dropped = min(dropped, len(records) - 1)
+                records.reset(records[dropped:])
+                self.windows[record_type] = len(records)
+                total -= per_record * dropped
+            self._changed(record_type)
+        return total
+    
+    def _session_sections(self):
+        return {
+            **self.records,
+            "chat_earlier": self.chat_earlier,
+            "breathing_sessions": self.breathing_sessions
+        }
+    
+    def dump_session(self, sections=None):
+        """Binary snapshot of the session's lists (see utils.session_snapshot)
+        
+        Used for hibernation, and to hand a session to another worker or set
+        one up in tests. The snapshot is not encrypted.
+        """
+        state = self._session_sections()
+        if sections is not None:
+            state = {name: state[name] for name in sections}
+        return session_snapshot.dumps(state)
+    
+    def restore_session(self, data, sections=None):
+        """Replace session lists, in place, with those in a dump_session() snapshot
+        
+        With `sections` (e.g. ("mood_entries",)) only those are decoded and
+        restored; everything else in the session is left alone.
+        """
+        restored = session_snapshot.loads(data, sections)
+        for name, values in restored.items():
+            if name in self.records:
+                self.records[name].reset(values)
+            else:
+                getattr(self, name)[:] = values
+        
+        if "mood_entries" in restored:
+            self.mood_columns = None
+            self.mood_aggregates = None
+        self._changed(*{session_snapshot.SECTION_RECORD_TYPES.get(name, name) for name in restored})
+        return list(restored)
+    
+    def hibernate(self, path):
+        """Encrypt the session's lists to `path` and release them from memory"""
+        with self.hibernate_lock:
+            if self.hibernated:
+                return
+            token = self.fernet.encrypt(self.dump_session())
+            
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as hibernate_file:
+                hibernate_file.write(token)
+            os.replace(temp_path, path)
+            
+            for records in self.records.values():
+                records.clear()
+            self.chat_earlier.clear()
+            self.breathing_sessions.clear()
+            # Running aggregates are tiny and stay valid; the columns are rebuilt on wake
+            self.mood_columns = None
+            self.decrypt_cache.clear()
+            self.hibernate_path = path
+            self.hibernated = True
+    
+    def wake(self):
+        """Restore lists saved by hibernate(), in place"""
+        with self.hibernate_lock:
+            if not self.hibernated:
+                return
+            with open(self.hibernate_path, "rb") as hibernate_file:
+                data = self.fernet.decrypt(hibernate_file.read())
+            
+            # Running aggregates survived hibernation and still match the entries
+            aggregates = self.mood_aggregates
+            self.restore_session(data)
+            self.mood_aggregates = aggregates
+            
+            os.remove(self.hibernate_path)
+            self.hibernate_path = None
+            self.hibernated = False
     
     def get_conversation_history(self, limit=10):
         """Get recent conversation history for AI context"""
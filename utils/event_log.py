@@ -0,0 +1,67 @@
+from collections import Counter
+
+# Record types counted in the data summary
+COUNTED_TYPES = ("chat_history", "mood_entries", "journal_entries", "cbt_records", "crisis_events")
+
+# Event operations
+#   save: records were added (details: journal focus areas)
+#   delete: records were removed (details: journal focus areas, where known)
+#   clear: every record of a type was removed
+#   roll_up: mood entries were folded into daily rollups and removed
+#   checkpoint: view state for history written before the log existed
+EVENT_OPS = ("save", "delete", "clear", "roll_up", "checkpoint")
+
+class MaterializedViews:
+    """Per-user views kept up to date by applying log events one at a time
+
+    Holds the record counts behind the data summary and the journal focus
+    area counts behind get_journal_themes(), so both are O(1) to read.
+    replay() rebuilds them from nothing but the event log, which is how
+    they can be recomputed offline or checked against the stored records.
+    """
+
+    def __init__(self, counts=None, themes=None):
+        self.counts = Counter(counts or {})
+        self.themes = Counter(themes or {})
+
+    def apply(self, event):
+        record_type = event.record_type
+        ids = event.record_ids or ()
+        focus_areas = event.details if record_type == "journal_entries" and event.details else ()
+
+        if event.op == "save":
+            self.counts[record_type] += len(ids)
+            self.themes.update(focus_areas)
+        elif event.op in ("delete", "roll_up"):
+            self.counts[record_type] = max(0, self.counts[record_type] - len(ids))
+            self.themes.subtract(focus_areas)
+            self.themes = +self.themes
+        elif event.op == "clear":
+            self.counts[record_type] = 0
+            if record_type == "journal_entries":
+                self.themes.clear()
+        elif event.op == "checkpoint":
+            self.counts = Counter(event.details["counts"])
+            self.themes = Counter(dict((focus, count) for focus, count in event.details["themes"]))
+        else:
+            raise ValueError(f"Unknown event operation: {event.op}")
+
+    @classmethod
+    def replay(cls, events):
+        """Views rebuilt from a user's whole event log, oldest event first"""
+        views = cls()
+        for event in events:
+            views.apply(event)
+        return views
+
+    def checkpoint_details(self):
+        """`details` of a checkpoint event that restores these views"""
+        return {
+            "counts": {record_type: self.counts[record_type] for record_type in COUNTED_TYPES},
+            # Pairs rather than a dict: a focus area can be None
+            "themes": [[focus, count] for focus, count in self.themes.items()]
+        }
+
+    def journal_themes(self):
+        """(focus area, entry count) pairs, most common first"""
+        return sorted(self.themes.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from utils.records import RECORD_CLASSES
+
+# Output chunks are coalesced to roughly this many bytes before being yielded
+CHUNK_SIZE = 64 * 1024
+# Records decrypted per storage page while exporting
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_FORMATS = {
+    "json": ("json", "application/json"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "csv": ("csv", "text/csv")
+}
+
+def iter_json(sections, header=None, footer=None):
+    """Stream one JSON document: header keys, one array per section, footer keys"""
+    yield b"{"
+    separator = b"\n  "
+    for key, value in (header or {}).items():
+        yield separator + f"{json.dumps(key)}: {json.dumps(value)}".encode()
+        separator = b",\n  "
+
+    for key, records in sections.items():
+        yield separator + f"{json.dumps(key)}: [".encode()
+        item_separator = b"\n    "
+        for record in records:
+            yield item_separator + json.dumps(record.to_dict()).encode()
+            item_separator = b",\n    "
+        yield b"\n  ]" if item_separator != b"\n    " else b"]"
+        separator = b",\n  "
+
+    for key, value in (footer or {}).items():
+        yield separator + f"{json.dumps(key)}: {json.dumps(value)}".encode()
+        separator = b",\n  "
+    yield b"\n}\n"
+
+def iter_ndjson(sections, header=None, footer=None):
+    """Stream newline-delimited JSON: a metadata line, then one line per record"""
+    metadata = {**(header or {}), **(footer or {})}
+    if metadata:
+        yield json.dumps(metadata).encode() + b"\n"
+    for key, records in sections.items():
+        for record in records:
+            yield json.dumps({"record_type": key, **record.to_dict()}).encode() + b"\n"
+
+def iter_csv(sections, record_type):
+    """Stream a single section as CSV with the record type's columns"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "timestamp", *RECORD_CLASSES[record_type].FIELDS[1:]])
+
+    for records in sections.values():
+        for record in records:
+            # Lists are written as their Python repr, matching DataFrame.to_csv
+            writer.writerow(record.to_dict().values())
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def coalesce(chunks, chunk_size=CHUNK_SIZE):
+    """Join small chunks into ~chunk_size pieces"""
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= chunk_size:
+            yield b"".join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield b"".join(pending)
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a byte stream incrementally"""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file object over a generator of byte chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._leftover = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._leftover:
+            try:
+                self._leftover = next(self._chunks)
+            except StopIteration:
+                return 0
+
+        size = min(len(buffer), len(self._leftover))
+        buffer[:size] = self._leftover[:size]
+        self._leftover = self._leftover[size:]
+        return size
+
+class ExportJob:
+    """A deferred, streaming export of one user's records
+
+    Header and footer values are captured when the job is created (on the
+    script thread); records are read from the storage backend page by page
+    only when the job is called or to_bytes() is (see
+    components.export_button). Each call returns a fresh file-like stream,
+    so repeat downloads work.
+    """
+
+    def __init__(self, data_manager, sections, header=None, footer=None,
+                 fmt="json", compress=False, file_prefix="wellness_data"):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if fmt == "csv" and len(sections) != 1:
+            raise ValueError("CSV exports hold exactly one record type")
+
+        self.data_manager = data_manager
+        # Output key -> DataManager record type
+        self.sections = dict(sections)
+        self.header = header
+        self.footer = footer
+        self.fmt = fmt
+        self.compress = compress
+
+        extension, self.mime = EXPORT_FORMATS[fmt]
+        self.file_name = f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.{extension}"
+        if compress:
+            self.file_name += ".gz"
+            self.mime = "application/gzip"
+
+    def _records(self):
+        return {
+            key: self.data_manager.iter_records(record_type, batch_size=EXPORT_BATCH_SIZE)
+            for key, record_type in self.sections.items()
+        }
+
+    def iter_bytes(self):
+        """Generate the export as byte chunks"""
+        if self.fmt == "csv":
+            chunks = iter_csv(self._records(), next(iter(self.sections.values())))
+        elif self.fmt == "ndjson":
+            chunks = iter_ndjson(self._records(), self.header, self.footer)
+        else:
+            chunks = iter_json(self._records(), self.header, self.footer)
+
+        chunks = coalesce(chunks)
+        if self.compress:
+            chunks = gzip_chunks(chunks)
+        return chunks
+
+    def to_bytes(self):
+        """The whole export in memory (for st.download_button, which needs bytes)"""
+        return b"".join(self.iter_bytes())
+
+    def write_to(self, file):
+        """Write the whole export to an open binary file"""
+        for chunk in self.iter_bytes():
+            file.write(chunk)
+
+    def __call__(self):
+        return ChunkStream(self.iter_bytes())
@@ -0,0 +1,221 @@
+import ast
+import gzip
+import io
+import json
+
+import pandas as pd
+
+from utils.records import RECORD_CLASSES
+
+# Records validated per batch
+IMPORT_BATCH_SIZE = 2000
+# Characters read from the upload at a time while parsing JSON
+READ_SIZE = 64 * 1024
+
+# Export section keys -> record type (component exports use "entries"/"records")
+SECTION_RECORD_TYPES = {
+    **{record_type: record_type for record_type in RECORD_CLASSES},
+    "entries": "journal_entries",
+    "records": "cbt_records"
+}
+
+REQUIRED_FIELDS = {
+    "chat_history": ("role", "content"),
+    "mood_entries": ("overall_mood",),
+    "journal_entries": ("content",),
+    "cbt_records": (),
+    "crisis_events": ("type",),
+    "mood_daily": ("day", "count", "mood_sum")
+}
+
+# Inclusive ranges for the 1-10 sliders; empty values are allowed unless required
+RANGE_CHECKS = {
+    "mood_entries": {"overall_mood": (1, 10), "intensity": (1, 10)},
+    "journal_entries": {"mood_before": (1, 10), "mood_after": (1, 10)},
+    "cbt_records": {"intensity_before": (1, 10), "intensity_after": (1, 10)}
+}
+
+CHOICE_CHECKS = {
+    "chat_history": {"role": ("user", "assistant")}
+}
+
+LABEL_FIELDS = {
+    "mood_entries": ("emotions", "triggers")
+}
+
+class _JSONReader:
+    """Pulls JSON values out of a text stream without reading it all at once"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (without consuming it)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the current chunk")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value may continue in the next chunk
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may still be cut short
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_json_records(stream):
+    """Yield (section, record) pairs from an exported JSON document
+
+    Top-level arrays named after a record section are streamed one element at
+    a time; other top-level values (export metadata) are skipped.
+    """
+    reader = _JSONReader(stream)
+    reader.expect("{")
+    while True:
+        char = reader.peek()
+        if char == "}":
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+
+        key = reader.value()
+        reader.expect(":")
+        if key in SECTION_RECORD_TYPES and reader.peek() == "[":
+            reader.pos += 1
+            while True:
+                char = reader.peek()
+                if char == "]":
+                    reader.pos += 1
+                    break
+                if char == ",":
+                    reader.pos += 1
+                    continue
+                yield key, reader.value()
+        else:
+            reader.value()
+
+def iter_ndjson_records(stream):
+    """Yield (section, record) pairs from an NDJSON export, skipping metadata lines"""
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        section = record.pop("record_type", None)
+        if section in SECTION_RECORD_TYPES:
+            yield section, record
+
+def _parse_labels(value):
+    """Label lists arrive as JSON lists, or as their repr from a CSV export"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value) if value.startswith("[") else [value]
+        except (ValueError, SyntaxError):
+            return None
+        return list(value) if isinstance(value, (list, tuple)) else None
+    return []
+
+def validate_batch(record_type, frame):
+    """Vectorized checks over a batch; returns (valid rows as dicts, rejected count)"""
+    columns = ["id", "timestamp", *RECORD_CLASSES[record_type].FIELDS[1:]]
+    frame = frame.reindex(columns=columns)
+
+    valid = pd.to_datetime(frame["timestamp"], errors="coerce", format="ISO8601").notna()
+    for name in REQUIRED_FIELDS[record_type]:
+        valid &= frame[name].notna()
+
+    for name, (low, high) in RANGE_CHECKS.get(record_type, {}).items():
+        values = pd.to_numeric(frame[name], errors="coerce")
+        valid &= frame[name].isna() | values.between(low, high)
+        frame[name] = values.round().astype("Int64")
+
+    for name, choices in CHOICE_CHECKS.get(record_type, {}).items():
+        valid &= frame[name].isin(choices)
+
+    for name in LABEL_FIELDS.get(record_type, ()):
+        frame[name] = frame[name].map(_parse_labels, na_action=None)
+        valid &= frame[name].notna()
+
+    accepted = frame[valid].astype(object)
+    accepted = accepted.where(accepted.notna(), None)
+    return accepted.to_dict("records"), int((~valid).sum())
+
+def _open_text(file):
+    """Binary upload or path -> text stream, transparently un-gzipping"""
+    if isinstance(file, str):
+        file = open(file, "rb")
+    stream = io.BufferedReader(file) if not hasattr(file, "peek") else file
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+def detect_format(file_name):
+    name = (file_name or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for extension in ("ndjson", "csv", "json"):
+        if name.endswith("." + extension):
+            return extension
+    return "json"
+
+def iter_import_batches(file, file_name=None, record_type=None, batch_size=IMPORT_BATCH_SIZE):
+    """Parse an export incrementally and yield (record_type, valid records, rejected count)
+
+    JSON, NDJSON and CSV exports (optionally gzipped) are supported. CSV
+    exports hold a single record type, mood entries unless `record_type` says
+    otherwise. Records are returned as dicts in the record layout.
+    """
+    fmt = detect_format(file_name or getattr(file, "name", None))
+    text = _open_text(file)
+
+    if fmt == "csv":
+        record_type = record_type or "mood_entries"
+        for frame in pd.read_csv(text, chunksize=batch_size, dtype=object, keep_default_na=True):
+            yield (record_type, *validate_batch(record_type, frame))
+        return
+
+    records = iter_ndjson_records(text) if fmt == "ndjson" else iter_json_records(text)
+    pending = {}
+    for section, record in records:
+        section_type = record_type or SECTION_RECORD_TYPES[section]
+        batch = pending.setdefault(section_type, [])
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield (section_type, *validate_batch(section_type, pd.DataFrame(pending.pop(section_type))))
+
+    for section_type, batch in pending.items():
+        yield (section_type, *validate_batch(section_type, pd.DataFrame(batch)))
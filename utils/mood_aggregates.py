@@ -0,0 +1,141 @@
+import heapq
+from collections import Counter, deque
+
+class RollingMoodWindow:
+    """Stats over the last `size` mood entries, updated as entries arrive"""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = deque()
+        self.mood_sum = 0
+        self.emotion_counts = Counter()
+        self.trigger_counts = Counter()
+        # Min/max heaps of (mood, sequence); evicted rows are skipped lazily and the
+        # heaps are rebuilt from the window whenever they grow to twice its size
+        self._min_heap = []
+        self._max_heap = []
+        self._sequence = 0
+
+    def push(self, mood, emotions, triggers):
+        sequence = self._sequence
+        self._sequence += 1
+
+        self.entries.append((sequence, mood, emotions, triggers))
+        self.mood_sum += mood
+        self.emotion_counts.update(emotions)
+        self.trigger_counts.update(triggers)
+        heapq.heappush(self._min_heap, (mood, sequence))
+        heapq.heappush(self._max_heap, (-mood, sequence))
+
+        if len(self.entries) > self.size:
+            _, old_mood, old_emotions, old_triggers = self.entries.popleft()
+            self.mood_sum -= old_mood
+            self.emotion_counts.subtract(old_emotions)
+            self.trigger_counts.subtract(old_triggers)
+            self._prune(self._min_heap)
+            self._prune(self._max_heap)
+            # Evicted rows below the top of a heap are never popped; drop them in bulk.
+            # The window's size in pushes passes between rebuilds, so this is O(1) amortized.
+            if max(len(self._min_heap), len(self._max_heap)) >= 2 * self.size:
+                self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        self._min_heap = [(mood, sequence) for sequence, mood, _, _ in self.entries]
+        self._max_heap = [(-mood, sequence) for sequence, mood, _, _ in self.entries]
+        heapq.heapify(self._min_heap)
+        heapq.heapify(self._max_heap)
+
+    def _oldest_sequence(self):
+        return self.entries[0][0]
+
+    def _prune(self, heap):
+        oldest = self._oldest_sequence()
+        while heap and heap[0][1] < oldest:
+            heapq.heappop(heap)
+
+    @property
+    def min(self):
+        if not self.entries:
+            return None
+        self._prune(self._min_heap)
+        return self._min_heap[0][0]
+
+    @property
+    def max(self):
+        if not self.entries:
+            return None
+        self._prune(self._max_heap)
+        return -self._max_heap[0][0]
+
+    def stats(self):
+        count = len(self.entries)
+        return {
+            "count": count,
+            "average": self.mood_sum / count if count else None,
+            "min": self.min,
+            "max": self.max,
+            "emotion_counts": +self.emotion_counts,
+            "trigger_counts": +self.trigger_counts
+        }
+
+class MoodAggregates:
+    """Running mood, emotion and trigger statistics for a session
+
+    Every update is O(1) apart from the O(log N) heap push for the windowed
+    min/max, so reading stats stays flat as mood history grows.
+    """
+
+    def __init__(self, window_sizes=(10, 30)):
+        self.count = 0
+        # Entries counted through daily rollups rather than one by one
+        self.rolled_up = 0
+        self.mood_sum = 0
+        self.emotion_counts = Counter()
+        self.trigger_counts = Counter()
+        self.windows = {size: RollingMoodWindow(size) for size in window_sizes}
+
+    @classmethod
+    def from_entries(cls, entries, window_sizes=(10, 30), rollups=()):
+        aggregates = cls(window_sizes)
+        for rollup in rollups:
+            aggregates.add_rollup(rollup)
+        for entry in entries:
+            aggregates.add(entry)
+        return aggregates
+
+    def add_rollup(self, rollup):
+        """Fold in a day of entries already rolled up (see MoodDailyRollup)
+
+        Rollups only feed the overall totals: they hold entries older than the
+        retention period, which the recent windows no longer cover.
+        """
+        self.count += rollup.count
+        self.rolled_up += rollup.count
+        self.mood_sum += rollup.mood_sum
+        self.emotion_counts.update(rollup.emotion_counts or {})
+        self.trigger_counts.update(rollup.trigger_counts or {})
+
+    def add(self, entry):
+        mood = entry.get("overall_mood") or 0
+        emotions = tuple(entry.get("emotions") or ())
+        triggers = tuple(entry.get("triggers") or ())
+
+        self.count += 1
+        self.mood_sum += mood
+        self.emotion_counts.update(emotions)
+        self.trigger_counts.update(triggers)
+        for window in self.windows.values():
+            window.push(mood, emotions, triggers)
+
+    def __len__(self):
+        # Individual entries only, so callers can check it against the entry list
+        return self.count - self.rolled_up
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "average": self.mood_sum / self.count if self.count else None,
+            "emotion_counts": dict(self.emotion_counts),
+            "trigger_counts": dict(self.trigger_counts),
+            "windows": {size: window.stats() for size, window in self.windows.items()}
+        }
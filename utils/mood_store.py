@@ -0,0 +1,79 @@
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime
+
+# Bit 63 collects any labels beyond the first 63 seen, so masks always fit in 64 bits
+MAX_LABELS = 63
+OVERFLOW_BIT = 1 << MAX_LABELS
+
+class LabelVocabulary:
+    """Maps emotion/trigger labels to bit positions"""
+
+    def __init__(self):
+        self.labels = []
+        self._bits = {}
+
+    def mask(self, labels):
+        mask = 0
+        for label in labels or ():
+            bit = self._bits.get(label)
+            if bit is None:
+                if len(self.labels) >= MAX_LABELS:
+                    mask |= OVERFLOW_BIT
+                    continue
+                bit = len(self.labels)
+                self._bits[label] = bit
+                self.labels.append(label)
+            mask |= 1 << bit
+        return mask
+
+    def decode(self, mask):
+        return [label for bit, label in enumerate(self.labels) if mask >> bit & 1]
+
+class MoodColumns:
+    """Columnar mirror of mood entries with timestamps parsed once
+
+    Row i always corresponds to the i-th mood entry, and rows are kept in
+    timestamp order so window queries can use binary search.
+    """
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.moods = array("b")
+        self.intensities = array("b")
+        self.emotion_masks = array("Q")
+        self.trigger_masks = array("Q")
+        self.emotions = LabelVocabulary()
+        self.triggers = LabelVocabulary()
+
+    @classmethod
+    def from_entries(cls, entries):
+        columns = cls()
+        for entry in entries:
+            columns.append(entry)
+        return columns
+
+    def append(self, entry, epoch=None):
+        """Add one mood entry; pass `epoch` when the timestamp is already known"""
+        if epoch is None:
+            # Slotted records already carry an epoch; legacy dicts need parsing
+            epoch = getattr(entry, "ts", None)
+        if epoch is None:
+            epoch = datetime.fromisoformat(entry["timestamp"]).timestamp()
+
+        self.timestamps.append(epoch)
+        self.moods.append(entry.get("overall_mood") or 0)
+        self.intensities.append(entry.get("intensity") or 0)
+        self.emotion_masks.append(self.emotions.mask(entry.get("emotions")))
+        self.trigger_masks.append(self.triggers.mask(entry.get("triggers")))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def index_since(self, epoch):
+        """First row at or after an epoch timestamp (O(log n))"""
+        return bisect_left(self.timestamps, epoch)
+
+    def dates(self, start=0, stop=None):
+        """Calendar dates for a row range, derived from the epoch column"""
+        return [date.fromtimestamp(epoch) for epoch in self.timestamps[start:stop]]
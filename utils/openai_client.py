@@ -15,8 +15,8 @@ class OpenAIClient:
         self.client = OpenAI(api_key=self.api_key)
         self.model = "gpt-5"
     
-    def get_empathetic_response(self, user_message, persona="therapist", conversation_history=None):
-        """Generate empathetic response based on selected persona"""
+    def _build_empathetic_messages(self, user_message, persona="therapist", conversation_history=None):
+        """Build the persona prompt and conversation context for a reply"""
         
         persona_prompts = {
             "peer": """You are a supportive peer who understands youth struggles. Respond with empathy, 
@@ -48,6 +48,12 @@ class OpenAIClient:
             messages.extend(conversation_history[-10:])  # Keep last 10 messages for context
         
         messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def get_empathetic_response(self, user_message, persona="therapist", conversation_history=None):
+        """Generate empathetic response based on selected persona"""
+        
+        messages = self._build_empathetic_messages(user_message, persona, conversation_history)
         
         try:
             # Type conversion for OpenAI messages is handled by the library
@@ -61,6 +67,25 @@ class OpenAIClient:
         except Exception as e:
             return f"I'm having trouble connecting right now. Please try again, or if this is urgent, please contact crisis resources at 988."
     
+    def stream_empathetic_response(self, user_message, persona="therapist", conversation_history=None):
+        """Stream an empathetic response as text deltas"""
+        
+        messages = self._build_empathetic_messages(user_message, persona, conversation_history)
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=500,
+                temperature=0.7,
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield "I'm having trouble connecting right now. Please try again, or if this is urgent, please contact crisis resources at 988."
+    
     def analyze_sentiment_and_risk(self, text):
         """Analyze sentiment and assess crisis risk level"""
         
@@ -107,6 +132,50 @@ class OpenAIClient:
                 "confidence": 0.1
             }
     
+    def analyze_risk_batch(self, texts):
+        """Assess crisis risk for several texts in a single request"""
+        
+        system_prompt = """
+        You are a mental health risk assessment tool. You will receive a JSON list of texts.
+        For each text, assess the crisis risk level (low, moderate, high, critical).
+        
+        CRITICAL: Flag anything indicating suicidal ideation, self-harm, or immediate danger as "critical"
+        
+        Respond in JSON format, with one result per text in the same order:
+        {
+            "results": [
+                {"risk_level": "low|moderate|high|critical", "emotional_indicators": ["emotion1"], "confidence": number}
+            ]
+        }
+        """
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": json.dumps(texts)}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            
+            results = json.loads(response.choices[0].message.content or "{}").get("results", [])
+            if len(results) == len(texts):
+                return results
+        except Exception as e:
+            pass
+        
+        # Default to moderate risk for every text if analysis fails
+        return [
+            {
+                "risk_level": "moderate",
+                "emotional_indicators": ["unknown"],
+                "confidence": 0.1
+            }
+            for _ in texts
+        ]
+    
     def generate_cbt_insight(self, thought_record):
         """Generate CBT-based insights for thought records"""
         
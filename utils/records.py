@@ -0,0 +1,315 @@
+import sys
+from collections import deque
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import repeat
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _hashable(value):
+    """Hashable form of a payload value: lists become tuples, dicts sorted item tuples"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    return value
+
+def _labels(values):
+    """Interned, immutable label list (emotions, triggers)"""
+    return tuple(_intern(value) for value in values or ())
+
+class Record(Mapping):
+    """Dict-like read access for slotted records
+
+    Records store an int epoch `ts`, but expose the ISO `timestamp` key (and
+    every other field) like the dicts components and exporters expect.
+    """
+
+    __slots__ = ()
+
+    # Field names in payload order, excluding the timestamp (set per subclass)
+    FIELDS = ()
+    # Fields whose values repeat across records and are worth interning
+    INTERNED = ()
+    # Fields stored again in a small header payload, for listings that don't need
+    # the whole record (empty: the record type has no header)
+    HEADER_FIELDS = ()
+
+    def __post_init__(self):
+        for name in self.INTERNED:
+            object.__setattr__(self, name, _intern(getattr(self, name)))
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.ts).isoformat()
+
+    def __getitem__(self, key):
+        if key == "timestamp":
+            return self.timestamp
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield "id"
+        yield "timestamp"
+        yield from self.FIELDS[1:]
+
+    def __len__(self):
+        return len(self.FIELDS) + 1
+
+    def to_dict(self):
+        """Plain dict in the original record layout"""
+        return {key: list(value) if isinstance(value, tuple) else value for key, value in self.items()}
+
+    def to_values(self):
+        """Compact positional form used for storage payloads"""
+        return [self.ts] + [getattr(self, name) for name in self.FIELDS]
+
+    def to_header(self):
+        """Compact positional form of the header fields (None without HEADER_FIELDS)"""
+        if not self.HEADER_FIELDS:
+            return None
+        return [self.ts] + [getattr(self, name) for name in self.HEADER_FIELDS]
+
+    def content_key(self):
+        """Hashable identity of everything but the id (used to skip duplicate imports)"""
+        values = self.to_values()
+        del values[1]
+        return _hashable(values)
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(*values[1:], ts=values[0])
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from the dict layout (ISO or epoch timestamp)"""
+        timestamp = data.get("ts", data.get("timestamp"))
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        return cls(*(data.get(name) for name in cls.FIELDS), ts=int(timestamp or 0))
+
+    @classmethod
+    def from_columns(cls, ts, columns):
+        """Build records from column lists (`columns` in FIELDS order), skipping __post_init__
+
+        For decoders that already produce interned strings and label tuples;
+        setting the slots directly is much cheaper than the dataclass __init__.
+        """
+        records = list(map(object.__new__, repeat(cls, len(ts))))
+        for name, values in zip(("ts", *cls.FIELDS), (ts, *columns)):
+            # One C-level pass per column
+            deque(map(getattr(cls, name).__set__, records, values), maxlen=0)
+        return records
+
+    @classmethod
+    def from_header(cls, values):
+        """Partial record from to_header() values; other fields keep their defaults"""
+        return cls(**dict(zip(cls.HEADER_FIELDS, values[1:])), ts=values[0])
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Decode a stored payload (positional list, or a legacy dict)"""
+        if isinstance(payload, dict):
+            return cls.from_dict(payload)
+        return cls.from_values(payload)
+
+@dataclass(slots=True, eq=False)
+class ChatMessage(Record):
+    id: int
+    role: str
+    content: str
+    persona: str = None
+    risk_level: str = None
+    ts: int = 0
+
+    FIELDS = ("id", "role", "content", "persona", "risk_level")
+    INTERNED = ("role", "persona", "risk_level")
+
+@dataclass(slots=True, eq=False)
+class MoodEntry(Record):
+    id: int
+    overall_mood: int
+    emotions: tuple = ()
+    intensity: int = None
+    triggers: tuple = ()
+    notes: str = ""
+    ts: int = 0
+
+    FIELDS = ("id", "overall_mood", "emotions", "intensity", "triggers", "notes")
+
+    def __post_init__(self):
+        self.emotions = _labels(self.emotions)
+        self.triggers = _labels(self.triggers)
+
+@dataclass(slots=True, eq=False)
+class JournalEntry(Record):
+    id: int
+    prompt: str = None
+    content: str = None
+    focus_area: str = None
+    mood_before: int = None
+    mood_after: int = None
+    insights: object = None
+    ts: int = 0
+
+    FIELDS = ("id", "prompt", "content", "focus_area", "mood_before", "mood_after", "insights")
+    INTERNED = ("focus_area",)
+    HEADER_FIELDS = ("id", "prompt", "focus_area", "mood_before", "mood_after")
+
+@dataclass(slots=True, eq=False)
+class CBTRecord(Record):
+    id: int
+    situation: str = None
+    thoughts: str = None
+    emotions: list = None
+    intensity_before: int = None
+    evidence_for: str = None
+    evidence_against: str = None
+    balanced_thought: str = None
+    intensity_after: int = None
+    ai_insights: object = None
+    ts: int = 0
+
+    FIELDS = (
+        "id", "situation", "thoughts", "emotions", "intensity_before", "evidence_for",
+        "evidence_against", "balanced_thought", "intensity_after", "ai_insights"
+    )
+
+@dataclass(slots=True, eq=False)
+class CrisisEvent(Record):
+    id: int
+    type: str
+    session_id: str = None
+    ts: int = 0
+
+    FIELDS = ("id", "type", "session_id")
+    INTERNED = ("type", "session_id")
+
+@dataclass(slots=True, eq=False)
+class MoodDailyRollup(Record):
+    """Mood entries for one day, folded together by the retention compactor"""
+    id: int
+    day: str
+    count: int = 0
+    mood_sum: int = 0
+    mood_min: int = None
+    mood_max: int = None
+    emotion_counts: dict = None
+    trigger_counts: dict = None
+    ts: int = 0
+
+    FIELDS = (
+        "id", "day", "count", "mood_sum", "mood_min", "mood_max", "emotion_counts", "trigger_counts"
+    )
+
+    @property
+    def average(self):
+        return self.mood_sum / self.count if self.count else None
+
+@dataclass(slots=True, eq=False)
+class Event(Record):
+    """One entry in a user's append-only event log (see utils.event_log)
+
+    Events reference records by id rather than copying them; `details`
+    holds whatever small per-record values the views need (e.g. a journal
+    entry's focus area), in the same order as `record_ids`.
+    """
+    id: int
+    op: str
+    record_type: str
+    record_ids: list = None
+    details: object = None
+    ts: int = 0
+
+    FIELDS = ("id", "op", "record_type", "record_ids", "details")
+    INTERNED = ("op", "record_type")
+
+# Record class for each DataManager record type
+RECORD_CLASSES = {
+    "chat_history": ChatMessage,
+    "mood_entries": MoodEntry,
+    "journal_entries": JournalEntry,
+    "cbt_records": CBTRecord,
+    "crisis_events": CrisisEvent,
+    "mood_daily": MoodDailyRollup
+}
+
+class RecordCollection(Sequence):
+    """Chronological records of one type with O(1) lookup and removal by id
+
+    Iterates (and indexes) in insertion order like the plain lists it replaces.
+    Positional access uses a list view that is rebuilt lazily after a removal.
+    With `maxlen`, the collection is a bounded window: appending past the
+    limit evicts (and returns) the oldest record, like a deque with maxlen.
+    """
+
+    __slots__ = ("_by_id", "_ordered", "maxlen")
+
+    def __init__(self, records=(), maxlen=None):
+        self.maxlen = maxlen
+        self.reset(records)
+
+    def append(self, record):
+        """Add a record; returns the record evicted to stay within maxlen, if any"""
+        self._by_id[record.id] = record
+        if self._ordered is not None:
+            self._ordered.append(record)
+
+        if self.maxlen is not None and len(self._by_id) > self.maxlen:
+            oldest = next(iter(self._by_id))
+            self._ordered = None
+            return self._by_id.pop(oldest)
+        return None
+
+    def reset(self, records=()):
+        """Replace the contents in place (keeps maxlen)"""
+        if self.maxlen is not None:
+            records = list(records)[-self.maxlen:] if self.maxlen else []
+        self._by_id = {record.id: record for record in records}
+        self._ordered = None
+
+    def clear(self):
+        self.reset()
+
+    def get(self, record_id, default=None):
+        return self._by_id.get(record_id, default)
+
+    def replace(self, record):
+        """Swap in a new version of a record, keeping its position"""
+        if record.id in self._by_id:
+            self._by_id[record.id] = record
+            self._ordered = None
+
+    def pop(self, record_id, default=None):
+        record = self._by_id.pop(record_id, None)
+        if record is None:
+            return default
+        self._ordered = None
+        return record
+
+    def ids(self):
+        return self._by_id.keys()
+
+    def _list(self):
+        if self._ordered is None:
+            self._ordered = list(self._by_id.values())
+        return self._ordered
+
+    def __getitem__(self, index):
+        return self._list()[index]
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __reversed__(self):
+        return reversed(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __repr__(self):
+        return f"RecordCollection({list(self._by_id.values())!r})"
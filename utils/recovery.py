@@ -0,0 +1,36 @@
+import base64
+import hashlib
+import hmac
+import secrets
+
+# Random bytes in a token: 160 bits, so the derived ids and keys can't be guessed
+TOKEN_BYTES = 20
+# Characters per group when a token is shown, e.g. ABCD-EFGH-...
+GROUP_SIZE = 4
+
+def new_recovery_token():
+    """A fresh, human-copyable recovery token"""
+    encoded = base64.b32encode(secrets.token_bytes(TOKEN_BYTES)).decode()
+    return "-".join(encoded[start:start + GROUP_SIZE] for start in range(0, len(encoded), GROUP_SIZE))
+
+def normalize_token(token):
+    """Token bytes from user input, ignoring case, spaces and dashes"""
+    cleaned = "".join(token.split()).replace("-", "").upper()
+    try:
+        raw = base64.b32decode(cleaned)
+    except (ValueError, TypeError):
+        raise ValueError("That doesn't look like a recovery token")
+    if len(raw) != TOKEN_BYTES:
+        raise ValueError("That doesn't look like a recovery token")
+    return raw
+
+def derive_session(token):
+    """Recovery token -> (storage user id, Fernet key)
+
+    Nothing about the token itself is stored: the user id only locates the
+    rows and the key only decrypts them, and neither reveals the other.
+    """
+    raw = normalize_token(token)
+    user_id = "r-" + hmac.new(raw, b"wellness storage id", hashlib.sha256).hexdigest()[:32]
+    key = base64.urlsafe_b64encode(hmac.new(raw, b"wellness encryption key", hashlib.sha256).digest())
+    return user_id, key
@@ -0,0 +1,128 @@
+import re
+
+from data.crisis_keywords import UNSAFE_RESPONSE_PATTERN_SPAN, UNSAFE_RESPONSE_PATTERNS
+from utils.crisis_matcher import (
+    RollingPatternWindow, get_crisis_automaton, get_unsafe_response_automaton
+)
+
+SAFE_REPLACEMENT_MESSAGE = """
+I'm not able to continue with that. Your safety matters most right now.
+
+If you're thinking about hurting yourself, please reach out:
+- 🆘 **Call or text 988** - Suicide & Crisis Lifeline (24/7)
+- 💬 **Text HOME to 741741** - Crisis Text Line
+- 🚨 **Call 911** if you're in immediate danger
+"""
+
+CRISIS_RESOURCES_FOOTER = """
+
+💛 If any of this feels overwhelming, you can call or text **988** or text HOME to **741741** any time."""
+
+class StreamingSafetyScanner:
+    """Scans an assistant reply chunk by chunk and can cut it off or amend it"""
+
+    def __init__(self, pattern_window=200):
+        self.crisis_stream = get_crisis_automaton().stream()
+        self.unsafe_automaton = get_unsafe_response_automaton()
+        self.unsafe_stream = self.unsafe_automaton.stream()
+        self.unsafe_patterns = RollingPatternWindow(
+            [re.compile(pattern) for pattern in UNSAFE_RESPONSE_PATTERNS],
+            max(pattern_window, UNSAFE_RESPONSE_PATTERN_SPAN)
+        )
+
+        # Hold back enough text that an unsafe phrase or pattern match is never partially shown
+        self.holdback = max(self.unsafe_automaton.max_phrase_length, UNSAFE_RESPONSE_PATTERN_SPAN) + 1
+        self._buffer = ""
+        self._released = []
+        self._finished = False
+
+        self.crisis_matches = []
+        self.unsafe_matches = []
+        self.cut_off = False
+        self.amended = False
+
+    def feed(self, delta):
+        """Scan a new chunk and return the text that is safe to display now"""
+        if self.cut_off or not delta:
+            return ""
+
+        self.crisis_matches.extend(self.crisis_stream.feed(delta))
+        unsafe = self.unsafe_stream.feed(delta)
+        unsafe.extend(self.unsafe_patterns.feed(delta))
+        if unsafe:
+            return self._cut(unsafe)
+
+        self._buffer += delta
+        if len(self._buffer) <= self.holdback:
+            return ""
+
+        released = self._buffer[:-self.holdback]
+        self._buffer = self._buffer[-self.holdback:]
+        self._released.append(released)
+        return released
+
+    def finish(self):
+        """Flush held-back text and return any closing amendment"""
+        if self._finished:
+            return ""
+        self._finished = True
+
+        if self.cut_off:
+            return ""
+
+        self.crisis_matches.extend(self.crisis_stream.finish())
+        unsafe = self.unsafe_stream.finish()
+        if unsafe:
+            return self._cut(unsafe)
+
+        remainder = self._buffer
+        self._buffer = ""
+
+        # Crisis topics in a reply should always come with resources attached
+        if self.crisis_matches and "988" not in "".join(self._released) + remainder:
+            remainder += CRISIS_RESOURCES_FOOTER
+            self.amended = True
+
+        self._released.append(remainder)
+        return remainder
+
+    def _cut(self, unsafe):
+        self.unsafe_matches.extend(unsafe)
+        self.cut_off = True
+        self._buffer = ""
+        self._released.append(SAFE_REPLACEMENT_MESSAGE)
+        return SAFE_REPLACEMENT_MESSAGE
+
+    def scan(self, deltas):
+        """Wrap a stream of text deltas, stopping the stream if the reply is cut off"""
+        try:
+            for delta in deltas:
+                released = self.feed(delta)
+                if released:
+                    yield released
+                if self.cut_off:
+                    break
+            closing = self.finish()
+            if closing:
+                yield closing
+        finally:
+            close = getattr(deltas, "close", None)
+            if close:
+                close()
+
+    def scan_text(self, text):
+        """Scan a complete (non-streamed) reply and return the safe version"""
+        for _ in self.scan([text]):
+            pass
+        return self.reply
+
+    @property
+    def reply(self):
+        """The reply to keep: text released so far with any amendment, or only the replacement once cut off
+
+        The text shown before a cut-off led up to the unsafe content, so it
+        isn't saved with the conversation.
+        """
+        if self.cut_off:
+            return SAFE_REPLACEMENT_MESSAGE
+        return "".join(self._released)
@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from utils.crisis_metrics import crisis_metrics
+from utils.storage import RECORD_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Days records are kept; types not listed are kept until the user deletes them.
+# Mood entries are not deleted but rolled up into daily aggregates.
+DEFAULT_RETENTION_DAYS = {
+    "chat_history": 90,
+    "crisis_events": 365,
+    "mood_entries": 90
+}
+
+# Charts and the recent-mood views read raw entries this far back
+MIN_MOOD_ROLLUP_DAYS = 30
+
+# Users with nothing stored for this many days are deleted outright, every
+# record type, rollup and event log row with them. This also clears out
+# anonymous sessions whose key was lost in a restart (see
+# DataManager.session_scoped).
+DEFAULT_IDLE_USER_DAYS = 365
+
+def parse_days(value, default):
+    """Parse a number of days; 0 or "off" means never"""
+    value = (value or "").strip().lower()
+    if not value:
+        return default
+    return None if value in ("0", "off", "none") else int(value)
+
+def parse_retention(value, defaults=DEFAULT_RETENTION_DAYS):
+    """Parse "chat_history=30,crisis_events=0" overrides; 0 or "off" keeps a type forever"""
+    retention = dict(defaults)
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        record_type, _, days = item.partition("=")
+        record_type = record_type.strip()
+        if record_type not in RECORD_TABLES:
+            raise ValueError(f"Unknown record type in retention setting: {record_type}")
+        days = days.strip().lower()
+        retention[record_type] = None if days in ("", "0", "off", "none") else int(days)
+    return {record_type: days for record_type, days in retention.items() if days}
+
+class RetentionCompactor:
+    """Applies retention to stored data from a background thread
+
+    Every `interval` seconds it purges expired chat messages and crisis
+    events (for every user, by their plaintext timestamps; live sessions of
+    those users log the purge and reload the type), rolls old mood
+    entries into daily aggregates for sessions that are live but idle (only
+    a session's own key can read its entries), deletes users with nothing
+    stored in the last `idle_days` days (except those with a live session
+    here), then compacts tombstones and vacuums free pages. Each step
+    works in slices of `slice_rows` rows or `slice_pages` pages with a
+    `pause` in between, so the storage lock is only ever held briefly and
+    script threads are never kept waiting. Purging, compaction and
+    vacuuming run on every storage shard in parallel. After each pass the
+    crisis detection metrics are logged (CrisisMetrics.log_summary).
+    """
+
+    def __init__(self, storage, session_manager=None, retention=None, idle_days=DEFAULT_IDLE_USER_DAYS,
+                 interval=3600, slice_rows=200, slice_pages=64, pause=0.05):
+        self.storage = storage
+        self.session_manager = session_manager
+        self.retention = DEFAULT_RETENTION_DAYS if retention is None else retention
+        self.idle_days = idle_days
+        self.interval = interval
+        self.slice_rows = slice_rows
+        self.slice_pages = slice_pages
+        self.pause = pause
+
+        self.last_report = None
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def start(self):
+        """Start the background thread (once)"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="retention-compactor", daemon=True)
+                self._worker.start()
+
+    def _sliced(self, step, size):
+        """Run `step(size)` until it does less than a full slice; returns the total done"""
+        total = 0
+        while True:
+            done = step(size)
+            total += done
+            if done < size:
+                return total
+            time.sleep(self.pause)
+
+    def _roll_up_moods(self, days):
+        if self.session_manager is None:
+            return 0
+        before = (datetime.now() - timedelta(days=max(days, MIN_MOOD_ROLLUP_DAYS))).timestamp()
+        rolled_up = 0
+        now = time.monotonic()
+        for data_manager in self.session_manager.sessions():
+            # Only sessions between interactions, so no script run sees its lists change
+            if now - data_manager.last_active < self.session_manager.MIN_IDLE_SECONDS:
+                continue
+            rolled_up += data_manager.roll_up_moods(before, batch_size=self.slice_rows)
+            time.sleep(self.pause)
+        return rolled_up
+
+    def _purge(self, partition, record_type, cutoff, size):
+        """Purge one slice, telling live sessions of the affected users; returns how many were purged"""
+        purged = partition.purge_before(record_type, cutoff, limit=size)
+        if purged and self.session_manager is not None:
+            for data_manager in self.session_manager.sessions():
+                record_ids = purged.get(data_manager.user_id)
+                if record_ids:
+                    data_manager.forget_purged(record_type, record_ids)
+        return sum(map(len, purged.values()))
+
+    def _expire_idle_users(self, partition, cutoff):
+        """Delete the users of one partition idle since `cutoff`; returns how many were deleted"""
+        live = set()
+        if self.session_manager is not None:
+            live = {data_manager.user_id for data_manager in self.session_manager.sessions()}
+        expired = 0
+        for user_id in partition.idle_users(cutoff):
+            if user_id in live:
+                continue
+            # One transaction per user, so the storage lock is only held briefly
+            partition.delete_user(user_id)
+            expired += 1
+            time.sleep(self.pause)
+        return expired
+
+    def _maintain(self, partition, cutoffs, idle_cutoff):
+        """Purge, expire idle users, compact and vacuum one storage partition; returns its report"""
+        report = {"purged": {}, "expired_users": 0, "compacted": 0, "vacuumed_pages": 0}
+        for record_type, cutoff in cutoffs.items():
+            report["purged"][record_type] = self._sliced(
+                lambda size: self._purge(partition, record_type, cutoff, size), self.slice_rows
+            )
+        if idle_cutoff is not None:
+            report["expired_users"] = self._expire_idle_users(partition, idle_cutoff)
+        report["compacted"] = self._sliced(lambda size: partition.compact(limit=size), self.slice_rows)
+        report["vacuumed_pages"] = self._sliced(lambda size: partition.vacuum(pages=size), self.slice_pages)
+        return report
+
+    def run_once(self):
+        """One full retention pass; returns what was done"""
+        report = {"purged": {}, "rolled_up": 0, "expired_users": 0, "compacted": 0, "vacuumed_pages": 0}
+
+        if "mood_entries" in self.retention:
+            report["rolled_up"] = self._roll_up_moods(self.retention["mood_entries"])
+        cutoffs = {
+            record_type: (datetime.now() - timedelta(days=days)).isoformat()
+            for record_type, days in self.retention.items() if record_type != "mood_entries"
+        }
+        idle_cutoff = (datetime.now() - timedelta(days=self.idle_days)).isoformat() if self.idle_days else None
+
+        partitions = self.storage.partitions()
+        with ThreadPoolExecutor(max_workers=len(partitions), thread_name_prefix="retention") as executor:
+            reports = list(executor.map(lambda partition: self._maintain(partition, cutoffs, idle_cutoff), partitions))
+
+        for partition_report in reports:
+            for record_type, purged in partition_report["purged"].items():
+                report["purged"][record_type] = report["purged"].get(record_type, 0) + purged
+            report["expired_users"] += partition_report["expired_users"]
+            report["compacted"] += partition_report["compacted"]
+            report["vacuumed_pages"] += partition_report["vacuumed_pages"]
+        self.last_report = report
+        return report
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception:
+                # A failed pass must never take the compactor down
+                logger.exception("Retention pass failed")
+            # The compactor is the process's only slow periodic task, so it reports detection health too
+            crisis_metrics.log_summary()
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+def get_retention_compactor(storage, session_manager=None):
+    """Process-wide compactor shared by all sessions, started on first use
+
+    WELLNESS_RETENTION overrides the retention days per record type (e.g.
+    "chat_history=30,crisis_events=off"); WELLNESS_IDLE_USER_DAYS sets
+    after how many idle days a user is deleted ("off" keeps them);
+    WELLNESS_RETENTION_INTERVAL sets how often it runs, in seconds.
+    """
+    global _compactor
+    with _compactor_lock:
+        if _compactor is None:
+            _compactor = RetentionCompactor(
+                storage,
+                session_manager=session_manager,
+                retention=parse_retention(os.getenv("WELLNESS_RETENTION")),
+                idle_days=parse_days(os.getenv("WELLNESS_IDLE_USER_DAYS"), DEFAULT_IDLE_USER_DAYS),
+                interval=float(os.getenv("WELLNESS_RETENTION_INTERVAL", "3600"))
+            )
+            _compactor.start()
+        return _compactor
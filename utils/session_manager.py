@@ -0,0 +1,207 @@
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import weakref
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+HIBERNATE_DIR = os.path.join(".data", "hibernate")
+
+# Items measured per list when estimating its size
+SIZE_SAMPLE = 32
+
+def deep_size(value):
+    """sys.getsizeof of a value plus everything it holds (records, dicts, lists)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(deep_size(key) + deep_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(item) for item in value)
+    slots = getattr(type(value), "__slots__", ())
+    return size + sum(deep_size(getattr(value, name, None)) for name in slots)
+
+def estimate_bytes(items):
+    """Approximate size of a list's contents, measured on a sample
+
+    Interned strings shared between records are counted once per record, so
+    this errs on the high side, which is the safe side for a memory cap.
+    """
+    count = len(items)
+    if not count:
+        return 0
+    step = max(1, count // SIZE_SAMPLE)
+    sample = list(islice(iter(items), 0, None, step))[:SIZE_SAMPLE]
+    return int(sum(deep_size(item) for item in sample) / len(sample) * count)
+
+class SessionManager:
+    """Keeps per-session memory within bounds for all sessions in this process
+
+    Every script run calls touch() with its DataManager. A reaper thread
+    hibernates sessions idle for longer than `idle_seconds` (their lists are
+    encrypted with the session's own key and written to disk), and, when the
+    process-wide `memory_budget` is exceeded, the least recently active
+    sessions first. A hibernated session is restored on its next touch().
+    `session_cap` bounds each session on its own; see DataManager.trim_to.
+    Once Streamlit drops an anonymous session, the reaper deletes its stored
+    data, which nothing could decrypt any more (DataManager.session_scoped).
+    """
+
+    # Sessions active more recently than this are never hibernated for the budget,
+    # so a script run is not emptied under its feet
+    MIN_IDLE_SECONDS = 60
+
+    def __init__(self, idle_seconds=900, session_cap=8 * 1024 * 1024, memory_budget=None,
+                 directory=HIBERNATE_DIR, reap_interval=30):
+        self.idle_seconds = idle_seconds
+        self.session_cap = session_cap
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.reap_interval = reap_interval
+
+        # Sessions are owned by st.session_state; forget them once Streamlit drops them
+        self._sessions = weakref.WeakValueDictionary()
+        self._usage = {}
+        self._lock = threading.Lock()
+
+        # Stored data of live anonymous sessions, (storage, user id, snapshot dir)
+        # per session, and that of ended ones waiting for the reaper to delete it
+        self._scoped = {}
+        self._ended = []
+        self._reaper = None
+
+        # Session keys don't survive a restart, so older files can never be read again
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def touch(self, data_manager):
+        """Record activity for a session, restoring it first if it was hibernated"""
+        # Keyed by object: a session's user id changes when it resumes a recovery token
+        key = id(data_manager)
+        with self._lock:
+            if key not in self._sessions:
+                weakref.finalize(data_manager, self._session_ended, key)
+            self._sessions[key] = data_manager
+            if data_manager.session_scoped():
+                self._scoped[key] = (data_manager.storage, data_manager.user_id, data_manager._snapshot_dir())
+            else:
+                self._scoped.pop(key, None)
+        self._ensure_reaper()
+
+        data_manager.last_active = time.monotonic()
+        if data_manager.hibernated:
+            data_manager.wake()
+
+        usage = sum(data_manager.memory_usage().values())
+        if self.session_cap and usage > self.session_cap:
+            usage = data_manager.trim_to(self.session_cap)
+        with self._lock:
+            self._usage[id(data_manager)] = usage
+
+    def usage(self):
+        """Approximate bytes held by each live, non-hibernated session"""
+        with self._lock:
+            return {
+                data_manager.user_id: self._usage.get(key, 0)
+                for key, data_manager in self._sessions.items() if not data_manager.hibernated
+            }
+
+    def sessions(self):
+        """Live sessions, least recently active first"""
+        with self._lock:
+            return sorted(self._sessions.values(), key=lambda data_manager: data_manager.last_active)
+
+    def _session_ended(self, key):
+        # Runs wherever the session is garbage collected, so it only queues the
+        # deletion, and takes no lock (pop and append are atomic)
+        scoped = self._scoped.pop(key, None)
+        if scoped is not None:
+            self._ended.append(scoped)
+
+    def delete_ended_sessions(self):
+        """Delete the stored data of anonymous sessions Streamlit has dropped; returns how many"""
+        deleted = 0
+        while self._ended:
+            storage, user_id, snapshot_dir = self._ended.pop()
+            try:
+                storage.delete_user(user_id)
+            except Exception:
+                logger.exception("Could not delete ended session %s...", user_id[:8])
+                continue
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            try:
+                os.remove(os.path.join(self.directory, f"{user_id}.bin"))
+            except FileNotFoundError:
+                pass
+            deleted += 1
+        return deleted
+
+    def reap(self):
+        """Delete ended anonymous sessions' data, then hibernate idle sessions and, while over budget, the least recently active"""
+        self.delete_ended_sessions()
+        now = time.monotonic()
+        sessions = self.sessions()
+        with self._lock:
+            # Usage of sessions Streamlit has already dropped
+            for key in set(self._usage) - set(self._sessions.keys()):
+                del self._usage[key]
+
+        awake = [data_manager for data_manager in sessions if not data_manager.hibernated]
+        total = sum(self._usage.get(id(data_manager), 0) for data_manager in awake)
+        hibernated = 0
+
+        for data_manager in awake:
+            idle = now - data_manager.last_active
+            over_budget = self.memory_budget and total > self.memory_budget
+            if idle < self.idle_seconds and not (over_budget and idle >= self.MIN_IDLE_SECONDS):
+                continue
+            try:
+                data_manager.hibernate(os.path.join(self.directory, f"{data_manager.user_id}.bin"))
+            except Exception:
+                # One session that can't be written must not keep the others in memory
+                logger.exception("Could not hibernate session %s...", data_manager.user_id[:8])
+                continue
+            total -= self._usage.get(id(data_manager), 0)
+            hibernated += 1
+        return hibernated
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+                self._reaper.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception:
+                # A failed pass must never take the reaper down
+                logger.exception("Session reaper pass failed")
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_session_manager():
+    """Process-wide session manager shared by all sessions
+
+    Hibernated sessions go in a subdirectory per process, so processes
+    sharing a data directory never remove or overwrite each other's files.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            budget = os.getenv("WELLNESS_MEMORY_BUDGET")
+            _manager = SessionManager(
+                idle_seconds=float(os.getenv("WELLNESS_SESSION_IDLE_SECONDS", "900")),
+                session_cap=int(os.getenv("WELLNESS_SESSION_MEMORY_CAP", str(8 * 1024 * 1024))),
+                memory_budget=int(budget) if budget else None,
+                directory=os.path.join(os.getenv("WELLNESS_HIBERNATE_DIR", HIBERNATE_DIR), str(os.getpid()))
+            )
+        return _manager
@@ -0,0 +1,244 @@
+import gc
+import json
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate, islice
+
+from utils.records import RECORD_CLASSES, _intern
+
+MAGIC = b"WSNP"
+# Bump when the layout changes; readers reject snapshots newer than they understand
+FORMAT_VERSION = 1
+
+# Magic, format version, header length
+PREAMBLE = struct.Struct("<4sHI")
+
+# Column kind per record field, besides the int64 id and ts columns
+#   i8: small ints (1-10 sliders), dict: dictionary-encoded repeated strings,
+#   str: free text, labels: lists of strings, json: anything else
+# A "str" column is written as "text" (NUL-separated, split in one C call)
+# unless one of its values contains a NUL character.
+RECORD_COLUMNS = {
+    "chat_history": {
+        "role": "dict", "content": "str", "persona": "dict", "risk_level": "dict"
+    },
+    "mood_entries": {
+        "overall_mood": "i8", "emotions": "labels", "intensity": "i8", "triggers": "labels", "notes": "str"
+    },
+    "journal_entries": {
+        "prompt": "str", "content": "str", "focus_area": "dict", "mood_before": "i8",
+        "mood_after": "i8", "insights": "json"
+    },
+    "cbt_records": {
+        "situation": "str", "thoughts": "str", "emotions": "json", "intensity_before": "i8",
+        "evidence_for": "str", "evidence_against": "str", "balanced_thought": "str",
+        "intensity_after": "i8", "ai_insights": "json"
+    },
+    "crisis_events": {
+        "type": "dict", "session_id": "dict"
+    },
+    "mood_daily": {
+        "day": "str", "count": "i64", "mood_sum": "i64", "mood_min": "i8", "mood_max": "i8",
+        "emotion_counts": "json", "trigger_counts": "json"
+    }
+}
+
+# Session sections that hold records of another section's type
+SECTION_RECORD_TYPES = {
+    **{record_type: record_type for record_type in RECORD_CLASSES},
+    "chat_earlier": "chat_history"
+}
+
+# Stands in for None in int8 columns
+NULL_I8 = -128
+
+def _to_bytes(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+def _from_bytes(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def _encode_str(values):
+    lengths = array("i", (-1 if value is None else len(value) for value in values))
+    return _to_bytes(lengths) + "".join(value for value in values if value is not None).encode()
+
+def _decode_str(data, count):
+    lengths = _from_bytes("i", data[:count * 4])
+    text = bytes(data[count * 4:]).decode()
+    ends = list(accumulate(max(length, 0) for length in lengths))
+    values = [text[start:end] for start, end in zip([0, *ends], ends)]
+    if -1 in lengths:
+        values = [None if length < 0 else value for length, value in zip(lengths, values)]
+    return values
+
+def _encode_text(values):
+    nulls = array("i", (index for index, value in enumerate(values) if value is None))
+    text = "\0".join("" if value is None else value for value in values)
+    return struct.pack("<I", len(nulls)) + _to_bytes(nulls) + text.encode()
+
+def _decode_text(data, count):
+    (null_count,) = struct.unpack_from("<I", data)
+    start = 4 + null_count * 4
+    values = bytes(data[start:]).decode().split("\0") if count else []
+    for index in _from_bytes("i", data[4:start]):
+        values[index] = None
+    return values
+
+def _encode_dict(values):
+    codes = {}
+    indices = array("i", (codes.setdefault(value, len(codes)) for value in values))
+    vocabulary = json.dumps(list(codes)).encode()
+    return struct.pack("<I", len(vocabulary)) + vocabulary + _to_bytes(indices)
+
+def _decode_dict(data, count):
+    (size,) = struct.unpack_from("<I", data)
+    # Repeated values decode to one shared, interned object each
+    vocabulary = [_intern(value) for value in json.loads(bytes(data[4:4 + size]))]
+    return [vocabulary[index] for index in _from_bytes("i", data[4 + size:])]
+
+def _encode_labels(values):
+    labels = [list(value or ()) for value in values]
+    counts = array("i", (len(value) for value in labels))
+    return _to_bytes(counts) + _encode_dict([label for value in labels for label in value])
+
+def _decode_labels(data, count):
+    counts = _from_bytes("i", data[:count * 4])
+    labels = iter(_decode_dict(data[count * 4:], sum(counts)))
+    return [tuple(islice(labels, length)) for length in counts]
+
+def _encode_json(values):
+    # One JSON array per column, so decoding is a single json.loads call
+    return json.dumps(values, separators=(",", ":")).encode()
+
+def _decode_json(data, count):
+    return json.loads(bytes(data))
+
+COLUMN_CODECS = {
+    "i64": (
+        lambda values: _to_bytes(array("q", values)),
+        lambda data, count: _from_bytes("q", data).tolist()
+    ),
+    "i8": (
+        lambda values: _to_bytes(array("b", (NULL_I8 if value is None else int(value) for value in values))),
+        lambda data, count: [None if value == NULL_I8 else value for value in _from_bytes("b", data)]
+    ),
+    "str": (_encode_str, _decode_str),
+    "text": (_encode_text, _decode_text),
+    "dict": (_encode_dict, _decode_dict),
+    "labels": (_encode_labels, _decode_labels),
+    "json": (_encode_json, _decode_json)
+}
+
+def _record_columns(record_type):
+    return {"id": "i64", "ts": "i64", **RECORD_COLUMNS[record_type]}
+
+def _encode_section(name, values):
+    """Section name + list -> (column layout, payload bytes)"""
+    record_type = SECTION_RECORD_TYPES.get(name)
+    if record_type is None:
+        return [["value", "json_blob", None]], json.dumps(values, separators=(",", ":")).encode()
+
+    columns = []
+    chunks = []
+    for column, kind in _record_columns(record_type).items():
+        column_values = [getattr(record, column) for record in values]
+        if kind == "str" and not any("\0" in value for value in column_values if value is not None):
+            kind = "text"
+        data = COLUMN_CODECS[kind][0](column_values)
+        columns.append([column, kind, len(data)])
+        chunks.append(data)
+    return columns, b"".join(chunks)
+
+def _decode_section(entry, payload):
+    if entry["record_type"] is None:
+        return json.loads(bytes(payload))
+
+    count = entry["count"]
+    values = {}
+    position = 0
+    for column, kind, length in entry["columns"]:
+        data = payload[position:position + length]
+        position += length
+        values[column] = COLUMN_CODECS[kind][1](data, count)
+
+    # Fields added after the snapshot was written come back as None
+    record_class = RECORD_CLASSES[entry["record_type"]]
+    fields = [values.get(name, [None] * count) for name in record_class.FIELDS]
+    return record_class.from_columns(values.get("ts", [0] * count), fields)
+
+def dumps(sections, compress_level=1):
+    """Serialize session sections to snapshot bytes
+
+    `sections` maps a section name to its list: record sections (see
+    SECTION_RECORD_TYPES) are written column by column as typed arrays,
+    anything else (e.g. breathing sessions) as compact JSON. Each section is
+    compressed on its own so it can be loaded without touching the others.
+    """
+    entries = []
+    payloads = []
+    offset = 0
+    for name, values in sections.items():
+        columns, payload = _encode_section(name, values)
+        if compress_level:
+            payload = zlib.compress(payload, compress_level)
+        entries.append({
+            "name": name,
+            "record_type": SECTION_RECORD_TYPES.get(name),
+            "count": len(values),
+            "columns": columns,
+            "compressed": bool(compress_level),
+            "offset": offset,
+            "length": len(payload)
+        })
+        payloads.append(payload)
+        offset += len(payload)
+
+    header = json.dumps({"sections": entries}, separators=(",", ":")).encode()
+    return PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)) + header + b"".join(payloads)
+
+def _read_header(data):
+    if len(data) < PREAMBLE.size:
+        raise ValueError("Not a session snapshot")
+    magic, version, header_size = PREAMBLE.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a session snapshot")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Session snapshot version {version} is newer than supported ({FORMAT_VERSION})")
+    header = json.loads(bytes(data[PREAMBLE.size:PREAMBLE.size + header_size]))
+    return header, PREAMBLE.size + header_size
+
+def section_names(data):
+    """Section name -> item count, read from the header only"""
+    header, _ = _read_header(memoryview(data))
+    return {entry["name"]: entry["count"] for entry in header["sections"]}
+
+def loads(data, sections=None):
+    """Deserialize snapshot bytes; with `sections`, only those are decoded"""
+    data = memoryview(data)
+    header, start = _read_header(data)
+
+    # Decoding allocates tens of thousands of records and no reference cycles;
+    # letting the cyclic GC rescan the growing heap meanwhile only costs time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        result = {}
+        for entry in header["sections"]:
+            if sections is not None and entry["name"] not in sections:
+                continue
+            payload = data[start + entry["offset"]:start + entry["offset"] + entry["length"]]
+            if entry["compressed"]:
+                payload = memoryview(zlib.decompress(payload))
+            result[entry["name"]] = _decode_section(entry, payload)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return result
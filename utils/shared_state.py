@@ -0,0 +1,61 @@
+import base64
+import json
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils.recovery import new_recovery_token, normalize_token
+
+# Cookie holding the session token. It is kept out of the URL, so it never ends
+# up in browser history, proxy logs or a shared link.
+SESSION_COOKIE = "wellness_session"
+
+def shared_state_enabled():
+    """True when WELLNESS_SHARED_STATE is set, for several Streamlit processes behind a load balancer
+
+    Each session is then identified by a token in a browser cookie instead
+    of by st.session_state alone: any process derives the same storage id
+    and key from it (see utils.recovery), reads straight from the shared
+    SQLite file, and DataManager.sync() drops whatever another process has
+    changed since.
+    """
+    return os.getenv("WELLNESS_SHARED_STATE", "").lower() in ("1", "true", "yes")
+
+def session_token():
+    """The session token from the browser's cookie, minting a new one if it is missing or invalid"""
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if token:
+        try:
+            normalize_token(token)
+        except ValueError:
+            token = None
+    st.session_state.session_token = _canonical(token or new_recovery_token())
+    return st.session_state.session_token
+
+def set_session_token(token):
+    """Point the browser's session cookie at another token (after resume, recovery or deletion)"""
+    st.session_state.session_token = _canonical(token)
+    write_session_cookie()
+
+def _canonical(token):
+    # User input may carry spaces, dashes or lower case
+    return base64.b32encode(normalize_token(token)).decode()
+
+def write_session_cookie():
+    """Store the session's token in the browser; app.py calls this on every script run
+
+    A browser-session cookie (gone when the browser closes), sent only to
+    this site and only over HTTPS when the page is served over HTTPS.
+    Written again on each run, so a token set just before st.rerun() is
+    not lost with the discarded elements.
+    """
+    token = st.session_state.get("session_token")
+    if not token:
+        return
+    # st.html strips scripts, but a component's iframe is same-origin and may set the page's cookie
+    components.html(_cookie_script(token), height=0)
+
+def _cookie_script(token):
+    cookie = json.dumps(f"{SESSION_COOKIE}={token}; path=/; SameSite=Strict")
+    return f"<script>parent.document.cookie = {cookie} + (parent.location.protocol === 'https:' ? '; Secure' : '');</script>"
@@ -0,0 +1,150 @@
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_DIR = os.path.join(".data", "snapshots")
+
+# Snapshot format -> file extension
+SNAPSHOT_FORMATS = {
+    "parquet": "parquet",
+    "arrow": "arrow"
+}
+
+# Uncompressed Arrow IPC files can be memory-mapped and read without copying
+DEFAULT_COMPRESSION = {
+    "parquet": "zstd",
+    "arrow": None
+}
+
+# Naive local wall-clock time, matching the ISO timestamps in the app and exports
+TIMESTAMP = pa.timestamp("s")
+LABELS = pa.list_(pa.string())
+
+RECORD_SCHEMAS = {
+    "chat_history": pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", TIMESTAMP),
+        ("role", pa.string()),
+        ("content", pa.string()),
+        ("persona", pa.string()),
+        ("risk_level", pa.string())
+    ]),
+    "mood_entries": pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", TIMESTAMP),
+        ("overall_mood", pa.int8()),
+        ("emotions", LABELS),
+        ("intensity", pa.int8()),
+        ("triggers", LABELS),
+        ("notes", pa.string())
+    ]),
+    "journal_entries": pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", TIMESTAMP),
+        ("prompt", pa.string()),
+        ("content", pa.string()),
+        ("focus_area", pa.string()),
+        ("mood_before", pa.int8()),
+        ("mood_after", pa.int8()),
+        ("insights", pa.string())
+    ]),
+    "cbt_records": pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", TIMESTAMP),
+        ("situation", pa.string()),
+        ("thoughts", pa.string()),
+        ("emotions", pa.string()),
+        ("intensity_before", pa.int8()),
+        ("evidence_for", pa.string()),
+        ("evidence_against", pa.string()),
+        ("balanced_thought", pa.string()),
+        ("intensity_after", pa.int8()),
+        ("ai_insights", pa.string())
+    ]),
+    "crisis_events": pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", TIMESTAMP),
+        ("type", pa.string()),
+        ("session_id", pa.string())
+    ]),
+    "mood_daily": pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", TIMESTAMP),
+        ("day", pa.string()),
+        ("count", pa.int32()),
+        ("mood_sum", pa.int32()),
+        ("mood_min", pa.int8()),
+        ("mood_max", pa.int8()),
+        ("emotion_counts", pa.string()),
+        ("trigger_counts", pa.string())
+    ])
+}
+
+def _as_text(value):
+    """Free-form fields are usually strings; anything else is kept as JSON"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+def records_to_batch(record_type, records):
+    """Convert slotted records into one typed Arrow record batch"""
+    schema = RECORD_SCHEMAS[record_type]
+    columns = []
+    for field in schema:
+        if field.name == "timestamp":
+            values = [datetime.fromtimestamp(record.ts) for record in records]
+        elif field.type == pa.string():
+            values = [_as_text(getattr(record, field.name)) for record in records]
+        else:
+            values = [getattr(record, field.name) for record in records]
+        columns.append(pa.array(values, type=field.type))
+    return pa.record_batch(columns, schema=schema)
+
+def _open_writer(path, schema, fmt, compression):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema, compression=compression or "none")
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    return pa.ipc.new_file(path, schema, options=options)
+
+def write_snapshot(records, record_type, path, fmt="parquet", compression=None, batch_size=5000):
+    """Write records to a Parquet or Arrow IPC file, one batch at a time
+
+    `records` can be any iterable (e.g. DataManager.iter_records), so memory
+    stays bounded by `batch_size`. The file is written under a temporary name
+    and moved into place, so readers never see a partial snapshot.
+    """
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unsupported snapshot format: {fmt}")
+
+    schema = RECORD_SCHEMAS[record_type]
+    records = iter(records)
+    temp_path = path + ".tmp"
+
+    writer = _open_writer(temp_path, schema, fmt, compression)
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            writer.write_batch(records_to_batch(record_type, batch))
+    finally:
+        writer.close()
+
+    os.replace(temp_path, path)
+    return path
+
+def read_snapshot_table(path, columns=None):
+    """Load a snapshot as an Arrow table; Arrow IPC files are memory-mapped"""
+    if path.endswith("." + SNAPSHOT_FORMATS["arrow"]):
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns else table
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+def read_snapshot(path, columns=None):
+    """Load a snapshot straight into a pandas DataFrame (e.g. for the mood charts)"""
+    return read_snapshot_table(path, columns=columns).to_pandas()
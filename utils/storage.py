@@ -0,0 +1,733 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# DataManager record types and the tables that hold them
+RECORD_TABLES = {
+    "chat_history": "chat_messages",
+    "mood_entries": "mood_entries",
+    "journal_entries": "journal_entries",
+    "cbt_records": "cbt_records",
+    "crisis_events": "crisis_events",
+    "mood_daily": "mood_daily"
+}
+
+# Per-user append-only event log (see utils.event_log), stored like a record type
+EVENT_LOG = "events"
+
+# Every table rows are stored in
+STORAGE_TABLES = {**RECORD_TABLES, EVENT_LOG: "event_log"}
+
+DEFAULT_DB_PATH = os.path.join(".data", "wellness.db")
+
+# WELLNESS_DURABILITY -> SQLite synchronous setting
+DURABILITY_MODES = {
+    "fast": "OFF",
+    "normal": "NORMAL",
+    "full": "FULL"
+}
+
+class StorageBackend:
+    """Interface shared by all DataManager storage backends
+
+    Backends store opaque payloads (encrypted by DataManager) alongside the
+    record id and ISO timestamp used for ordering and range queries. Rows
+    may carry a fourth element, a small header payload for listings; rows
+    are always loaded back as (record_id, timestamp, payload).
+    """
+
+    def append(self, user_id, record_type, record_id, timestamp, payload, header=None):
+        """Persist a new record payload"""
+        self.append_many(user_id, record_type, [(record_id, timestamp, payload, header)])
+
+    def append_many(self, user_id, record_type, rows):
+        """Persist (record_id, timestamp, payload[, header]) rows in one transaction"""
+        raise NotImplementedError
+
+    def write_batch(self, batch):
+        """Persist {(user_id, record_type): rows} together (one transaction where supported)"""
+        for (user_id, record_type), rows in batch.items():
+            self.append_many(user_id, record_type, rows)
+
+    def load(self, user_id, record_type, since=None, limit=None):
+        """Return (record_id, timestamp, payload) rows oldest first, optionally from an ISO timestamp or the newest `limit`"""
+        raise NotImplementedError
+
+    def load_before(self, user_id, record_type, before, limit):
+        """Return the newest `limit` rows ordered before a (timestamp, id) position, oldest first"""
+        rows = [row for row in self.load(user_id, record_type) if (row[1], row[0]) < tuple(before)]
+        return rows[-limit:] if limit else []
+
+    def iter_load(self, user_id, record_type, batch_size=500):
+        """Yield lists of at most `batch_size` rows, oldest first"""
+        rows = self.load(user_id, record_type)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def load_headers(self, user_id, record_type):
+        """Return (record_id, timestamp, header, payload) rows oldest first
+
+        The payload is only filled in for rows stored without a header.
+        """
+        return [(record_id, timestamp, None, payload) for record_id, timestamp, payload in self.load(user_id, record_type)]
+
+    def load_ids(self, user_id, record_type, record_ids):
+        """Return the full rows for specific record ids, oldest first"""
+        record_ids = set(record_ids)
+        return [row for row in self.load(user_id, record_type) if row[0] in record_ids]
+
+    def count(self, user_id, record_type):
+        """Number of stored records of one type for a user"""
+        raise NotImplementedError
+
+    def versions(self, user_id):
+        """{record_type: version} for a user; a version goes up with every write of that type
+
+        Lets several processes serving the same user notice each other's writes.
+        """
+        raise NotImplementedError
+
+    def reserve_ids(self, user_id, record_type, count=1):
+        """Reserve `count` new record ids and return the first; ids are never reused"""
+        raise NotImplementedError
+
+    def delete(self, user_id, record_type, record_ids):
+        """Tombstone records so they stop being loaded (removed for good by compact())"""
+        raise NotImplementedError
+
+    def purge_before(self, record_type, timestamp, limit=None):
+        """Tombstone up to `limit` records of a type older than an ISO timestamp, for every user
+
+        Each affected user's version of the type is bumped, like any delete.
+        Returns the purged record ids per user id; callers loop until fewer
+        than `limit` come back.
+        """
+        raise NotImplementedError
+
+    def idle_users(self, timestamp):
+        """Ids of users with nothing stored newer than an ISO timestamp, in any table (event log included)"""
+        raise NotImplementedError
+
+    def compact(self, limit=None):
+        """Physically remove (up to `limit`) tombstoned records; returns how many were removed"""
+        return 0
+
+    def vacuum(self, pages=None):
+        """Return (up to `pages`) free pages to the file system; returns how many were freed"""
+        return 0
+
+    def partitions(self):
+        """Independent backends that maintenance tasks can work on in parallel"""
+        return [self]
+
+    def delete_user(self, user_id):
+        """Remove every record belonging to a user"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+class InMemoryBackend(StorageBackend):
+    """Process-local backend that keeps rows in plain lists (useful for tests)"""
+
+    def __init__(self):
+        self._rows = defaultdict(list)
+        self._next_ids = defaultdict(int)
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def append_many(self, user_id, record_type, rows):
+        with self._lock:
+            # Stored as (record_id, timestamp, payload, header)
+            self._rows[(user_id, record_type)].extend(tuple(row) if len(row) > 3 else (*row, None) for row in rows)
+            self._versions[(user_id, record_type)] += 1
+
+    def load(self, user_id, record_type, since=None, limit=None):
+        with self._lock:
+            rows = [row[:3] for row in self._rows.get((user_id, record_type), [])]
+        if since is not None:
+            rows = [row for row in rows if row[1] >= since]
+        if limit is not None:
+            rows = rows[-limit:] if limit else []
+        return rows
+
+    def load_headers(self, user_id, record_type):
+        with self._lock:
+            rows = list(self._rows.get((user_id, record_type), []))
+        return [
+            (record_id, timestamp, header, None if header is not None else payload)
+            for record_id, timestamp, payload, header in rows
+        ]
+
+    def count(self, user_id, record_type):
+        with self._lock:
+            return len(self._rows.get((user_id, record_type), []))
+
+    def versions(self, user_id):
+        with self._lock:
+            return {key[1]: version for key, version in self._versions.items() if key[0] == user_id}
+
+    def reserve_ids(self, user_id, record_type, count=1):
+        key = (user_id, record_type)
+        with self._lock:
+            if key not in self._next_ids:
+                self._next_ids[key] = max((row[0] for row in self._rows.get(key, ())), default=-1) + 1
+            start = self._next_ids[key]
+            self._next_ids[key] += count
+        return start
+
+    def delete(self, user_id, record_type, record_ids):
+        # Nothing to compact later: rows are dropped straight away
+        record_ids = set(record_ids)
+        key = (user_id, record_type)
+        with self._lock:
+            if key in self._rows:
+                self._rows[key] = [row for row in self._rows[key] if row[0] not in record_ids]
+            self._versions[key] += 1
+
+    def purge_before(self, record_type, timestamp, limit=None):
+        purged = {}
+        total = 0
+        with self._lock:
+            for key, rows in self._rows.items():
+                if key[1] != record_type:
+                    continue
+                budget = None if limit is None else limit - total
+                expired = [row for row in rows if row[1] < timestamp][:budget]
+                if expired:
+                    expired_ids = {row[0] for row in expired}
+                    self._rows[key] = [row for row in rows if row[0] not in expired_ids]
+                    self._versions[key] += 1
+                    purged[key[0]] = [row[0] for row in expired]
+                    total += len(expired)
+                if limit is not None and total >= limit:
+                    break
+        return purged
+
+    def idle_users(self, timestamp):
+        latest = {}
+        with self._lock:
+            for (user_id, _), rows in self._rows.items():
+                for row in rows:
+                    if row[1] > latest.get(user_id, ""):
+                        latest[user_id] = row[1]
+        return [user_id for user_id, newest in latest.items() if newest < timestamp]
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in [key for key in self._rows if key[0] == user_id]:
+                del self._rows[key]
+            for key in [key for key in self._next_ids if key[0] == user_id]:
+                del self._next_ids[key]
+            for key in [key for key in self._versions if key[0] == user_id]:
+                del self._versions[key]
+
+class SQLiteBackend(StorageBackend):
+    """Durable backend using one SQLite table per record type in WAL mode
+
+    Deletes only mark rows as tombstones (and drop their payload); compact()
+    removes them, either when `compact_threshold` tombstones have built up or
+    when called periodically by the write-behind flusher.
+    """
+
+    SCHEMA_VERSION = 6
+
+    def __init__(self, path=DEFAULT_DB_PATH, synchronous="NORMAL", compact_threshold=1000, pool_size=4):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._tombstones = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # A small pool of connections shared by the script threads: reads run side
+        # by side (WAL never blocks readers) while writes take turns on the write lock.
+        # Every connection to ":memory:" would be a separate database, so it gets one.
+        self.pool_size = 1 if path == ":memory:" else max(1, pool_size)
+        self._pool = queue.LifoQueue()
+        self._write_lock = threading.Lock()
+
+        for index in range(self.pool_size):
+            conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+            if index == 0:
+                # Lets vacuum() free pages a few at a time; only takes effect on a new file
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("PRAGMA journal_mode=WAL")
+                self._migrate(conn)
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._pool.put(conn)
+
+        # Statement text is fixed per table so sqlite3 reuses the prepared statements
+        self._sql = {
+            record_type: {
+                "insert": (
+                    f"INSERT OR REPLACE INTO {table} (user_id, id, timestamp, payload, header) "
+                    f"VALUES (?, ?, ?, ?, ?)"
+                ),
+                "load": (
+                    f"SELECT id, timestamp, payload FROM {table} WHERE user_id = ? AND deleted = 0 "
+                    f"ORDER BY timestamp, id"
+                ),
+                "load_since": (
+                    f"SELECT id, timestamp, payload FROM {table} WHERE user_id = ? AND timestamp >= ? "
+                    f"AND deleted = 0 ORDER BY timestamp, id"
+                ),
+                "load_latest": (
+                    f"SELECT id, timestamp, payload FROM (SELECT id, timestamp, payload FROM {table} "
+                    f"WHERE user_id = ? AND deleted = 0 ORDER BY timestamp DESC, id DESC LIMIT ?) "
+                    f"ORDER BY timestamp, id"
+                ),
+                "load_before": (
+                    f"SELECT id, timestamp, payload FROM (SELECT id, timestamp, payload FROM {table} "
+                    f"WHERE user_id = ? AND (timestamp, id) < (?, ?) AND deleted = 0 "
+                    f"ORDER BY timestamp DESC, id DESC LIMIT ?) ORDER BY timestamp, id"
+                ),
+                "load_page": (
+                    f"SELECT id, timestamp, payload FROM {table} WHERE user_id = ? AND (timestamp, id) > (?, ?) "
+                    f"AND deleted = 0 ORDER BY timestamp, id LIMIT ?"
+                ),
+                "load_headers": (
+                    f"SELECT id, timestamp, header, CASE WHEN header IS NULL THEN payload END FROM {table} "
+                    f"WHERE user_id = ? AND deleted = 0 ORDER BY timestamp, id"
+                ),
+                "load_id": f"SELECT id, timestamp, payload FROM {table} WHERE user_id = ? AND id = ? AND deleted = 0",
+                "count": f"SELECT COUNT(*) FROM {table} WHERE user_id = ? AND deleted = 0",
+                "max_id": f"SELECT COALESCE(MAX(id) + 1, 0) FROM {table} WHERE user_id = ?",
+                "delete": f"UPDATE {table} SET deleted = 1, payload = X'', header = NULL WHERE user_id = ? AND id = ?",
+                "purge_before": (
+                    f"UPDATE {table} SET deleted = 1, payload = X'', header = NULL WHERE (user_id, id) IN "
+                    f"(SELECT user_id, id FROM {table} WHERE timestamp < ? AND deleted = 0 LIMIT ?) "
+                    f"RETURNING user_id, id"
+                ),
+                "compact": (
+                    f"DELETE FROM {table} WHERE (user_id, id) IN "
+                    f"(SELECT user_id, id FROM {table} WHERE deleted = 1 LIMIT ?)"
+                ),
+                "delete_user": f"DELETE FROM {table} WHERE user_id = ?"
+            }
+            for record_type, table in STORAGE_TABLES.items()
+        }
+
+    def _migrate(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+
+        # Tables that existed before version 4; later tables are created complete below
+        original_tables = [table for table in RECORD_TABLES.values() if table != "mood_daily"]
+
+        with conn:
+            if version < 1:
+                for table in original_tables:
+                    conn.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {table} (
+                            user_id TEXT NOT NULL,
+                            id INTEGER NOT NULL,
+                            timestamp TEXT NOT NULL,
+                            payload BLOB NOT NULL,
+                            PRIMARY KEY (user_id, id)
+                        ) WITHOUT ROWID
+                    """)
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{table}_user_timestamp ON {table} (user_id, timestamp)"
+                    )
+
+            if version < 2:
+                # Tombstones, plus per-user id sequences so deleted ids are never reused
+                for table in original_tables:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN deleted INTEGER NOT NULL DEFAULT 0")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS id_sequences (
+                        user_id TEXT NOT NULL,
+                        record_type TEXT NOT NULL,
+                        next_id INTEGER NOT NULL,
+                        PRIMARY KEY (user_id, record_type)
+                    ) WITHOUT ROWID
+                """)
+
+            if version < 3:
+                # Optional small header payload per row (e.g. journal listings)
+                for table in original_tables:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN header BLOB")
+
+            if version < 4:
+                # Daily mood rollups written by the retention compactor
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS mood_daily (
+                        user_id TEXT NOT NULL,
+                        id INTEGER NOT NULL,
+                        timestamp TEXT NOT NULL,
+                        payload BLOB NOT NULL,
+                        deleted INTEGER NOT NULL DEFAULT 0,
+                        header BLOB,
+                        PRIMARY KEY (user_id, id)
+                    ) WITHOUT ROWID
+                """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_mood_daily_user_timestamp ON mood_daily (user_id, timestamp)"
+                )
+
+            if version < 5:
+                # Per-user write counters, so other processes can tell when their copy is stale
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS user_versions (
+                        user_id TEXT NOT NULL,
+                        record_type TEXT NOT NULL,
+                        version INTEGER NOT NULL,
+                        PRIMARY KEY (user_id, record_type)
+                    ) WITHOUT ROWID
+                """)
+
+            if version < 6:
+                # Append-only log of every save and delete, for audit and view rebuilds
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS event_log (
+                        user_id TEXT NOT NULL,
+                        id INTEGER NOT NULL,
+                        timestamp TEXT NOT NULL,
+                        payload BLOB NOT NULL,
+                        deleted INTEGER NOT NULL DEFAULT 0,
+                        header BLOB,
+                        PRIMARY KEY (user_id, id)
+                    ) WITHOUT ROWID
+                """)
+
+            conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+
+        if version < 4 and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Older files need one full VACUUM to switch to incremental mode
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+
+    @staticmethod
+    def _insert_params(user_id, rows):
+        for row in rows:
+            yield (user_id, row[0], row[1], row[2], row[3] if len(row) > 3 else None)
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection from the pool for one operation"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _bump_version(self, conn, user_id, record_type):
+        # Inside the caller's transaction, so the rows and their version commit together
+        conn.execute(
+            "INSERT INTO user_versions (user_id, record_type, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (user_id, record_type) DO UPDATE SET version = version + 1",
+            (user_id, record_type)
+        )
+
+    def append_many(self, user_id, record_type, rows):
+        sql = self._sql[record_type]["insert"]
+        with self._write_lock, self._connection() as conn, conn:
+            conn.executemany(sql, self._insert_params(user_id, rows))
+            self._bump_version(conn, user_id, record_type)
+
+    def write_batch(self, batch):
+        # Group commit: a single transaction (and a single fsync) for the whole batch
+        with self._write_lock, self._connection() as conn, conn:
+            for (user_id, record_type), rows in batch.items():
+                conn.executemany(self._sql[record_type]["insert"], self._insert_params(user_id, rows))
+                self._bump_version(conn, user_id, record_type)
+
+    def load(self, user_id, record_type, since=None, limit=None):
+        statements = self._sql[record_type]
+        with self._connection() as conn:
+            if since is not None:
+                rows = conn.execute(statements["load_since"], (user_id, since)).fetchall()
+            elif limit is not None:
+                rows = conn.execute(statements["load_latest"], (user_id, limit)).fetchall()
+            else:
+                rows = conn.execute(statements["load"], (user_id,)).fetchall()
+
+        if since is not None and limit is not None:
+            rows = rows[-limit:] if limit else []
+        return rows
+
+    def load_before(self, user_id, record_type, before, limit):
+        with self._connection() as conn:
+            return conn.execute(
+                self._sql[record_type]["load_before"], (user_id, *before, limit)
+            ).fetchall()
+
+    def iter_load(self, user_id, record_type, batch_size=500):
+        # Keyset pagination: the lock is only held for one page at a time
+        sql = self._sql[record_type]["load_page"]
+        cursor = ("", -1)
+        while True:
+            with self._connection() as conn:
+                rows = conn.execute(sql, (user_id, *cursor, batch_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            cursor = rows[-1][1], rows[-1][0]
+
+    def load_headers(self, user_id, record_type):
+        with self._connection() as conn:
+            return conn.execute(self._sql[record_type]["load_headers"], (user_id,)).fetchall()
+
+    def load_ids(self, user_id, record_type, record_ids):
+        sql = self._sql[record_type]["load_id"]
+        with self._connection() as conn:
+            rows = [row for record_id in record_ids for row in conn.execute(sql, (user_id, record_id))]
+        return sorted(rows, key=lambda row: (row[1], row[0]))
+
+    def count(self, user_id, record_type):
+        with self._connection() as conn:
+            return conn.execute(self._sql[record_type]["count"], (user_id,)).fetchone()[0]
+
+    def versions(self, user_id):
+        with self._connection() as conn:
+            return dict(conn.execute(
+                "SELECT record_type, version FROM user_versions WHERE user_id = ?", (user_id,)
+            ).fetchall())
+
+    def reserve_ids(self, user_id, record_type, count=1):
+        # One statement, so processes sharing the file never hand out the same ids;
+        # the first reservation for a user continues after any existing rows
+        with self._write_lock, self._connection() as conn, conn:
+            next_id = conn.execute(
+                f"INSERT INTO id_sequences (user_id, record_type, next_id) "
+                f"VALUES (?, ?, ({self._sql[record_type]['max_id']}) + ?) "
+                f"ON CONFLICT (user_id, record_type) DO UPDATE SET next_id = next_id + ? RETURNING next_id",
+                (user_id, record_type, user_id, count, count)
+            ).fetchone()[0]
+        return next_id - count
+
+    def delete(self, user_id, record_type, record_ids):
+        sql = self._sql[record_type]["delete"]
+        with self._write_lock, self._connection() as conn, conn:
+            cursor = conn.executemany(sql, ((user_id, record_id) for record_id in record_ids))
+            self._tombstones += max(cursor.rowcount, 0)
+            self._bump_version(conn, user_id, record_type)
+            should_compact = self._tombstones >= self.compact_threshold
+
+        if should_compact:
+            self.compact()
+
+    def purge_before(self, record_type, timestamp, limit=None):
+        purged = {}
+        with self._write_lock, self._connection() as conn, conn:
+            rows = conn.execute(
+                self._sql[record_type]["purge_before"], (timestamp, -1 if limit is None else limit)
+            ).fetchall()
+            for user_id, record_id in rows:
+                purged.setdefault(user_id, []).append(record_id)
+            for user_id in purged:
+                self._bump_version(conn, user_id, record_type)
+            self._tombstones += len(rows)
+        return purged
+
+    def idle_users(self, timestamp):
+        # Newest live row per user in each table, then across the tables
+        latest = " UNION ALL ".join(
+            f"SELECT user_id, MAX(timestamp) AS newest FROM {table} WHERE deleted = 0 GROUP BY user_id"
+            for table in STORAGE_TABLES.values()
+        )
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute(
+                f"SELECT user_id FROM ({latest}) GROUP BY user_id HAVING MAX(newest) < ?", (timestamp,)
+            )]
+
+    def compact(self, limit=None):
+        # LIMIT -1 means no limit in SQLite
+        removed = 0
+        with self._write_lock, self._connection() as conn, conn:
+            for statements in self._sql.values():
+                budget = -1 if limit is None else limit - removed
+                if budget == 0:
+                    break
+                removed += conn.execute(statements["compact"], (budget,)).rowcount
+            if limit is None or removed < limit:
+                self._tombstones = 0
+        return removed
+
+    def vacuum(self, pages=None):
+        with self._write_lock, self._connection() as conn:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript(
+                "PRAGMA incremental_vacuum;" if pages is None else f"PRAGMA incremental_vacuum({int(pages)});"
+            )
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return before - after
+
+    def delete_user(self, user_id):
+        with self._write_lock, self._connection() as conn, conn:
+            for statements in self._sql.values():
+                conn.execute(statements["delete_user"], (user_id,))
+            conn.execute("DELETE FROM id_sequences WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM user_versions WHERE user_id = ?", (user_id,))
+
+    def close(self):
+        for _ in range(self.pool_size):
+            self._pool.get().close()
+
+class ShardedBackend(StorageBackend):
+    """Spreads users over several backends (e.g. one SQLite file each) by a hash of user_id
+
+    Every user lives entirely in one shard, so a user's reads and writes
+    only ever touch that shard and a busy user can only hold up the users
+    sharing it. Batches spanning several shards are committed in parallel,
+    one transaction per shard. The hash is stable across processes and
+    restarts, but changing the number of shards moves users to other files.
+    """
+
+    def __init__(self, shards):
+        self.shards = list(shards)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="storage-shard")
+
+    @classmethod
+    def sqlite(cls, path=DEFAULT_DB_PATH, count=4, **options):
+        """SQLite shards next to `path`: wellness-0.db, wellness-1.db, ..."""
+        root, extension = os.path.splitext(path)
+        return cls(SQLiteBackend(f"{root}-{index}{extension}", **options) for index in range(count))
+
+    def shard_index(self, user_id):
+        digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % len(self.shards)
+
+    def shard_for(self, user_id):
+        return self.shards[self.shard_index(user_id)]
+
+    def _map(self, function, shards):
+        """Run `function(shard)` for each shard in parallel; returns the results in order"""
+        if len(shards) == 1:
+            return [function(shards[0])]
+        return list(self._executor.map(function, shards))
+
+    def append_many(self, user_id, record_type, rows):
+        self.shard_for(user_id).append_many(user_id, record_type, rows)
+
+    def write_batch(self, batch):
+        by_shard = defaultdict(dict)
+        for key, rows in batch.items():
+            by_shard[self.shard_index(key[0])][key] = rows
+        self._map(lambda index: self.shards[index].write_batch(by_shard[index]), list(by_shard))
+
+    def load(self, user_id, record_type, since=None, limit=None):
+        return self.shard_for(user_id).load(user_id, record_type, since=since, limit=limit)
+
+    def load_before(self, user_id, record_type, before, limit):
+        return self.shard_for(user_id).load_before(user_id, record_type, before, limit)
+
+    def iter_load(self, user_id, record_type, batch_size=500):
+        return self.shard_for(user_id).iter_load(user_id, record_type, batch_size=batch_size)
+
+    def load_headers(self, user_id, record_type):
+        return self.shard_for(user_id).load_headers(user_id, record_type)
+
+    def load_ids(self, user_id, record_type, record_ids):
+        return self.shard_for(user_id).load_ids(user_id, record_type, record_ids)
+
+    def count(self, user_id, record_type):
+        return self.shard_for(user_id).count(user_id, record_type)
+
+    def versions(self, user_id):
+        return self.shard_for(user_id).versions(user_id)
+
+    def reserve_ids(self, user_id, record_type, count=1):
+        return self.shard_for(user_id).reserve_ids(user_id, record_type, count)
+
+    def delete(self, user_id, record_type, record_ids):
+        self.shard_for(user_id).delete(user_id, record_type, record_ids)
+
+    def delete_user(self, user_id):
+        self.shard_for(user_id).delete_user(user_id)
+
+    def purge_before(self, record_type, timestamp, limit=None):
+        # Shard by shard, so `limit` bounds the whole call; partitions() gives parallel access
+        purged = {}
+        total = 0
+        for shard in self.shards:
+            shard_purged = shard.purge_before(record_type, timestamp, None if limit is None else limit - total)
+            purged.update(shard_purged)
+            total += sum(map(len, shard_purged.values()))
+            if limit is not None and total >= limit:
+                break
+        return purged
+
+    def idle_users(self, timestamp):
+        return [user_id for users in self._map(lambda shard: shard.idle_users(timestamp), self.shards) for user_id in users]
+
+    def compact(self, limit=None):
+        if limit is None:
+            return sum(self._map(lambda shard: shard.compact(), self.shards))
+        removed = 0
+        for shard in self.shards:
+            removed += shard.compact(limit - removed)
+            if removed >= limit:
+                break
+        return removed
+
+    def vacuum(self, pages=None):
+        if pages is None:
+            return sum(self._map(lambda shard: shard.vacuum(), self.shards))
+        freed = 0
+        for shard in self.shards:
+            freed += shard.vacuum(pages - freed)
+            if freed >= pages:
+                break
+        return freed
+
+    def partitions(self):
+        return [partition for shard in self.shards for partition in shard.partitions()]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for shard in self.shards:
+            shard.close()
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+def get_default_backend():
+    """Process-wide backend chosen by WELLNESS_STORAGE ("sqlite" or "memory")
+
+    SQLite writes go through a write-behind queue unless WELLNESS_FLUSH_INTERVAL
+    is 0. WELLNESS_DURABILITY ("fast", "normal", "full") sets how hard each
+    group commit syncs to disk. The flusher also compacts deleted records every
+    WELLNESS_COMPACT_INTERVAL seconds. With WELLNESS_SHARED_STATE set, writes
+    always go straight to SQLite so other processes see them on their next read.
+    WELLNESS_SHARDS splits users over that many SQLite files (every process
+    sharing the files must use the same count), and WELLNESS_DB_POOL_SIZE sets
+    the connections kept per file.
+    """
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            if os.getenv("WELLNESS_STORAGE", "sqlite").lower() == "memory":
+                _default_backend = InMemoryBackend()
+            else:
+                durability = os.getenv("WELLNESS_DURABILITY", "normal").lower()
+                options = {
+                    "synchronous": DURABILITY_MODES.get(durability, "NORMAL"),
+                    "pool_size": int(os.getenv("WELLNESS_DB_POOL_SIZE", "4"))
+                }
+                path = os.getenv("WELLNESS_DB_PATH", DEFAULT_DB_PATH)
+                shard_count = int(os.getenv("WELLNESS_SHARDS", "1"))
+                if shard_count > 1:
+                    backend = ShardedBackend.sqlite(path, count=shard_count, **options)
+                else:
+                    backend = SQLiteBackend(path, **options)
+                flush_interval = float(os.getenv("WELLNESS_FLUSH_INTERVAL", "0.5"))
+                shared = os.getenv("WELLNESS_SHARED_STATE", "").lower() in ("1", "true", "yes")
+                if flush_interval > 0 and not shared:
+                    # Imported here because write_behind builds on this module
+                    from utils.write_behind import WriteBehindBackend
+                    backend = WriteBehindBackend(
+                        backend,
+                        flush_interval=flush_interval,
+                        compact_interval=float(os.getenv("WELLNESS_COMPACT_INTERVAL", "300"))
+                    )
+                _default_backend = backend
+        return _default_backend
@@ -0,0 +1,234 @@
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from utils.storage import StorageBackend
+
+class WriteBehindBackend(StorageBackend):
+    """Buffers writes in memory and group-commits them from a background thread
+
+    Saves return as soon as the row is queued. A flusher thread commits all
+    pending rows in one transaction every `flush_interval` seconds, or sooner
+    once `max_pending` rows are waiting. Reads merge pending rows so a session
+    always sees its own writes. Pending rows are flushed on shutdown. Every
+    `compact_interval` seconds the flusher also compacts deleted records.
+    """
+
+    def __init__(self, backend, flush_interval=0.5, max_pending=500, compact_interval=300):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.compact_interval = compact_interval
+        self._last_compaction = time.monotonic()
+
+        self._pending = defaultdict(list)
+        self._inflight = {}
+        self._pending_count = 0
+        self._state_lock = threading.Lock()
+        # Held while a batch is being committed so deletes can't race a flush
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._flusher = threading.Thread(target=self._run, name="storage-write-behind", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def append_many(self, user_id, record_type, rows):
+        rows = [tuple(row) for row in rows]
+        if not rows:
+            return
+
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._pending[(user_id, record_type)].extend(rows)
+            self._pending_count += len(rows)
+            should_wake = self._pending_count >= self.max_pending
+
+        if should_wake:
+            self._wakeup.set()
+
+    def write_batch(self, batch):
+        # Bulk writes (e.g. imports) skip the queue and commit in one transaction
+        with self._flush_lock:
+            self.backend.write_batch(batch)
+
+    def _unflushed(self, user_id, record_type):
+        """Rows for a key not yet committed, as (record_id, timestamp, payload, header)"""
+        key = (user_id, record_type)
+        with self._state_lock:
+            rows = list(self._inflight.get(key, ())) + list(self._pending.get(key, ()))
+        return [row if len(row) > 3 else (*row, None) for row in rows]
+
+    @staticmethod
+    def _merge(rows, unflushed):
+        # Unflushed rows take precedence; a row caught mid-commit shows up once
+        merged = {row[0]: row for row in rows}
+        merged.update((row[0], row) for row in unflushed)
+        return sorted(merged.values(), key=lambda row: (row[1], row[0]))
+
+    def load(self, user_id, record_type, since=None, limit=None):
+        unflushed = self._unflushed(user_id, record_type)
+        rows = self.backend.load(user_id, record_type, since=since, limit=limit)
+        if not unflushed:
+            return rows
+
+        rows = self._merge(rows, [row[:3] for row in unflushed if since is None or row[1] >= since])
+        if limit is not None:
+            rows = rows[-limit:] if limit else []
+        return rows
+
+    def load_before(self, user_id, record_type, before, limit):
+        # Older rows may still be queued (e.g. just spilled from a hot window)
+        before = tuple(before)
+        unflushed = self._unflushed(user_id, record_type)
+        rows = self.backend.load_before(user_id, record_type, before, limit)
+        if not unflushed:
+            return rows
+
+        rows = self._merge(rows, [row[:3] for row in unflushed if (row[1], row[0]) < before])
+        return rows[-limit:] if limit else []
+
+    def iter_load(self, user_id, record_type, batch_size=500):
+        # Stored rows page by page, then the queued ones (the newest writes). Rows
+        # committed while paging are skipped in the backend and come from the snapshot.
+        unflushed = self._unflushed(user_id, record_type)
+        unflushed_ids = {row[0] for row in unflushed}
+        for rows in self.backend.iter_load(user_id, record_type, batch_size=batch_size):
+            rows = [row for row in rows if row[0] not in unflushed_ids]
+            if rows:
+                yield rows
+        unflushed = self._merge((), [row[:3] for row in unflushed])
+        for start in range(0, len(unflushed), batch_size):
+            yield unflushed[start:start + batch_size]
+
+    def load_headers(self, user_id, record_type):
+        unflushed = self._unflushed(user_id, record_type)
+        rows = self.backend.load_headers(user_id, record_type)
+        if not unflushed:
+            return rows
+        return self._merge(rows, [
+            (record_id, timestamp, header, None if header is not None else payload)
+            for record_id, timestamp, payload, header in unflushed
+        ])
+
+    def load_ids(self, user_id, record_type, record_ids):
+        record_ids = set(record_ids)
+        unflushed = [row[:3] for row in self._unflushed(user_id, record_type) if row[0] in record_ids]
+        rows = self.backend.load_ids(user_id, record_type, record_ids - {row[0] for row in unflushed})
+        return self._merge(rows, unflushed) if unflushed else rows
+
+    def count(self, user_id, record_type):
+        # Queued rows are never stored yet. Only a commit already in progress is
+        # waited out (none is forced), so in-flight rows can't be counted twice.
+        with self._flush_lock:
+            with self._state_lock:
+                pending = len(self._pending.get((user_id, record_type), ()))
+            return self.backend.count(user_id, record_type) + pending
+
+    def versions(self, user_id):
+        # Committed writes only: shared-state mode, which compares versions
+        # across processes, writes straight to the backend (see get_default_backend)
+        return self.backend.versions(user_id)
+
+    def reserve_ids(self, user_id, record_type, count=1):
+        return self.backend.reserve_ids(user_id, record_type, count)
+
+    def delete(self, user_id, record_type, record_ids):
+        record_ids = set(record_ids)
+        key = (user_id, record_type)
+        with self._flush_lock:
+            # Rows that never reached the backend are simply dropped from the queue
+            with self._state_lock:
+                rows = self._pending.get(key)
+                if rows:
+                    kept = [row for row in rows if row[0] not in record_ids]
+                    self._pending_count -= len(rows) - len(kept)
+                    self._pending[key] = kept
+            self.backend.delete(user_id, record_type, record_ids)
+
+    def purge_before(self, record_type, timestamp, limit=None):
+        # Queued rows are new, so flushing first is enough to catch every expired one
+        self.flush()
+        with self._flush_lock:
+            return self.backend.purge_before(record_type, timestamp, limit)
+
+    def idle_users(self, timestamp):
+        # Queued rows are new, so their users are never idle; flush so they count
+        self.flush()
+        with self._flush_lock:
+            return self.backend.idle_users(timestamp)
+
+    def compact(self, limit=None):
+        with self._flush_lock:
+            removed = self.backend.compact(limit)
+        self._last_compaction = time.monotonic()
+        return removed
+
+    def vacuum(self, pages=None):
+        with self._flush_lock:
+            return self.backend.vacuum(pages)
+
+    def partitions(self):
+        # Maintenance then works on the backend directly, so commit what is queued first
+        self.flush()
+        return self.backend.partitions()
+
+    def delete_user(self, user_id):
+        with self._flush_lock:
+            with self._state_lock:
+                for key in [key for key in self._pending if key[0] == user_id]:
+                    self._pending_count -= len(self._pending.pop(key))
+            self.backend.delete_user(user_id)
+
+    def flush(self):
+        """Commit every pending row now (blocks until done)"""
+        with self._flush_lock:
+            with self._state_lock:
+                if not self._pending:
+                    return
+                self._inflight = dict(self._pending)
+                self._pending = defaultdict(list)
+                self._pending_count = 0
+
+            try:
+                self.backend.write_batch(self._inflight)
+            except Exception:
+                # Put the rows back so the next flush retries them
+                with self._state_lock:
+                    for key, rows in self._inflight.items():
+                        self._pending[key][:0] = rows
+                        self._pending_count += len(rows)
+                raise
+            finally:
+                with self._state_lock:
+                    self._inflight = {}
+
+    def close(self):
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+        self.backend.close()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Rows stay pending and are retried on the next interval
+                pass
+
+            if self.compact_interval and time.monotonic() - self._last_compaction >= self.compact_interval:
+                try:
+                    self.compact()
+                except Exception:
+                    self._last_compaction = time.monotonic()